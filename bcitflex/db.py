@@ -15,7 +15,13 @@ from sqlalchemy import engine, select, text
 from .ext.database import SQLAlchemy
 from .model import Course
 from .model.base import Base
-from .scripts import load_db_command
+from .scripts import (
+    bench_parse_command,
+    bench_scrape_command,
+    load_db_command,
+    refresh_db_command,
+    refresh_status_command,
+)
 from .scripts.load_programs import (
     delete_and_load_programs,
     extract_programs,
@@ -266,6 +272,9 @@ def init_app(app: Flask):
     if app.config.get("SQLALCHEMY_DATABASE_URI") is not None:
         db.init_app(app)
         app.cli.add_command(load_db_command)
+        app.cli.add_command(refresh_db_command)
+        app.cli.add_command(refresh_status_command)
+        app.cli.add_command(bench_scrape_command)
         app.cli.add_command(upgrade_db_command)
         app.cli.add_command(load_subjects_command)
         app.cli.add_command(load_programs_command)
@@ -276,3 +285,4 @@ def init_app(app: Flask):
         )
 
     app.cli.add_command(create_db_command)
+    app.cli.add_command(bench_parse_command)
@@ -1,13 +1,25 @@
+from collections import defaultdict
+
 from flask_sqlalchemy import SQLAlchemy as SQLAlchemyBase
+from sqlalchemy import func, inspect, select
 from sqlalchemy.event import listens_for
 from sqlalchemy.orm import (
     DeclarativeBase,
     ORMExecuteState,
     Session,
+    UOWTransaction,
     with_loader_criteria,
 )
 
+from bcitflex.model import Base, Meeting
 from bcitflex.model.base import SoftDeleteMixin
+from bcitflex.model.prerequisite import PrerequisiteAnd
+
+# model, serial attribute, partition attribute, parent relationship
+PARTITIONED_SERIALS = [
+    (Meeting, "meeting_id", "offering_id", "offering"),
+    (PrerequisiteAnd, "prereq_no", "course_id", "course"),
+]
 
 
 class SQLAlchemy(SQLAlchemyBase):
@@ -37,3 +49,63 @@ def soft_delete_execute(state: ORMExecuteState):
                 include_aliases=True,
             )
         )
+
+
+# Partitioned serial hook functions
+def serial_partition(obj: Base, partition: str, parent: str):
+    """Return the partition ID of obj, or its pending parent if it has no ID yet."""
+
+    partition_id = getattr(obj, partition)
+    if partition_id is not None:
+        return partition_id
+
+    parent_obj = getattr(obj, parent)
+    if parent_obj is None:
+        return None
+
+    identity = inspect(parent_obj).identity
+    return identity[0] if identity else parent_obj
+
+
+@listens_for(Session, identifier="before_flush")
+def assign_partitioned_serials(session: Session, flush_context: UOWTransaction, _):
+    """Number new meetings and prerequisites that were not numbered when parsed.
+
+    The column defaults select the max serial of the partition for each row,
+    this selects it once per model and flush so the inserts can be batched.
+    """
+
+    for model, serial, partition, parent in PARTITIONED_SERIALS:
+        new = [obj for obj in session.new if isinstance(obj, model)]
+        unassigned = [obj for obj in new if getattr(obj, serial) is None]
+        if not unassigned:
+            continue
+
+        # serials already taken, soft deleted rows keep theirs
+        max_serials = defaultdict(int)
+        partition_ids = {
+            serial_partition(obj, partition, parent) for obj in unassigned
+        } - {None}
+        stored_ids = [pid for pid in partition_ids if isinstance(pid, int)]
+        if stored_ids:
+            partition_col = getattr(model, partition)
+            stmt = (
+                select(partition_col, func.max(getattr(model, serial)))
+                .where(partition_col.in_(stored_ids))
+                .group_by(partition_col)
+                .execution_options(include_deleted=True)
+            )
+            max_serials.update(session.execute(stmt).tuples())
+
+        for obj in new:
+            pid = serial_partition(obj, partition, parent)
+            value = getattr(obj, serial)
+            if value is not None and pid is not None:
+                max_serials[pid] = max(max_serials[pid], value)
+
+        for obj in sorted(unassigned, key=lambda o: inspect(o).insert_order):
+            pid = serial_partition(obj, partition, parent)
+            if pid is None:
+                continue
+            max_serials[pid] += 1
+            setattr(obj, serial, max_serials[pid])
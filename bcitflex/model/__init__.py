@@ -3,6 +3,7 @@ from .course import Course
 from .meeting import Meeting
 from .offering import Offering
 from .program import Program
+from .scrape_state import ScrapeState
 from .subject import Subject
 from .term import Term
 from .user import User, UserPreference
@@ -1,22 +1,28 @@
 """SQLAlchemy Models Base Class"""
 from __future__ import annotations
 
+from collections.abc import Iterable
 from typing import TypeVar
 
 from sqlalchemy import (
     TIMESTAMP,
     Column,
+    ColumnElement,
     MetaData,
     UniqueConstraint,
     func,
     inspect,
     select,
+    tuple_,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapper, Session
 from sqlalchemy.orm import MappedAsDataclass as MappedAsDataclassBase
 
 _T = TypeVar("_T", bound="Base")
 
+# maximum number of unique ids looked up per query
+UNIQUE_CHUNK_SIZE = 1000
+
 # Constraint naming conventions
 convention = {
     "ix": "ix_%(column_0_N_name)s",
@@ -165,6 +171,131 @@ class Base(SoftDeleteMixin, DeclarativeBase):
         stmt = select(cls).filter_by(**filters).execution_options(include_deleted=True)
         return session.execute(stmt).scalar_one_or_none()
 
+    @classmethod
+    def _unique_in(
+        cls: "_T", unique_columns: list[str], unique_ids: list[tuple]
+    ) -> ColumnElement[bool]:
+        """Return a filter on the unique columns matching any of the unique ids."""
+        if len(unique_columns) == 1:
+            return getattr(cls, unique_columns[0]).in_(
+                [unique_id[0] for unique_id in unique_ids]
+            )
+        return tuple_(*(getattr(cls, c) for c in unique_columns)).in_(unique_ids)
+
+    @classmethod
+    def get_many_by_unique(
+        cls: "_T",
+        session: Session,
+        unique_ids: Iterable[int | str | tuple],
+        constraint_name: str | None = None,
+        chunk_size: int = UNIQUE_CHUNK_SIZE,
+    ) -> dict[tuple, _T]:
+        """
+        Return objects using the unique constraint, with one query per chunk of unique ids.
+
+        Unique ids without a matching object are left out of the result.
+
+        :param session: SQLAlchemy session
+        :param unique_ids: unique id values or tuples of unique id values corresponding to the unique columns
+        :param constraint_name: unique constraint name, optional
+        :param chunk_size: maximum number of unique ids per query
+
+        :return: objects keyed by their tuple of unique id values
+
+        :raises ValueError: if the model has no unique fields
+        """
+
+        # get the unique column names
+        unique_columns = cls._unique_columns(constraint_name)
+
+        # coerce unique ids to tuples and drop duplicates
+        unique_ids = list(
+            dict.fromkeys(
+                (unique_id,) if isinstance(unique_id, (int, str)) else tuple(unique_id)
+                for unique_id in unique_ids
+            )
+        )
+
+        objs = {}
+        for start in range(0, len(unique_ids), chunk_size):
+            stmt = (
+                select(cls)
+                .where(
+                    cls._unique_in(
+                        unique_columns, unique_ids[start : start + chunk_size]
+                    )
+                )
+                .execution_options(include_deleted=True)
+            )
+            for obj in session.scalars(stmt):
+                objs[tuple(getattr(obj, c) for c in unique_columns)] = obj
+
+        return objs
+
+    @classmethod
+    def set_ids(
+        cls: "_T",
+        session: Session,
+        objs: Iterable[_T],
+        constraint_name: str | None = None,
+        chunk_size: int = UNIQUE_CHUNK_SIZE,
+    ) -> dict[tuple, dict]:
+        """Set the primary keys of objects using the unique constraint.
+
+        Batch version of set_id: only the primary and unique columns are selected,
+        with one query per chunk of objects.
+        Objects without a persistent object are left unchanged.
+
+        :param session: SQLAlchemy session
+        :param objs: objects of this model
+        :param constraint_name: unique constraint name, optional
+        :param chunk_size: maximum number of objects looked up per query
+
+        :return: primary key values keyed by tuple of unique id values
+
+        :raises ValueError: if the model has no unique fields
+        """
+
+        cls_mapper = inspect(cls)
+
+        # get the unique and primary key column names
+        unique_columns = cls._unique_columns(constraint_name)
+        pk_attrs = [db_to_attr(cls_mapper, c.key) for c in cls_mapper.primary_key]
+
+        objs = list(objs)
+        unique_ids = list(
+            dict.fromkeys(
+                tuple(getattr(obj, c) for c in unique_columns) for obj in objs
+            )
+        )
+
+        # get the primary keys of the persistent objects
+        pks = {}
+        for start in range(0, len(unique_ids), chunk_size):
+            stmt = (
+                select(
+                    *(getattr(cls, a) for a in pk_attrs),
+                    *(getattr(cls, c) for c in unique_columns),
+                )
+                .where(
+                    cls._unique_in(
+                        unique_columns, unique_ids[start : start + chunk_size]
+                    )
+                )
+                .execution_options(include_deleted=True)
+            )
+            for row in session.execute(stmt):
+                pks[tuple(row[len(pk_attrs) :])] = dict(zip(pk_attrs, row))
+
+        # set the primary keys
+        for obj in objs:
+            pk = pks.get(tuple(getattr(obj, c) for c in unique_columns))
+            if pk is not None:
+                for k, v in pk.items():
+                    setattr(obj, k, v)
+
+        return pks
+
     def set_id(self, session: Session, constraint_name: str | None = None) -> None:
         """Set the primary key of the object using the unique constraint.
 
@@ -3,7 +3,7 @@ from typing import TYPE_CHECKING
 
 from sqlalchemy import ForeignKey, Sequence, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.types import REAL, Integer, String, Text
+from sqlalchemy.types import REAL, TIMESTAMP, Integer, String, Text
 
 from . import Base
 from .base import TimestampsMixin
@@ -28,6 +28,10 @@ class Course(TimestampsMixin, Base):
     :ivar prerequisites_raw: Prerequisites as string
     :ivar credits: Credit hours
     :ivar url: BCIT Course URL
+    :ivar page_digest: Digest of the scraped course page
+    :ivar scraped_at: When the course page was last fetched
+    :ivar fetch_count: Number of times the course page was fetched
+    :ivar change_count: Number of fetches that found the course page changed
     :ivar subject: Subject relation
     :ivar programs: Programs relation
     :ivar offerings: Offerings relation
@@ -76,6 +80,30 @@ class Course(TimestampsMixin, Base):
         doc="URL",
         comment="BCIT Course URL.",
     )
+    page_digest: Mapped[String | None] = mapped_column(
+        String(64),
+        doc="Page Digest",
+        comment="SHA-256 of the course page sections the course was parsed from.",
+    )
+    scraped_at: Mapped[TIMESTAMP | None] = mapped_column(
+        TIMESTAMP(timezone=True),
+        doc="Scraped At",
+        comment="When the course page was last fetched.",
+    )
+    fetch_count: Mapped[Integer] = mapped_column(
+        Integer,
+        doc="Fetch Count",
+        comment="Number of times the course page was fetched.",
+        default=0,
+        server_default="0",
+    )
+    change_count: Mapped[Integer] = mapped_column(
+        Integer,
+        doc="Change Count",
+        comment="Number of fetches that found the course page changed.",
+        default=0,
+        server_default="0",
+    )
 
     subject: Mapped["Subject"] = relationship(back_populates="courses")
 
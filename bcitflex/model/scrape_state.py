@@ -0,0 +1,37 @@
+"""Scrape state declaration."""
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.types import TIMESTAMP, String
+
+from . import Base
+
+
+class ScrapeState(Base):
+    """State of a scraped resource kept between scrapes.
+
+    :ivar name: Name of the resource, such as the course list.
+    :ivar fingerprint: SHA-256 of the resource when it was last scraped.
+    :ivar scraped_at: When the resource was last scraped.
+    """
+
+    __tablename__ = "scrape_state"
+    __table_args__ = {"comment": "State of scraped resources kept between scrapes."}
+
+    name: Mapped[String] = mapped_column(
+        String(50),
+        primary_key=True,
+        doc="Resource name",
+        comment="Name of the scraped resource.",
+    )
+    fingerprint: Mapped[String | None] = mapped_column(
+        String(64),
+        doc="Fingerprint",
+        comment="SHA-256 of the resource when it was last scraped.",
+    )
+    scraped_at: Mapped[TIMESTAMP | None] = mapped_column(
+        TIMESTAMP(timezone=True),
+        doc="Scraped at",
+        comment="When the resource was last scraped.",
+    )
+
+    def __repr__(self):
+        return f"ScrapeState({self.name})"
@@ -1,3 +1,6 @@
 """Web scraping script and database loading script."""
 
+from .benchmark import bench_parse_command, bench_scrape_command
+from .scheduler import refresh_db_command
 from .scrape_and_load import load_db_command
+from .status import refresh_status_command
@@ -0,0 +1,161 @@
+"""Record fetched pages to a compressed archive and replay them offline."""
+import datetime
+import gzip
+import hashlib
+import json
+import os
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+
+from requests import Response
+
+CRAWL_NAME_FORMAT = "%Y%m%dT%H%M%S"
+
+
+def make_response(url: str, content: bytes, encoding: str | None) -> Response:
+    """Build a 200 OK response with the given content."""
+    response = Response()
+    response.status_code = 200
+    response.url = url
+    response.encoding = encoding
+    response._content = content
+    return response
+
+
+class PageArchive:
+    """Content-addressed store of page bodies with one manifest per crawl.
+
+    Bodies are gzipped and stored once under objects/ by the SHA-256 of
+    their content, so pages that don't change between crawls take no
+    extra space. Each crawl's manifest, under crawls/, maps the urls
+    fetched in that crawl to their bodies.
+    """
+
+    def __init__(self, directory: str | os.PathLike) -> None:
+        self.directory = Path(directory)
+        self.objects = self.directory / "objects"
+        self.manifests = self.directory / "crawls"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.manifests.mkdir(parents=True, exist_ok=True)
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / f"{digest}.gz"
+
+    def put(self, content: bytes) -> str:
+        """Store content if it is not archived yet and return its digest."""
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with gzip.open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        """Return archived content by its digest."""
+        with gzip.open(self._object_path(digest), "rb") as f:
+            return f.read()
+
+    def crawls(self) -> list[str]:
+        """Return the names of recorded crawls, oldest first."""
+        return sorted(
+            path.name.removesuffix(".json.gz")
+            for path in self.manifests.iterdir()
+            if path.name.endswith(".json.gz")
+        )
+
+    def record(self) -> "CrawlRecorder":
+        """Start recording a new crawl."""
+        name = datetime.datetime.now().strftime(CRAWL_NAME_FORMAT)
+        return CrawlRecorder(self, name)
+
+    def replay(self, name: str | None = None) -> "CrawlReplay":
+        """Open a recorded crawl, the latest one if name is None.
+
+        :raises ValueError: if there is no such crawl.
+        """
+        crawls = self.crawls()
+        if name is None or name == "latest":
+            if not crawls:
+                raise ValueError(f"No crawls recorded in {self.directory}.")
+            name = crawls[-1]
+        elif name not in crawls:
+            raise ValueError(f"Unknown crawl: {name}")
+
+        with gzip.open(self.manifests / f"{name}.json.gz", "rt") as f:
+            return CrawlReplay(self, name, json.load(f))
+
+
+class CrawlRecorder:
+    """Record the responses of one crawl into a page archive."""
+
+    def __init__(self, archive: PageArchive, name: str) -> None:
+        self.archive = archive
+        self.name = name
+        self.manifest = {"course_list": None, "pages": {}}
+
+    def add(self, response: Response) -> None:
+        """Archive a course page response."""
+        self.manifest["pages"][response.url] = {
+            "digest": self.archive.put(response.content),
+            "encoding": response.encoding,
+        }
+
+    def add_course_list(self, response: Response) -> None:
+        """Archive the list-active-urls response."""
+        self.manifest["course_list"] = {
+            "url": response.url,
+            "digest": self.archive.put(response.content),
+            "encoding": response.encoding,
+        }
+
+    def wrap(
+        self, fetcher: Callable[[list[str]], Iterable[Response]]
+    ) -> Callable[[list[str]], Iterator[Response]]:
+        """Return a fetcher that archives each response as it passes through."""
+
+        def fetch(urls: list[str]) -> Iterator[Response]:
+            for response in fetcher(urls):
+                self.add(response)
+                yield response
+
+        return fetch
+
+    def save(self) -> None:
+        """Write the crawl manifest."""
+        path = self.archive.manifests / f"{self.name}.json.gz"
+        tmp_path = path.with_suffix(".tmp")
+        with gzip.open(tmp_path, "wt") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, path)
+
+
+class CrawlReplay:
+    """Serve the responses of a recorded crawl in place of the BCIT website."""
+
+    def __init__(self, archive: PageArchive, name: str, manifest: dict) -> None:
+        self.archive = archive
+        self.name = name
+        self.manifest = manifest
+
+    def _response(self, url: str, entry: dict) -> Response:
+        return make_response(url, self.archive.get(entry["digest"]), entry["encoding"])
+
+    def course_list(self) -> Response:
+        """Return the recorded list-active-urls response.
+
+        :raises ValueError: if the crawl did not record it.
+        """
+        entry = self.manifest["course_list"]
+        if entry is None:
+            raise ValueError(f"Crawl {self.name} has no course list.")
+        return self._response(entry["url"], entry)
+
+    def fetch(self, urls: list[str]) -> Iterator[Response]:
+        """Yield the recorded responses of urls, skipping urls that were not recorded."""
+        for url in urls:
+            entry = self.manifest["pages"].get(url)
+            if entry is not None:
+                yield self._response(url, entry)
@@ -0,0 +1,390 @@
+"""Benchmark the scraper against a local BCIT site simulator and the parser offline."""
+import gc
+import json
+import os
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+
+import click
+from flask import current_app
+from requests import Response
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import Session
+
+from bcitflex.model import Course, Subject
+
+from .archive import PageArchive, make_response
+from .fetch import MAX_IN_FLIGHT
+from .scrape_and_load import (
+    BASE_URL,
+    CoursePage,
+    ScrapeStats,
+    bcit_to_sql,
+    index_prerequisites,
+    offering_field_nodes,
+    parse_course_info_record,
+    parse_course_record,
+    parse_meeting_record,
+    parse_offering_record,
+    parse_prerequisite_keys,
+    term_offering_nodes,
+)
+from .simulator import SIMULATOR_HOST, BCITSimulator
+
+# parser metrics and whether higher values are better
+PARSE_METRICS = {
+    "pages_per_second": True,
+    "us_per_offering": False,
+    "us_per_meeting": False,
+    "us_per_prerequisites": False,
+    "kib_per_page": False,
+}
+
+
+def ensure_scratch_database(db_url: str) -> None:
+    """Refuse a database with courses that weren't loaded from the simulator.
+
+    Simulated courses use real subject IDs and codes, so loading them would
+    overwrite the real courses with the same keys and their offerings.
+
+    :raises click.ClickException: if a stored course, soft deleted or not, has
+        a url outside the simulator's host.
+    """
+
+    stmt = (
+        select(func.count())
+        .select_from(Course)
+        .where(Course.url.not_like(f"http://{SIMULATOR_HOST}:%"))
+        .execution_options(include_deleted=True)
+    )
+    with Session(create_engine(db_url)) as session:
+        if session.scalar(stmt):
+            raise click.ClickException(
+                "The database has real courses, which the simulated ones would"
+                " overwrite. Use an empty database."
+            )
+
+
+def ensure_subjects(db_url: str) -> None:
+    """Load the subject table if it is empty, so simulated courses have subjects."""
+
+    script_path = os.path.join(os.path.dirname(__file__), "populate_subject.sql")
+    with Session(create_engine(db_url)) as session:
+        if session.scalar(select(func.count()).select_from(Subject)):
+            return
+        with open(script_path, "r") as f:
+            session.execute(text(f.read()))
+        session.commit()
+
+
+def format_stats(stats: ScrapeStats) -> str:
+    """Return a report of a benchmark run."""
+
+    p50 = stats.latency_percentile(50) or 0
+    p99 = stats.latency_percentile(99) or 0
+    return (
+        f"Pages: {stats.pages}\n"
+        f"Failures: {len(stats.failures)}\n"
+        f"Objects loaded: {stats.objects}\n"
+        f"Total time: {stats.total_seconds:.2f} s\n"
+        f"Throughput: {stats.pages_per_second:.1f} pages/s\n"
+        f"Fetch latency: p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms\n"
+        f"Load time: {stats.load_seconds:.2f} s"
+    )
+
+
+@click.command("bench-scrape")
+@click.option(
+    "--db-url",
+    required=True,
+    help="Empty database to load into, or one only bench-scrape has loaded.",
+)
+@click.option("--courses", default=1000, show_default=True, help="Courses to serve.")
+@click.option("--latency", default=0.05, show_default=True, help="Seconds per request.")
+@click.option("--error-rate", default=0.0, show_default=True, help="Fraction of 500s.")
+@click.option(
+    "--throttle-rate", default=0.0, show_default=True, help="Fraction of 429s."
+)
+@click.option(
+    "--max-in-flight",
+    default=MAX_IN_FLIGHT,
+    show_default=True,
+    help="Maximum concurrent page requests.",
+)
+@click.option("--parse-workers", type=int, help="Parse pages in this many processes.")
+@click.option("--cache", is_flag=True, help="Use the HTTP response cache.")
+@click.option("--copy", is_flag=True, help="Load through COPY into staging tables.")
+@click.option("--load-workers", type=int, help="Load this many subjects at once.")
+@click.option("--seed", default=0, show_default=True, help="Seed of the site.")
+def bench_scrape_command(
+    db_url,
+    courses,
+    latency,
+    error_rate,
+    throttle_rate,
+    max_in_flight,
+    parse_workers,
+    cache,
+    copy,
+    load_workers,
+    seed,
+):
+    """Run load-db against a simulated BCIT site and report throughput."""
+
+    ensure_scratch_database(db_url)
+    ensure_subjects(db_url)
+    cache_dir = (
+        os.path.join(current_app.instance_path, "bench_http_cache") if cache else None
+    )
+
+    with BCITSimulator(
+        courses=courses,
+        latency=latency,
+        error_rate=error_rate,
+        throttle_rate=throttle_rate,
+        seed=seed,
+    ) as site:
+        stats = bcit_to_sql(
+            db_url,
+            all_subjects=True,
+            max_in_flight=max_in_flight,
+            cache_dir=cache_dir,
+            force=True,
+            parse_workers=parse_workers,
+            skip_failures=True,
+            base_url=site.url,
+            copy=copy,
+            load_workers=load_workers,
+        )
+
+    click.echo(format_stats(stats))
+
+
+@dataclass
+class ParseBenchmark:
+    """Parser performance over a page corpus.
+
+    :ivar pages: Pages in the corpus.
+    :ivar offerings: Offerings in the corpus.
+    :ivar meetings: Meetings in the corpus.
+    :ivar pages_per_second: Pages parsed per second into course records.
+    :ivar us_per_offering: Microseconds per parse_offering_record, meetings included.
+    :ivar us_per_meeting: Microseconds per parse_meeting_record.
+    :ivar us_per_prerequisites: Microseconds per index_prerequisites of a course.
+    :ivar kib_per_page: Mean peak memory allocated while parsing a page.
+    """
+
+    pages: int
+    offerings: int
+    meetings: int
+    pages_per_second: float
+    us_per_offering: float
+    us_per_meeting: float
+    us_per_prerequisites: float
+    kib_per_page: float
+
+
+def simulated_corpus(pages: int, seed: int = 0) -> list[Response]:
+    """Return responses of pages rendered by the site simulator."""
+
+    site = BCITSimulator(courses=pages, seed=seed)
+    return [
+        make_response(
+            BASE_URL + site.course_path(number), site.course_page(number), "utf-8"
+        )
+        for number in range(pages)
+    ]
+
+
+def archived_corpus(archive: PageArchive, crawl: str | None = None) -> list[Response]:
+    """Return the responses of a recorded crawl, the latest one if crawl is None."""
+
+    replay = archive.replay(crawl)
+    return list(replay.fetch(list(replay.manifest["pages"])))
+
+
+def best_time(func: Callable[[], object], repeat: int) -> float:
+    """Return the fastest of repeat runs of func in seconds, with gc disabled."""
+
+    times = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    return min(times)
+
+
+def benchmark_parser(responses: list[Response], repeat: int = 5) -> ParseBenchmark:
+    """Time the parser stages over a page corpus.
+
+    :param responses: Course page responses to parse.
+    :param repeat: Runs per stage, the fastest is reported.
+    """
+
+    pages = [CoursePage(response) for response in responses]
+    courses = [parse_course_info_record(page) for page in pages]
+    course_ids = {
+        (course.subject_id, course.code): course_id
+        for course_id, course in enumerate(courses, 1)
+    }
+    offering_nodes = [
+        (node, term) for page in pages for node, term in term_offering_nodes(page)
+    ]
+    meeting_nodes = [
+        (node, term)
+        for offering_node, term in offering_nodes
+        if "meetings" in offering_field_nodes(offering_node)
+        for node in offering_field_nodes(offering_node)["meetings"].css("tr")[1:]
+    ]
+
+    def parse_pages():
+        for response in responses:
+            parse_course_record(CoursePage(response))
+
+    def parse_offerings():
+        for node, term in offering_nodes:
+            parse_offering_record(node, term)
+
+    def parse_meetings():
+        for node, term in meeting_nodes:
+            parse_meeting_record(node, term, 1)
+
+    def parse_all_prerequisites():
+        for course in courses:
+            index_prerequisites(
+                course.course_id, parse_prerequisite_keys(course), course_ids
+            )
+
+    page_seconds = best_time(parse_pages, repeat)
+    offering_seconds = best_time(parse_offerings, repeat)
+    meeting_seconds = best_time(parse_meetings, repeat)
+    prerequisite_seconds = best_time(parse_all_prerequisites, repeat)
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for response in responses:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            parse_course_record(CoursePage(response))
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    def per_item(seconds: float, items: int) -> float:
+        return seconds / items * 1e6 if items else 0.0
+
+    return ParseBenchmark(
+        pages=len(responses),
+        offerings=len(offering_nodes),
+        meetings=len(meeting_nodes),
+        pages_per_second=len(responses) / page_seconds if page_seconds else 0.0,
+        us_per_offering=per_item(offering_seconds, len(offering_nodes)),
+        us_per_meeting=per_item(meeting_seconds, len(meeting_nodes)),
+        us_per_prerequisites=per_item(prerequisite_seconds, len(courses)),
+        kib_per_page=sum(peaks) / len(peaks) / 1024 if peaks else 0.0,
+    )
+
+
+def compare_to_baseline(
+    result: ParseBenchmark, baseline: dict[str, float], tolerance: float
+) -> list[str]:
+    """Return a description of each metric that regressed past the tolerance.
+
+    :param result: Benchmark to check.
+    :param baseline: Metrics of a saved benchmark.
+    :param tolerance: Allowed fraction of change for the worse, e.g. 0.1 for 10%.
+    """
+
+    regressions = []
+    for metric, higher_is_better in PARSE_METRICS.items():
+        before = baseline.get(metric)
+        after = getattr(result, metric)
+        if not before:
+            continue
+        change = (after - before) / before
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(f"{metric}: {before:.2f} -> {after:.2f} ({change:+.1%})")
+
+    return regressions
+
+
+def format_parse_benchmark(result: ParseBenchmark) -> str:
+    """Return a report of a parser benchmark."""
+
+    return (
+        f"Pages: {result.pages} ({result.offerings} offerings, "
+        f"{result.meetings} meetings)\n"
+        f"Throughput: {result.pages_per_second:.1f} pages/s\n"
+        f"Offering: {result.us_per_offering:.1f} us\n"
+        f"Meeting: {result.us_per_meeting:.1f} us\n"
+        f"Prerequisites: {result.us_per_prerequisites:.1f} us per course\n"
+        f"Memory: {result.kib_per_page:.1f} KiB peak per page"
+    )
+
+
+@click.command("bench-parse")
+@click.option(
+    "--pages", default=200, show_default=True, help="Simulated pages to parse."
+)
+@click.option("--seed", default=0, show_default=True, help="Seed of the site.")
+@click.option(
+    "--crawl",
+    is_flag=False,
+    flag_value="latest",
+    default=None,
+    help="Parse the pages of a recorded crawl instead, the latest if no name is given.",
+)
+@click.option("--repeat", default=5, show_default=True, help="Runs per stage.")
+@click.option(
+    "--baseline",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Fail if the parser is slower than this saved benchmark.",
+)
+@click.option(
+    "--tolerance",
+    default=0.1,
+    show_default=True,
+    help="Fraction a metric may regress before failing.",
+)
+@click.option(
+    "--save-baseline",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Save the benchmark to this file.",
+)
+def bench_parse_command(pages, seed, crawl, repeat, baseline, tolerance, save_baseline):
+    """Benchmark the course page parser offline and compare it to a baseline."""
+
+    if crawl is not None:
+        archive = PageArchive(os.path.join(current_app.instance_path, "archive"))
+        try:
+            responses = archived_corpus(archive, crawl)
+        except ValueError as exc:
+            raise click.BadParameter(str(exc), param_hint="--crawl") from exc
+    else:
+        responses = simulated_corpus(pages, seed)
+
+    result = benchmark_parser(responses, repeat)
+    click.echo(format_parse_benchmark(result))
+
+    if save_baseline:
+        with open(save_baseline, "w") as f:
+            json.dump(asdict(result), f, indent=2)
+
+    if baseline:
+        with open(baseline, "r") as f:
+            regressions = compare_to_baseline(result, json.load(f), tolerance)
+        if regressions:
+            raise click.ClickException(
+                "Parser regressed against the baseline:\n" + "\n".join(regressions)
+            )
+        click.echo("No regressions against the baseline.")
@@ -0,0 +1,95 @@
+"""On-disk HTTP response cache for conditional GET requests."""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+CACHED_HEADERS = ["Content-Type", "ETag", "Last-Modified"]
+
+
+class ResponseCache:
+    """Store response bodies and validators on disk, one entry per URL.
+
+    Each entry is a body file and a JSON metadata file named by the
+    SHA-256 of the URL, so concurrent requests for different URLs never
+    touch the same files.
+    """
+
+    def __init__(self, directory: str | os.PathLike) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        """Return the metadata and body paths of a URL."""
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / f"{key}.json", self.directory / f"{key}.body"
+
+    def _read_meta(self, url: str) -> dict | None:
+        meta_path, body_path = self._paths(url)
+        if not meta_path.exists() or not body_path.exists():
+            return None
+        with open(meta_path, "r") as f:
+            return json.load(f)
+
+    def conditional_headers(self, url: str) -> dict[str, str]:
+        """Return If-None-Match/If-Modified-Since headers for a cached URL."""
+        meta = self._read_meta(url)
+        if meta is None:
+            return {}
+
+        headers = {}
+        if meta["headers"].get("ETag"):
+            headers["If-None-Match"] = meta["headers"]["ETag"]
+        if meta["headers"].get("Last-Modified"):
+            headers["If-Modified-Since"] = meta["headers"]["Last-Modified"]
+        return headers
+
+    def store(self, url: str, response: Response) -> None:
+        """Write a 200 response to the cache if it carries a validator.
+
+        The entry is keyed on the requested URL, which is what lookups use,
+        not the URL the response was redirected to.
+        """
+        if not (response.headers.get("ETag") or response.headers.get("Last-Modified")):
+            return
+
+        meta_path, body_path = self._paths(url)
+        meta = {
+            "url": response.url,
+            "encoding": response.encoding,
+            "headers": {
+                name: response.headers[name]
+                for name in CACHED_HEADERS
+                if name in response.headers
+            },
+        }
+
+        # write to temporary files first so a reader never sees a partial entry
+        for path, mode, data in [
+            (body_path, "wb", response.content),
+            (meta_path, "w", json.dumps(meta)),
+        ]:
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            with open(tmp_path, mode) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    def load(self, url: str) -> Response | None:
+        """Rebuild the cached 200 response of a URL."""
+        meta = self._read_meta(url)
+        if meta is None:
+            return None
+
+        _, body_path = self._paths(url)
+        response = Response()
+        response.status_code = 200
+        response.url = meta["url"]
+        response.encoding = meta["encoding"]
+        response.headers = CaseInsensitiveDict(meta["headers"])
+        with open(body_path, "rb") as f:
+            response._content = f.read()
+
+        return response
@@ -0,0 +1,238 @@
+"""Fetch course pages from the BCIT website."""
+import asyncio
+import random
+import time
+from collections.abc import AsyncIterator, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests import Response
+from requests.adapters import HTTPAdapter
+
+from .cache import ResponseCache
+
+MAX_IN_FLIGHT = 16
+RETRIES = 3
+BACKOFF = 0.5
+TIMEOUT = 30
+
+
+class FetchError(Exception):
+    """A page request returned a status other than 200 OK."""
+
+    def __init__(self, url: str, status_code: int) -> None:
+        super().__init__(f"Collect response status code: {status_code}")
+        self.url = url
+        self.status_code = status_code
+
+    @property
+    def retryable(self) -> bool:
+        """True if the server is throttling or failing rather than rejecting the request."""
+        return self.status_code == 429 or self.status_code >= 500
+
+
+class AdaptiveLimit:
+    """Additive-increase, multiplicative-decrease limit on concurrent requests.
+
+    The limit grows by about one per window of successful requests and is
+    halved when the server throttles, fails or times out, at most once per
+    cooldown so a burst of failures from one slowdown only counts once.
+
+    :ivar value: Current limit as a float, use current for the request count.
+    """
+
+    def __init__(
+        self, maximum: int, minimum: int = 1, initial: int | None = None
+    ) -> None:
+        self.maximum = maximum
+        self.minimum = min(minimum, maximum)
+        self.value = float(initial or max(self.minimum, maximum // 4))
+        self.cooldown = 1.0
+        self._decreased_at = None
+
+    @property
+    def current(self) -> int:
+        """Number of requests allowed in flight."""
+        return max(self.minimum, int(self.value))
+
+    def on_success(self) -> None:
+        self.value = min(self.maximum, self.value + 1 / self.value)
+
+    def on_throttle(self) -> None:
+        now = time.monotonic()
+        if self._decreased_at is not None and now - self._decreased_at < self.cooldown:
+            return
+        self._decreased_at = now
+        self.value = max(self.minimum, self.value / 2)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Return True if a failed request may succeed when retried."""
+    if isinstance(exc, FetchError):
+        return exc.retryable
+    return isinstance(exc, (requests.Timeout, requests.ConnectionError))
+
+
+def backoff_delay(attempt: int, backoff: float = BACKOFF) -> float:
+    """Return a full-jitter exponential backoff delay in seconds for an attempt."""
+    return random.uniform(0, backoff * 2**attempt)
+
+
+def create_http_session(pool_size: int = MAX_IN_FLIGHT) -> requests.Session:
+    """Return a requests Session that keeps up to pool_size connections alive."""
+
+    http = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    http.mount("http://", adapter)
+    http.mount("https://", adapter)
+
+    return http
+
+
+def collect_response(
+    url: str,
+    http: requests.Session | None = None,
+    cache: ResponseCache | None = None,
+    timeout: float | None = None,
+) -> Response:
+    """Collect the response from the given URL and return the text.
+
+    If a cache is given, the request is made conditional on the cached
+    validators and a 304 Not Modified is answered from the cache.
+
+    :param url: URL to request.
+    :param http: Session to reuse pooled connections from, optional.
+    :param cache: Response cache, optional.
+    :param timeout: Seconds to wait for the server, wait indefinitely if None.
+
+    :raises FetchError: if the response status is not 200 OK.
+    """
+
+    headers = cache.conditional_headers(url) if cache is not None else {}
+    get = http.get if http is not None else requests.get
+    response = get(url, headers=headers, timeout=timeout)
+
+    if cache is not None:
+        if response.status_code == 304:
+            cached = cache.load(url)
+            if cached is not None:
+                cached.elapsed = response.elapsed
+            response = cached or get(url, timeout=timeout)
+        elif response.status_code == 200:
+            cache.store(url, response)
+
+    if response.status_code != 200:
+        raise FetchError(url, response.status_code)
+
+    else:
+        return response
+
+
+def get_page_responses(urls: list[str]) -> list[Response]:
+    """Get the responses from the given course URLs."""
+
+    with ThreadPoolExecutor() as executor:
+        futures = [executor.submit(collect_response, url) for url in urls]
+        responses = [future.result() for future in as_completed(futures)]
+
+    return responses
+
+
+async def fetch_page_responses(
+    urls: Iterable[str],
+    max_in_flight: int = MAX_IN_FLIGHT,
+    cache: ResponseCache | None = None,
+    retries: int = RETRIES,
+    failures: list[tuple[str, Exception]] | None = None,
+) -> AsyncIterator[Response]:
+    """Fetch the given URLs over pooled keep-alive connections.
+
+    Responses are yielded in the order they arrive.
+    The number of outstanding requests adapts between one and max_in_flight:
+    it grows while requests succeed and backs off when the server throttles,
+    fails or times out. Those requests are retried with jittered exponential
+    backoff; other failures are not retried.
+
+    :param urls: URLs to request.
+    :param max_in_flight: Maximum number of concurrent requests.
+    :param cache: Response cache for conditional requests, optional.
+    :param retries: Number of times to retry a request.
+    :param failures: If given, pages that still fail are appended to it
+        as (url, exception) and skipped instead of raising.
+    """
+
+    loop = asyncio.get_running_loop()
+    limit = AdaptiveLimit(max_in_flight)
+    url_iter = iter(urls)
+    pending = {}
+
+    with create_http_session(max_in_flight) as http, ThreadPoolExecutor(
+        max_in_flight
+    ) as executor:
+
+        async def fetch(url: str) -> Response:
+            for attempt in range(retries + 1):
+                try:
+                    response = await loop.run_in_executor(
+                        executor, collect_response, url, http, cache, TIMEOUT
+                    )
+                except Exception as exc:
+                    if not is_retryable(exc):
+                        raise
+                    limit.on_throttle()
+                    if attempt == retries:
+                        raise
+                    await asyncio.sleep(backoff_delay(attempt))
+                else:
+                    limit.on_success()
+                    return response
+
+        def fill():
+            while len(pending) < limit.current:
+                url = next(url_iter, None)
+                if url is None:
+                    return
+                pending[asyncio.ensure_future(fetch(url))] = url
+
+        fill()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    url = pending.pop(task)
+                    if task.exception() is None:
+                        yield task.result()
+                    elif failures is not None:
+                        failures.append((url, task.exception()))
+                    else:
+                        raise task.exception()
+                fill()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+def iter_page_responses(
+    urls: Iterable[str],
+    max_in_flight: int = MAX_IN_FLIGHT,
+    cache: ResponseCache | None = None,
+    retries: int = RETRIES,
+    failures: list[tuple[str, Exception]] | None = None,
+) -> Iterator[Response]:
+    """Synchronous wrapper around fetch_page_responses, drop-in for get_page_responses."""
+
+    loop = asyncio.new_event_loop()
+    responses = fetch_page_responses(urls, max_in_flight, cache, retries, failures)
+
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(anext(responses))
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(responses.aclose())
+        loop.close()
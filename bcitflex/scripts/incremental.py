@@ -0,0 +1,173 @@
+"""Plan incremental scrapes from the course list and the stored courses.
+
+The list-active-urls payload is fingerprinted and compared with the
+fingerprint stored by the last run, and its course urls are compared
+with the urls of the stored courses. New urls are always fetched, urls
+that vanished from the list have their courses soft deleted, and the
+rest are only fetched again once they are older than a maximum age.
+"""
+import datetime
+import hashlib
+from dataclasses import dataclass, field
+
+from requests import Response
+from sqlalchemy import case, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from bcitflex.model import Course, Offering, ScrapeState
+
+from .upsert import soft_delete_rows
+
+COURSE_LIST_STATE = "list-active-urls"
+MARK_CHUNK_SIZE = 1000
+
+
+@dataclass
+class FetchPlan:
+    """Course pages to fetch and courses to soft delete.
+
+    :ivar fingerprint: Fingerprint of the course list payload.
+    :ivar list_changed: Whether the payload changed since the last run.
+    :ivar new: Paths of course pages that have no stored course.
+    :ivar stale: Paths of course pages fetched longer ago than the maximum age.
+    :ivar vanished: Urls of stored courses that are no longer listed.
+    """
+
+    fingerprint: str
+    list_changed: bool
+    new: list[str] = field(default_factory=list)
+    stale: list[str] = field(default_factory=list)
+    vanished: list[str] = field(default_factory=list)
+
+    @property
+    def is_noop(self) -> bool:
+        """Whether the run has nothing to fetch or soft delete."""
+        return not (self.list_changed or self.new or self.stale or self.vanished)
+
+    def subject_urls(self, subject_urls: dict[str, list[str]]) -> dict[str, list[str]]:
+        """Return the paths to fetch of each subject, in course list order."""
+        fetch = set(self.new) | set(self.stale)
+        return {
+            subject_id: [url for url in urls if url in fetch]
+            for subject_id, urls in subject_urls.items()
+        }
+
+
+def payload_fingerprint(response: Response) -> str:
+    """Return the SHA-256 hex digest of a response body."""
+    return hashlib.sha256(response.content).hexdigest()
+
+
+def load_fingerprint(session: Session, name: str = COURSE_LIST_STATE) -> str | None:
+    """Return the fingerprint stored for a resource, if any."""
+    state = session.get(ScrapeState, name)
+    return state.fingerprint if state is not None else None
+
+
+def save_fingerprint(
+    session: Session, fingerprint: str, name: str = COURSE_LIST_STATE
+) -> None:
+    """Store the fingerprint of a resource scraped now."""
+
+    stmt = insert(ScrapeState.__table__).values(
+        name=name, fingerprint=fingerprint, scraped_at=func.now()
+    )
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"fingerprint": fingerprint, "scraped_at": func.now()},
+        )
+    )
+
+
+def plan_fetch(
+    session: Session,
+    subject_urls: dict[str, list[str]],
+    course_list: Response,
+    max_age: datetime.timedelta,
+    base_url: str,
+    now: datetime.datetime | None = None,
+) -> FetchPlan:
+    """Compare the course list with the stored courses of its subjects.
+
+    Only courses of the listed subjects can vanish, so a subject that drops
+    out of the list or is deactivated keeps its courses.
+
+    :param session: SQLAlchemy session
+    :param subject_urls: Course page paths of each subject to load.
+    :param course_list: The list-active-urls response.
+    :param max_age: Age after which a course page is fetched again.
+    :param base_url: URL the paths are relative to.
+    :param now: Current time, the database time if None.
+    """
+
+    fingerprint = payload_fingerprint(course_list)
+    if now is None:
+        now = session.scalar(select(func.now()))
+
+    stmt = select(Course.url, Course.scraped_at).where(
+        Course.subject_id.in_(list(subject_urls))
+    )
+    scraped_at = {url: scraped_at for url, scraped_at in session.execute(stmt)}
+
+    plan = FetchPlan(fingerprint, fingerprint != load_fingerprint(session))
+    listed = set()
+    for urls in subject_urls.values():
+        for path in urls:
+            url = f"{base_url}{path}"
+            listed.add(url)
+            if url not in scraped_at:
+                plan.new.append(path)
+            elif scraped_at[url] is None or now - scraped_at[url] > max_age:
+                plan.stale.append(path)
+    plan.vanished = [url for url in scraped_at if url not in listed]
+
+    return plan
+
+
+def soft_delete_vanished(session: Session, urls: list[str]) -> int:
+    """Soft delete the courses of urls and their offerings.
+
+    :return: Number of rows soft deleted.
+    """
+
+    if not urls:
+        return 0
+
+    course_table = Course.__table__
+    offering_table = Offering.__table__
+    course_ids = select(course_table.c.course_id).where(course_table.c.url.in_(urls))
+
+    return soft_delete_rows(
+        session, offering_table, offering_table.c.course_id.in_(course_ids)
+    ) + soft_delete_rows(session, course_table, course_table.c.url.in_(urls))
+
+
+def mark_scraped(session: Session, urls: list[str]) -> None:
+    """Set the time the courses of fetched urls were scraped to now.
+
+    Fetches are counted, and so are the fetches that found the page changed
+    since it was last scraped, which the refresh scheduler ranks pages by.
+    Unchanged pages are fetched but not loaded, so this is kept out of the
+    upserts, which would otherwise rewrite every fetched course.
+    """
+
+    course_table = Course.__table__
+    changed = course_table.c.scraped_at.is_not(None) & (
+        course_table.c.updated_at > course_table.c.scraped_at
+    )
+    for start in range(0, len(urls), MARK_CHUNK_SIZE):
+        chunk = urls[start : start + MARK_CHUNK_SIZE]
+        session.execute(
+            update(course_table)
+            .where(course_table.c.url.in_(chunk))
+            .values(
+                # after the updates of load workers in other transactions
+                scraped_at=func.clock_timestamp(),
+                fetch_count=course_table.c.fetch_count + 1,
+                change_count=course_table.c.change_count + case((changed, 1), else_=0),
+                # bookkeeping, not a change to the course
+                updated_at=course_table.c.updated_at,
+            )
+        )
@@ -0,0 +1,88 @@
+"""Journal the committed work of a load so a stopped load can be resumed.
+
+Each committed batch, or subject when subjects are loaded in workers, is
+appended to the journal as one JSON line with the urls of the pages done
+since the last line, the prerequisites of its courses, and the urls of
+pages skipped because they failed. Pages skipped as unchanged are done
+too. Prerequisites are loaded after all courses, so a resumed load needs
+those of the courses loaded before it stopped. The journal is removed
+once a load completes.
+"""
+import json
+import os
+import threading
+from collections.abc import Iterable
+
+
+class LoadJournal:
+    """Append-only journal of the batches a load has committed.
+
+    :ivar path: Path of the journal file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> tuple[set[str], list[tuple[int, list]], set[str]]:
+        """Return the urls and prerequisites of the batches journaled so far.
+
+        A line cut short by the load stopping mid-write is dropped, its
+        batch was not journaled.
+
+        :return: Urls of the journaled pages, the prerequisites of each
+            journaled course by course ID, see load_course_rows, and the urls
+            of the journaled pages that failed.
+        """
+
+        urls = set()
+        prereq_keys = []
+        failed = set()
+        if not os.path.exists(self.path):
+            return urls, prereq_keys, failed
+
+        with open(self.path) as file:
+            text = file.read()
+        complete, _, cut_short = text.rpartition("\n")
+        if cut_short:
+            # so the next batch is journaled on a line of its own
+            with open(self.path, "w") as file:
+                file.write(complete + "\n" if complete else "")
+
+        for line in complete.splitlines():
+            entry = json.loads(line)
+            urls.update(entry["urls"])
+            prereq_keys.extend(
+                (course_id, keys) for course_id, keys in entry["prereq_keys"]
+            )
+            failed.update(entry.get("failed", []))
+
+        return urls, prereq_keys, failed
+
+    def record(
+        self,
+        urls: Iterable[str],
+        prereq_keys: list[tuple[int, list]],
+        failed: Iterable[str] = (),
+    ) -> None:
+        """Journal a committed batch, once it is on disk.
+
+        :param urls: Urls of the pages done since the last batch, unchanged
+            pages included.
+        :param prereq_keys: Prerequisites of the batch's courses by course ID.
+        :param failed: Urls of the pages skipped since the last batch because
+            they failed.
+        """
+
+        line = json.dumps(
+            {"urls": list(urls), "prereq_keys": prereq_keys, "failed": list(failed)}
+        )
+        with self._lock, open(self.path, "a") as file:
+            file.write(line + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def remove(self) -> None:
+        """Remove the journal of a completed load."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
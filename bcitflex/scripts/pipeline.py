@@ -0,0 +1,72 @@
+"""Run scraping stages concurrently, connected by bounded queues."""
+import queue
+import threading
+from collections.abc import Iterable, Iterator
+from typing import TypeVar
+
+_T = TypeVar("_T")
+
+QUEUE_SIZE = 32
+
+_DONE = object()
+
+
+class _Failure:
+    """Wrap an exception raised by a stage so it can be re-raised downstream."""
+
+    def __init__(self, exc: BaseException) -> None:
+        self.exc = exc
+
+
+def buffered(iterable: Iterable[_T], maxsize: int = QUEUE_SIZE) -> Iterator[_T]:
+    """Consume an iterable in a background thread and yield its items.
+
+    At most maxsize items are buffered, so a slow consumer blocks the
+    producer instead of letting items pile up in memory.
+    Exceptions raised by the producer are re-raised in the consumer,
+    and closing the consumer stops the producer.
+
+    :param iterable: Stage to run in the background.
+    :param maxsize: Maximum number of buffered items.
+    """
+
+    items = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        """Block until the item is queued or the consumer is closed."""
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+        except BaseException as exc:
+            put(_Failure(exc))
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+            put(_DONE)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,155 @@
+"""Plain records of parsed course pages.
+
+Records hold the same data as the Course, Offering and Meeting models
+but carry no SQLAlchemy state. They are slotted, so they take a fraction
+of the memory of the models and are cheap to pickle and pass between
+processes. The parser emits records, and the loaders write them to the
+database without building models, see to_model for when models are needed.
+"""
+import datetime
+from dataclasses import dataclass, field
+
+from bcitflex.model import Course, Meeting, Offering
+
+
+@dataclass(slots=True)
+class MeetingRecord:
+    meeting_id: int
+    start_date: datetime.date
+    end_date: datetime.date
+    days: frozenset[str] | None
+    start_time: datetime.time | None
+    end_time: datetime.time | None
+    campus: str
+    building: str | None
+    room: str | None
+
+    @classmethod
+    def from_model(cls, meeting: Meeting) -> "MeetingRecord":
+        return cls(
+            meeting_id=meeting.meeting_id,
+            start_date=meeting.start_date,
+            end_date=meeting.end_date,
+            days=frozenset(meeting.days) if meeting.days is not None else None,
+            start_time=meeting.start_time,
+            end_time=meeting.end_time,
+            campus=meeting.campus,
+            building=meeting.building,
+            room=meeting.room,
+        )
+
+    def to_model(self, offering: Offering) -> Meeting:
+        return Meeting(
+            meeting_id=self.meeting_id,
+            start_date=self.start_date,
+            end_date=self.end_date,
+            days=set(self.days) if self.days is not None else None,
+            start_time=self.start_time,
+            end_time=self.end_time,
+            campus=self.campus,
+            building=self.building,
+            room=self.room,
+            deleted_at=None,
+            offering=offering,
+        )
+
+
+@dataclass(slots=True)
+class OfferingRecord:
+    crn: str
+    instructor: str
+    price: float
+    duration: str
+    status: str
+    term_id: str
+    meetings: list[MeetingRecord] = field(default_factory=list)
+
+    @classmethod
+    def from_model(cls, offering: Offering) -> "OfferingRecord":
+        return cls(
+            crn=offering.crn,
+            instructor=offering.instructor,
+            price=offering.price,
+            duration=offering.duration,
+            status=offering.status,
+            term_id=offering.term_id,
+            meetings=[MeetingRecord.from_model(m) for m in offering.meetings],
+        )
+
+    def to_model(self, course: Course) -> Offering:
+        offering = Offering(
+            crn=self.crn,
+            instructor=self.instructor,
+            price=self.price,
+            duration=self.duration,
+            status=self.status,
+            course=course,
+            term_id=self.term_id,
+            deleted_at=None,
+        )
+        for meeting in self.meetings:
+            meeting.to_model(offering)
+        return offering
+
+
+@dataclass(slots=True)
+class OfferingStatusRecord:
+    """Fields of an offering that change between full loads."""
+
+    crn: str
+    term_id: str
+    status: str
+    instructor: str
+
+
+@dataclass(slots=True)
+class CourseRecord:
+    """Parsed course page.
+
+    :ivar course_id: ID of the course, set once the course is loaded.
+    """
+
+    subject_id: str
+    code: str
+    name: str
+    prerequisites_raw: str
+    credits: float
+    url: str
+    page_digest: str | None
+    offerings: list[OfferingRecord] = field(default_factory=list)
+    course_id: int | None = None
+
+    @property
+    def fullcode(self) -> str:
+        return f"{self.subject_id} {self.code}"
+
+    @classmethod
+    def from_model(cls, course: Course) -> "CourseRecord":
+        return cls(
+            subject_id=course.subject_id,
+            code=course.code,
+            name=course.name,
+            prerequisites_raw=course.prerequisites_raw,
+            credits=course.credits,
+            url=course.url,
+            page_digest=course.page_digest,
+            offerings=[OfferingRecord.from_model(o) for o in course.offerings],
+            course_id=course.course_id,
+        )
+
+    def to_model(self) -> Course:
+        course = Course(
+            course_id=self.course_id,
+            subject_id=self.subject_id,
+            code=self.code,
+            name=self.name,
+            prerequisites_raw=self.prerequisites_raw,
+            credits=self.credits,
+            url=self.url,
+            page_digest=self.page_digest,
+            deleted_at=None,
+        )
+        course.offerings = []
+        for offering in self.offerings:
+            offering.to_model(course)
+        return course
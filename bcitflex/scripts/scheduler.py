@@ -0,0 +1,189 @@
+"""Refresh the course pages most likely to have changed, within a request budget.
+
+Offering statuses churn hourly as terms start, while course details change
+a few times a year, so refreshing every page equally spends most requests
+on pages that haven't changed. Each cycle, the scheduler ranks courses by
+how often their page was found changed, how long ago it was fetched and
+how soon their next offering starts, and reloads the top ones with a
+scoped load, see bcit_to_sql.
+"""
+import datetime
+import math
+import time
+from collections.abc import Callable
+
+import click
+from flask import current_app
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from bcitflex.model import Course, Meeting, Offering
+
+from .fetch import MAX_IN_FLIGHT
+from .scrape_and_load import bcit_to_sql
+
+REFRESH_BUDGET = 200
+REFRESH_INTERVAL = 60 * 60
+
+# offerings starting within the horizon make their course up to
+# 1 + TERM_START_WEIGHT times as urgent, the closer the start the more
+TERM_START_HORIZON_DAYS = 42
+TERM_START_WEIGHT = 9.0
+
+
+def refresh_priority(
+    scraped_at: datetime.datetime | None,
+    fetch_count: int,
+    change_count: int,
+    next_start: datetime.date | None,
+    now: datetime.datetime,
+) -> float:
+    """Return how urgently a course page should be fetched again.
+
+    The priority is the expected number of changes since the page was last
+    fetched, from the share of fetches that found it changed, weighted by
+    how soon the next offering of the course starts.
+
+    :param scraped_at: When the page was last fetched.
+    :param fetch_count: Number of times the page was fetched.
+    :param change_count: Number of fetches that found the page changed.
+    :param next_start: Start date of the course's next offering.
+    :param now: Current time.
+    """
+
+    if scraped_at is None:
+        return math.inf
+
+    hours = max((now - scraped_at).total_seconds(), 0) / 3600
+    # smoothed, so pages fetched a few times aren't ranked by chance
+    change_rate = (change_count + 1) / (fetch_count + 2)
+
+    urgency = 1.0
+    if next_start is not None:
+        days = (next_start - now.date()).days
+        if days < TERM_START_HORIZON_DAYS:
+            urgency += TERM_START_WEIGHT * (1 - days / TERM_START_HORIZON_DAYS)
+
+    return change_rate * urgency * hours
+
+
+def plan_refresh(
+    session: Session, budget: int, now: datetime.datetime | None = None
+) -> list[str]:
+    """Return the full codes of the courses to refresh, most urgent first.
+
+    :param session: SQLAlchemy session
+    :param budget: Maximum number of courses to refresh.
+    :param now: Current time, the database time if None.
+    """
+
+    if now is None:
+        now = session.scalar(select(func.now()))
+
+    next_start = (
+        select(Offering.course_id, func.min(Meeting.start_date).label("start_date"))
+        .join(Offering.meetings)
+        .where(Meeting.start_date >= now.date())
+        .group_by(Offering.course_id)
+        .subquery()
+    )
+    stmt = select(
+        Course.subject_id,
+        Course.code,
+        Course.scraped_at,
+        Course.fetch_count,
+        Course.change_count,
+        next_start.c.start_date,
+    ).outerjoin(next_start, next_start.c.course_id == Course.course_id)
+
+    priorities = [
+        (
+            refresh_priority(scraped_at, fetch_count, change_count, start_date, now),
+            f"{subject_id} {code}",
+        )
+        for subject_id, code, scraped_at, fetch_count, change_count, start_date in (
+            session.execute(stmt)
+        )
+    ]
+    priorities.sort(key=lambda priority: priority[0], reverse=True)
+
+    return [fullcode for _, fullcode in priorities[:budget]]
+
+
+def run_scheduler(
+    db_url: str,
+    budget: int = REFRESH_BUDGET,
+    interval: float = REFRESH_INTERVAL,
+    cycles: int | None = None,
+    sleep: Callable[[float], None] = time.sleep,
+    **load_kwargs,
+) -> None:
+    """Refresh the most urgent course pages every interval.
+
+    A failed cycle is reported and the next one runs as planned, so a
+    network drop doesn't stop the scheduler. Courses that are not stored
+    yet are left to load-db.
+
+    :param db_url: Database URL.
+    :param budget: Course pages to fetch per cycle, besides the course list.
+    :param interval: Seconds between the starts of cycles.
+    :param cycles: Number of cycles to run, forever if None.
+    :param sleep: Callable that waits a number of seconds.
+    :param load_kwargs: Keyword arguments of bcit_to_sql.
+    """
+
+    engine = create_engine(db_url)
+    cycle = 0
+    while cycles is None or cycle < cycles:
+        started = time.monotonic()
+        with Session(engine) as session:
+            courses = plan_refresh(session, budget)
+
+        if courses:
+            try:
+                stats = bcit_to_sql(db_url, courses=courses, **load_kwargs)
+            except Exception as exc:
+                print(f"Refresh failed: {exc!r}")
+            else:
+                print(f"Refreshed {stats.pages} pages, loaded {stats.objects} objects.")
+
+        cycle += 1
+        if cycles is None or cycle < cycles:
+            sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+# Flask CLI command
+@click.command("refresh-db")
+@click.option(
+    "--budget",
+    default=REFRESH_BUDGET,
+    show_default=True,
+    help="Course pages to fetch per cycle.",
+)
+@click.option(
+    "--interval",
+    default=REFRESH_INTERVAL // 60,
+    show_default=True,
+    help="Minutes between cycles.",
+)
+@click.option("--cycles", type=int, help="Stop after this many cycles.")
+@click.option(
+    "--max-in-flight",
+    default=MAX_IN_FLIGHT,
+    show_default=True,
+    help="Maximum concurrent page requests.",
+)
+def refresh_db_command(
+    budget: int = REFRESH_BUDGET,
+    interval: int = REFRESH_INTERVAL // 60,
+    cycles: int | None = None,
+    max_in_flight: int = MAX_IN_FLIGHT,
+):
+    """Keep refreshing the course pages most likely to have changed."""
+    run_scheduler(
+        current_app.config["SQLALCHEMY_DATABASE_URI"],
+        budget,
+        interval * 60,
+        cycles,
+        max_in_flight=max_in_flight,
+    )
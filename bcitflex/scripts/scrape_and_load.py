@@ -1,28 +1,152 @@
 """Script to scrape course data and load it to the database. """
 import datetime
+import hashlib
+import multiprocessing
+import os
 import re
+import sys
+import time
 from collections import defaultdict
-from collections.abc import Iterator
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from dataclasses import dataclass, field
 from datetime import date
+from functools import cached_property, lru_cache, partial
 
 import click
-import requests
 from flask import current_app
 from requests import Response
 from selectolax.parser import HTMLParser, Node
-from sqlalchemy import create_engine, or_, select
+from sqlalchemy import Engine, any_, create_engine, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import array
 from sqlalchemy.orm import Session
 
 from bcitflex.model import Course, Meeting, Offering, Subject, Term
 from bcitflex.model.prerequisite import PrerequisiteAnd, PrerequisiteOr
 
+from .archive import PageArchive
+from .cache import ResponseCache
+from .fetch import (
+    MAX_IN_FLIGHT,
+    RETRIES,
+    collect_response,
+    get_page_responses,
+    iter_page_responses,
+)
+from .incremental import (
+    mark_scraped,
+    payload_fingerprint,
+    plan_fetch,
+    save_fingerprint,
+    soft_delete_vanished,
+)
+from .journal import LoadJournal
+from .pipeline import QUEUE_SIZE, buffered
+from .records import CourseRecord, MeetingRecord, OfferingRecord
+from .staging import StagingTables
+from .swap import create_staging_schema, staging_engine, swap_staging_schema
+from .upsert import upsert_courses, upsert_prerequisites
+
+LOAD_BATCH_SIZE = 100
+KEY_CHUNK_SIZE = 10000
+SHARD_ATTEMPTS = 2
+COPY_BATCH_SIZE = 1000
+
 TERMS = {10: "Winter", 20: "Spring/Summer", 30: "Fall"}
 WEEKDAYS = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
 
 BASE_URL = "https://www.bcit.ca"
 COURSE_LIST = "/wp-json/bcit/ptscc/v1/list-active-urls"
 
+COURSE_URL_PATTERN = re.compile(r"([a-z]{4})-(\d{4})/$")
+FULLCODE_PATTERN = re.compile(r"^([A-Za-z]{4})[\s-]*(\d{4})$")
+PREREQUISITE_PATTERN = re.compile(r"((\d\d%).?\sin\s)?([A-Z]{4})\s(\d{4})")
+
+# page sections that courses are parsed from
+DIGEST_SELECTORS = [
+    'h1[class="h1 page-hero__title"]',
+    'div[id="prereq"]',
+    'div[id="credits"]',
+    'div[id="offerings"]',
+]
+
+
+@dataclass
+class ScrapeStats:
+    """Counters and timings of a bcit_to_sql run.
+
+    :ivar pages: Number of course pages fetched.
+    :ivar fetched_urls: Url of each course page fetched.
+    :ivar unchanged_urls: Url of each fetched page skipped as unchanged.
+    :ivar fetch_latencies: Seconds from request to response of each page.
+    :ivar objects: Number of objects loaded.
+    :ivar failures: Pages skipped because they failed, as (url, exception).
+    :ivar load_seconds: Seconds spent loading, excluding waits for parsed courses
+        unless subjects are loaded in workers.
+    :ivar total_seconds: Wall time of the run.
+    """
+
+    pages: int = 0
+    fetched_urls: list[str] = field(default_factory=list)
+    unchanged_urls: list[str] = field(default_factory=list)
+    fetch_latencies: list[float] = field(default_factory=list)
+    objects: int = 0
+    failures: list[tuple[str, Exception]] = field(default_factory=list)
+    load_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.total_seconds if self.total_seconds else 0.0
+
+    def latency_percentile(self, percentile: float) -> float | None:
+        """Return the fetch latency at a percentile between 0 and 100."""
+        if not self.fetch_latencies:
+            return None
+        latencies = sorted(self.fetch_latencies)
+        index = round(percentile / 100 * (len(latencies) - 1))
+        return latencies[index]
+
+    def observe(
+        self, fetcher: Callable[[list[str]], Iterable[Response]]
+    ) -> Callable[[list[str]], Iterator[Response]]:
+        """Return a fetcher that counts responses and their latencies."""
+
+        def fetch(urls: list[str]) -> Iterator[Response]:
+            for response in fetcher(urls):
+                self.pages += 1
+                self.fetched_urls.append(response.url)
+                self.fetch_latencies.append(response.elapsed.total_seconds())
+                yield response
+
+        return fetch
+
+    def add(self, other: "ScrapeStats") -> None:
+        """Add the counters of another run, such as one subject of a sharded load."""
+        self.pages += other.pages
+        self.fetched_urls.extend(other.fetched_urls)
+        self.unchanged_urls.extend(other.unchanged_urls)
+        self.fetch_latencies.extend(other.fetch_latencies)
+        self.objects += other.objects
+        self.failures.extend(other.failures)
+
+    def waited(self, courses: Iterable[CourseRecord]) -> Iterator[CourseRecord]:
+        """Yield courses, subtracting the time spent waiting for them from load_seconds."""
+        iterator = iter(courses)
+        while True:
+            start = time.perf_counter()
+            course = next(iterator, None)
+            self.load_seconds -= time.perf_counter() - start
+            if course is None:
+                return
+            yield course
+
 
 class CoursePage:
     """HTML representation of a course page."""
@@ -30,16 +154,31 @@ class CoursePage:
     def __init__(self, response: Response) -> None:
         self.url: str = response.url
         self.tree: HTMLParser = HTMLParser(response.text)
-        self.term: str = next_term(response)
+        self.digest: str = page_digest(self.tree)
+
+    @cached_property
+    def term(self) -> str:
+        """Next term of the page, looked up on first use as parsing doesn't need it."""
+        return next_term(self.tree)
+
+
+def page_digest(tree: HTMLParser) -> str:
+    """Return the SHA-256 hex digest of the page sections courses are parsed from."""
 
+    digest = hashlib.sha256()
+    for selector in DIGEST_SELECTORS:
+        node = tree.css_first(selector)
+        digest.update(node.html.encode() if node is not None else b"")
+        digest.update(b"\0")
 
-def next_term(response: Response) -> str:
-    """Get the next term from a course response."""
+    return digest.hexdigest()
 
-    html_parser = HTMLParser(response.text)
+
+def next_term(tree: HTMLParser) -> str:
+    """Get the next term from a parsed course page."""
 
     for term in range(30, 0, -10):
-        if html_parser.css_first(f'div[id="{date.today().year}{term}"]') is not None:
+        if tree.css_first(f'div[id="{date.today().year}{term}"]') is not None:
             return f"{date.today().year}{term}"
 
 
@@ -55,44 +194,88 @@ def read_rmp_ids(filename) -> dict[str, str]:
     return rmp_ids
 
 
-def collect_response(url: str) -> Response:
-    """Collect the response from the given URL and return the text."""
+# offering fields keyed by the class attribute of the node they are read from
+OFFERING_FIELD_CLASSES = {
+    "sctn-block-list-item crn": "crn",
+    "sctn-block-list-item duration": "duration",
+    "sctn-block-list-item cost": "price",
+    "sctn-instructor": "instructor",
+    "sctn-status-lbl": "status",
+    "sctn-meets": "meetings",
+    "sctn-no-meets": "no_meetings",
+}
 
-    response = requests.get(url)
 
-    if response.status_code != 200:
-        raise Exception(f"Collect response status code: {response.status_code}")
+def descendants(node: Node) -> Iterator[Node]:
+    """Yield the descendants of a node in document order.
+
+    Node.traverse() is not used because it continues past the end of the node.
+    """
+
+    siblings = []
+    child = node.child
+    while child is not None:
+        yield child
+        if child.child is not None:
+            if child.next is not None:
+                siblings.append(child.next)
+            child = child.child
+        else:
+            child = child.next or (siblings.pop() if siblings else None)
 
-    else:
-        return response
 
+def offering_field_nodes(node: Node) -> dict[str, Node]:
+    """Walk the offering node once and return the first node of each offering field."""
 
-def get_page_responses(urls: list[str]) -> list[Response]:
-    """Get the responses from the given course URLs."""
+    fields = {}
+    for child in descendants(node):
+        field = OFFERING_FIELD_CLASSES.get(child.attributes.get("class"))
+        if field is not None and field not in fields:
+            fields[field] = child
 
-    with ThreadPoolExecutor() as executor:
-        futures = [executor.submit(collect_response, url) for url in urls]
-        responses = [future.result() for future in as_completed(futures)]
+    return fields
 
-    return responses
+
+def parse_instructor(fields: dict[str, Node]) -> str:
+    """Return the instructor of an offering from its field nodes."""
+
+    instructor_node = (
+        fields["instructor"].css_first("p") if "instructor" in fields else None
+    )
+
+    if instructor_node is None:
+        return "Not Available"
+    return instructor_node.text(False)
+
+
+def parse_status(fields: dict[str, Node]) -> str:
+    """Return the status of an offering from its field nodes."""
+
+    status_node = fields.get("status")
+
+    if status_node is None or status_node.tag != "p":
+        return "Available"
+    return status_node.text(False)
 
 
 def parse_offering_node(node: Node, course: Course, term: Term) -> Offering:
     """Parse the offering node and return the offering."""
+    return parse_offering_record(node, term).to_model(course)
+
+
+def parse_offering_record(node: Node, term: Term) -> OfferingRecord:
+    """Parse the offering node and return the offering record with its meetings."""
+
+    fields = offering_field_nodes(node)
 
     # get crn
-    crn = node.css_first('li[class="sctn-block-list-item crn"] span').text(False)
+    crn = fields["crn"].css_first("span").text(False)
 
     # get instructor
-    instructor_node = node.css_first('div[class="sctn-instructor"] p')
-
-    if instructor_node is None:
-        instructor = "Not Available"
-    else:
-        instructor = instructor_node.text(False)
+    instructor = parse_instructor(fields)
 
     # get price
-    price_node = node.css_first("li.sctn-block-list-item.cost div")
+    price_node = fields["price"].css_first("div") if "price" in fields else None
 
     if price_node:
         price_text: str = price_node.text(False)
@@ -102,39 +285,101 @@ def parse_offering_node(node: Node, course: Course, term: Term) -> Offering:
         price = 0
 
     # get duration
-    duration = node.css_first('li[class="sctn-block-list-item duration"]').text(False)
+    duration = fields["duration"].text(False)
 
     # get status
-    status_node = node.css_first('p[class="sctn-status-lbl"]')
-
-    if status_node is None:
-        status = "Available"
+    status = parse_status(fields)
 
-    else:
-        status = status_node.text(False)
-
-    # offering object
-    offering = Offering(
+    # offering record
+    offering = OfferingRecord(
         crn=crn,
         instructor=instructor,
         price=price,
         duration=duration,
         status=status,
-        course=course,
         term_id=term.term_id,
-        deleted_at=None,
     )
 
     # parse meeting times
-    if node.css_first('div[class="sctn-no-meets"] p') is None:
-        for meeting_node in meeting_nodes(node):
-            parse_meeting_node(meeting_node, offering, term)
+    no_meetings = fields.get("no_meetings")
+    if no_meetings is None or no_meetings.css_first("p") is None:
+        # meeting ids are numbered in page order, 1 to n within the offering
+        for meeting_id, meeting_node in enumerate(
+            fields["meetings"].css("tr")[1:], start=1
+        ):
+            offering.meetings.append(
+                parse_meeting_record(meeting_node, term, meeting_id)
+            )
 
     return offering
 
 
-def parse_meeting_node(node: Node, offering: Offering, term: Term) -> Meeting:
-    """Parse the meeting node and return the meeting."""
+@lru_cache(maxsize=None)
+def parse_date(date_str: str, year: int) -> datetime.date:
+    """Parse a meeting date such as "Jan 11" in the given year."""
+    try:
+        meeting_date = datetime.datetime.strptime(date_str, "%b %d").date()
+    except ValueError as err:
+        raise ValueError(f"Invalid date format: {date_str}") from err
+
+    return meeting_date.replace(year=year)
+
+
+@lru_cache(maxsize=None)
+def parse_days(days_str: str) -> frozenset[str] | None:
+    """Parse meeting days such as "Mon - Fri" or "Mon, Wed"."""
+    if days_str == "N/A":
+        return None
+
+    meeting_days = days_str.split(" - ")
+    if len(meeting_days) > 1:
+        # Days: Mon - Fri
+        start, stop = (WEEKDAYS.index(day) for day in meeting_days)
+        meeting_days = WEEKDAYS[start : stop + 1]
+
+    else:
+        # Days: Mon, Wed, Fri
+        meeting_days = days_str.split(", ")
+
+    return frozenset(meeting_days)
+
+
+@lru_cache(maxsize=None)
+def parse_times(time_str: str) -> tuple[datetime.time | None, datetime.time | None]:
+    """Parse a meeting time range such as "18:00 - 21:00"."""
+    if time_str == "N/A":
+        return None, None
+
+    times = [
+        datetime.datetime.strptime(time, "%H:%M").time()
+        for time in time_str.split(" - ")
+    ]
+    return times[0], times[-1]
+
+
+def parse_meeting_node(
+    node: Node, offering: Offering, term: Term, meeting_id: int | None = None
+) -> Meeting:
+    """Parse the meeting node and return the meeting.
+
+    :param node: Meeting table row.
+    :param offering: Offering the meeting belongs to.
+    :param term: Term of the offering.
+    :param meeting_id: Meeting number within the offering, the next one after the
+        offering's meetings if not given.
+    """
+    if meeting_id is None:
+        meeting_id = offering.next_meeting_id()
+    return parse_meeting_record(node, term, meeting_id).to_model(offering)
+
+
+def parse_meeting_record(node: Node, term: Term, meeting_id: int) -> MeetingRecord:
+    """Parse the meeting node and return the meeting record.
+
+    :param node: Meeting table row.
+    :param term: Term of the offering.
+    :param meeting_id: Meeting number within the offering.
+    """
 
     # columns: Dates, Days, Times, Locations
     elements = list(
@@ -145,55 +390,15 @@ def parse_meeting_node(node: Node, offering: Offering, term: Term) -> Meeting:
     )
 
     # parse dates
-    dates = []
-    for date_str in elements[0].split(" - "):
-        try:
-            date = datetime.datetime.strptime(date_str, "%b %d").date()
-        except ValueError as err:
-            raise ValueError(f"Invalid date format: {date_str}") from err
-
-        date = date.replace(year=term.year)
-        dates.append(date)
-
+    dates = [parse_date(date_str, term.year) for date_str in elements[0].split(" - ")]
     start_date = dates[0]
     end_date = dates[-1]
 
     # parse days
-    def parse_days(days_str: str) -> set[str] | None:
-        if days_str == "N/A":
-            return None
-
-        days = set()
-        meeting_days = days_str.split(" - ")
-        if len(meeting_days) > 1:
-            # Days: Mon - Fri
-            start, stop = (WEEKDAYS.index(day) for day in meeting_days)
-            meeting_days = WEEKDAYS[start : stop + 1]
-
-        else:
-            # Days: Mon, Wed, Fri
-            meeting_days = days_str.split(", ")
-
-        for day in meeting_days:
-            days.add(day)
-
-        return days
-
     days = parse_days(elements[1])
 
     # parse time
-    times = []
-    time_str = elements[2]
-
-    if time_str == "N/A":
-        times = [None, None]
-
-    else:
-        for time in time_str.split(" - "):
-            times.append(datetime.datetime.strptime(time, "%H:%M").time())
-
-    start_time = times[0]
-    end_time = times[-1]
+    start_time, end_time = parse_times(elements[2])
 
     # parse location
     location = elements[3].split(" ", maxsplit=2)
@@ -201,8 +406,9 @@ def parse_meeting_node(node: Node, offering: Offering, term: Term) -> Meeting:
     building = location.pop(0) if location else None
     room = location[0] if location else None
 
-    # pass to Meeting and return
-    return Meeting(
+    # pass to MeetingRecord and return
+    return MeetingRecord(
+        meeting_id=meeting_id,
         start_date=start_date,
         end_date=end_date,
         days=days,
@@ -211,44 +417,127 @@ def parse_meeting_node(node: Node, offering: Offering, term: Term) -> Meeting:
         campus=campus,
         building=building,
         room=room,
-        offering=offering,
-        deleted_at=None,
     )
 
 
-def parse_prerequisites(session: Session, course: Course) -> list[PrerequisiteAnd]:
-    """Parse the prerequisite string of a Course and return a list of PrerequisiteAnd objects.
+def parse_prerequisite_keys(
+    course: CourseRecord | Course,
+) -> list[tuple[int, list[tuple[str, str, str | None]]]]:
+    """Parse the prerequisite string of a Course without looking up the courses.
 
-    :param session: SQLAlchemy session
-    :param course: Course object with prerequisites.
+    :param course: Course record or object with prerequisites.
+
+    :return: For each prerequisite that names a course, the prerequisite number
+        and the subject ID, code and criteria of the courses that fulfill it.
     """
 
-    pattern = re.compile(r"((\d\d%).?\sin\s)?([A-Z]{4})\s(\d{4})")
-    prereqs = []
+    prereq_keys = []
 
     for prereq_no, prereq_and_str in enumerate(
         course.prerequisites_raw.split(" and "), 1
     ):
-        prereq_and = PrerequisiteAnd(prereq_no=prereq_no, course_id=course.course_id)
-        prereq_and.set_id(session)
         criteria = None
+        prereq_courses = []
         for prereq_or_str in prereq_and_str.split(" or "):
-            for match in pattern.finditer(prereq_or_str):
+            for match in PREREQUISITE_PATTERN.finditer(prereq_or_str):
                 criteria = match.group(2) or criteria
                 prereq_course_uq_id = (match.group(3), match.group(4))
                 if prereq_course_uq_id == (course.subject_id, course.code):
                     continue
-                prereq_course = Course.get_by_unique(session, prereq_course_uq_id)
-                if not prereq_course:
-                    continue
-                prereq_or = PrerequisiteOr(
-                    prereq_and_id=prereq_and.id,
+                prereq_courses.append((*prereq_course_uq_id, criteria))
+        if prereq_courses:
+            prereq_keys.append((prereq_no, prereq_courses))
+
+    return prereq_keys
+
+
+def build_prerequisites(
+    course: Course, find_course: Callable[[tuple[str, str]], Course | None]
+) -> list[PrerequisiteAnd]:
+    """Return the prerequisites of a Course, leaving out courses that are not found.
+
+    :param course: Course object with prerequisites.
+    :param find_course: Return the course of a subject ID and code, or None.
+    """
+
+    prereqs = []
+
+    for prereq_no, prereq_courses in parse_prerequisite_keys(course):
+        prereq_and = PrerequisiteAnd(prereq_no=prereq_no, course_id=course.course_id)
+        for subject_id, code, criteria in prereq_courses:
+            prereq_course = find_course((subject_id, code))
+            if not prereq_course:
+                continue
+            prereq_and.children.append(
+                PrerequisiteOr(
                     course_id=prereq_course.course_id,
                     criteria=criteria,
                     course=prereq_course,
                 )
-                prereq_or.set_id(session)
-                prereq_and.children.append(prereq_or)
+            )
+        if prereq_and.children:
+            prereqs.append(prereq_and)
+
+    return prereqs
+
+
+def parse_prerequisites(session: Session, course: Course) -> list[PrerequisiteAnd]:
+    """Parse the prerequisite string of a Course and return a list of PrerequisiteAnd objects.
+
+    The prerequisite courses, and the IDs of stored prerequisites, are looked
+    up with one query each rather than one per object.
+
+    :param session: SQLAlchemy session
+    :param course: Course object with prerequisites.
+    """
+
+    prereq_courses = Course.get_many_by_unique(
+        session,
+        [
+            (subject_id, code)
+            for _, keys in parse_prerequisite_keys(course)
+            for subject_id, code, _ in keys
+        ],
+    )
+    prereqs = build_prerequisites(course, prereq_courses.get)
+
+    PrerequisiteAnd.set_ids(session, prereqs)
+    prereq_ors = []
+    for prereq_and in prereqs:
+        for prereq_or in prereq_and.children:
+            prereq_or.prereq_and_id = prereq_and.id
+            prereq_ors.append(prereq_or)
+    PrerequisiteOr.set_ids(session, prereq_ors)
+
+    return prereqs
+
+
+def index_prerequisites(
+    course_id: int,
+    prereq_keys: list[tuple[int, list[tuple[str, str, str | None]]]],
+    course_ids: Mapping[tuple[str, str], int],
+) -> list[PrerequisiteAnd]:
+    """Return the prerequisites of a course, resolving courses with a key index.
+
+    Courses missing from the index are left out. Only IDs are set on the
+    prerequisites, not relationships.
+
+    :param course_id: ID of the course.
+    :param prereq_keys: Prerequisites of the course, see parse_prerequisite_keys.
+    :param course_ids: Course ID by subject ID and code, see load_course_ids.
+    """
+
+    prereqs = []
+
+    for prereq_no, prereq_courses in prereq_keys:
+        prereq_and = PrerequisiteAnd(prereq_no=prereq_no, course_id=course_id)
+        for subject_id, code, criteria in prereq_courses:
+            prereq_course_id = course_ids.get((subject_id, code))
+            if prereq_course_id is None:
+                continue
+            prereq_and.children.append(
+                PrerequisiteOr(course_id=prereq_course_id, criteria=criteria)
+            )
         if prereq_and.children:
             prereqs.append(prereq_and)
 
@@ -257,6 +546,11 @@ def parse_prerequisites(session: Session, course: Course) -> list[PrerequisiteAn
 
 def parse_course_info(page: CoursePage) -> Course:
     """Parse the course info and return the course."""
+    return parse_course_info_record(page).to_model()
+
+
+def parse_course_info_record(page: CoursePage) -> CourseRecord:
+    """Parse the course info and return the course record, without offerings."""
 
     code_and_name = page.tree.css_first('h1[class="h1 page-hero__title"]').text(
         strip=True
@@ -266,20 +560,24 @@ def parse_course_info(page: CoursePage) -> Course:
     prerequisites_str = page.tree.css_first('div[id="prereq"] ul li').text()
     credit_hours = float(page.tree.css_first('div[id="credits"] p').text(False))
 
-    return Course(
+    return CourseRecord(
         subject_id=subject,
         code=code,
         name=name,
         prerequisites_raw=prerequisites_str,
         credits=credit_hours,
         url=page.url,
-        deleted_at=None,
+        page_digest=page.digest,
     )
 
 
 def parse_term_node(term_node: Node) -> Term:
     """Parse the term node and return node."""
-    term_id = term_node.parent.id
+    return parse_term_id(term_node.parent.id)
+
+
+def parse_term_id(term_id: str) -> Term:
+    """Return the term of a term ID such as 202410."""
     year = int(term_id[:4])
     season = TERMS[int(term_id[-2:])]
     return Term(term_id=term_id, year=year, season=season)
@@ -304,19 +602,42 @@ def meeting_nodes(offering_node: Node) -> Iterator[Node]:
 
 def parse_response(response: Response) -> Course:
     """Parse the response and return the course."""
+    return parse_course_page(CoursePage(response))
 
-    course_page = CoursePage(response)
-    course = parse_course_info(course_page)
-    course.offerings = []
 
-    for term_node in term_nodes(course_page):
-        term = parse_term_node(term_node)
-        for offering_node in offering_nodes(term_node):
-            parse_offering_node(offering_node, course, term)
+def parse_course_page(course_page: CoursePage) -> Course:
+    """Parse the course page and return the course."""
+    return parse_course_record(course_page).to_model()
+
+
+def parse_course_record(course_page: CoursePage) -> CourseRecord:
+    """Parse the course page and return the course record."""
+
+    course = parse_course_info_record(course_page)
+
+    for offering_node, term in term_offering_nodes(course_page):
+        course.offerings.append(parse_offering_record(offering_node, term))
 
     return course
 
 
+def term_offering_nodes(course_page: CoursePage) -> Iterator[tuple[Node, Term]]:
+    """Yield the offering nodes of a course page with the term of each."""
+
+    # walk the offerings section: term divs, then offering divs within each term
+    offerings_node = course_page.tree.css_first('div[id="offerings"]')
+    if offerings_node is None:
+        return
+
+    for term_node in offerings_node.iter():
+        if term_node.tag != "div" or not term_node.id:
+            continue
+        term = parse_term_id(term_node.id)
+        for offering_node in term_node.iter():
+            if offering_node.attributes.get("class") == "sctn":
+                yield offering_node, term
+
+
 def prep_db(session: Session):
     """Remove rows from tables in the database and preload term table."""
 
@@ -333,11 +654,16 @@ def scrape_course_urls(bcit_active_urls_url: str) -> dict[str, list[str]]:
     """Return list of urls for each subject_id key."""
 
     course_url_list = collect_response(bcit_active_urls_url)
+    return parse_course_urls(course_url_list)
+
+
+def parse_course_urls(course_url_list: Response) -> dict[str, list[str]]:
+    """Return list of urls for each subject_id key from a list-active-urls response."""
+
     subject_urls = defaultdict(list)
 
     for url in course_url_list.json()["data"]:
-        pattern = re.compile(r"([a-z]{4})-\d{4}/$")
-        match = pattern.search(url)
+        match = COURSE_URL_PATTERN.search(url)
         if match:
             subject_id = match.group(1).upper()
             subject_urls[subject_id] += [url]
@@ -345,11 +671,37 @@ def scrape_course_urls(bcit_active_urls_url: str) -> dict[str, list[str]]:
     return subject_urls
 
 
-def get_course_urls(session: Session, all_subjects: bool = False) -> list[str]:
-    """Get course urls for subjects in the database."""
+def get_course_urls(
+    session: Session,
+    all_subjects: bool = False,
+    subject_urls: dict[str, list[str]] | None = None,
+) -> list[str]:
+    """Get course urls for subjects in the database.
+
+    :param session: SQLAlchemy session
+    :param all_subjects: Include subjects that are not explicitly active.
+    :param subject_urls: Course urls of each subject, scraped from BCIT if None.
+    """
+
+    subject_urls = get_subject_urls(session, all_subjects, subject_urls)
+    return [url for urls in subject_urls.values() for url in urls]
+
+
+def get_subject_urls(
+    session: Session,
+    all_subjects: bool = False,
+    subject_urls: dict[str, list[str]] | None = None,
+) -> dict[str, list[str]]:
+    """Get the course urls of each subject in the database that has courses.
+
+    :param session: SQLAlchemy session
+    :param all_subjects: Include subjects that are not explicitly active.
+    :param subject_urls: Course urls of each subject, scraped from BCIT if None.
+    """
 
     # get subject course urls
-    subject_urls = scrape_course_urls(BASE_URL + COURSE_LIST)
+    if subject_urls is None:
+        subject_urls = scrape_course_urls(BASE_URL + COURSE_LIST)
 
     # read subjects from db
     stmt = select(Subject)
@@ -359,81 +711,883 @@ def get_course_urls(session: Session, all_subjects: bool = False) -> list[str]:
 
     subjects = session.scalars(stmt.where(or_(*clauses))).all()
 
-    # loop over subjects and add to list
-    urls = []
+    return {
+        subject.subject_id: subject_urls[subject.subject_id]
+        for subject in subjects
+        if subject.subject_id in subject_urls
+    }
+
 
-    for subject in subjects:
-        if subject.subject_id in subject_urls.keys():
-            urls.extend(subject_urls[subject.subject_id])
+def get_selected_urls(
+    session: Session,
+    subject_urls: dict[str, list[str]],
+    subjects: Iterable[str] = (),
+    courses: Iterable[str] = (),
+    crns: Iterable[str] = (),
+) -> tuple[dict[str, list[str]], list[str]]:
+    """Get the course urls of selected subjects, courses and offerings.
 
-    return urls
+    Subjects are selected whether they are active or not. A CRN selects the
+    course of each offering with it, in any term.
+
+    :param session: SQLAlchemy session
+    :param subject_urls: Course urls of each subject in the course list.
+    :param subjects: Subject IDs, such as COMP.
+    :param courses: Course full codes, such as COMP 1234.
+    :param crns: Offering CRNs.
 
+    :return: Course urls of each selected subject, and the urls of selected
+        courses that are stored but no longer listed.
+    """
+
+    subjects = {subject_id.upper() for subject_id in subjects}
+    keys = set()
+    for fullcode in courses:
+        match = FULLCODE_PATTERN.match(fullcode.strip())
+        if match is None:
+            raise ValueError(f"Invalid course code: {fullcode}")
+        keys.add((match.group(1).upper(), match.group(2)))
+
+    crns = set(crns)
+    if crns:
+        stmt = (
+            select(Offering.crn, Course.subject_id, Course.code)
+            .join(Offering.course)
+            .where(Offering.crn.in_(crns))
+            .execution_options(include_deleted=True)
+        )
+        found = set()
+        for crn, subject_id, code in session.execute(stmt):
+            found.add(crn)
+            keys.add((subject_id, code))
+        if crns - found:
+            raise ValueError(f"Unknown CRNs: {', '.join(sorted(crns - found))}")
+
+    def selected(subject_id: str, code: str) -> bool:
+        return subject_id in subjects or (subject_id, code) in keys
+
+    selected_urls = defaultdict(list)
+    listed = set()
+    for subject_id, urls in subject_urls.items():
+        for url in urls:
+            code = COURSE_URL_PATTERN.search(url).group(2)
+            listed.add((subject_id, code))
+            if selected(subject_id, code):
+                selected_urls[subject_id].append(url)
+
+    stmt = select(Course.subject_id, Course.code, Course.url).where(
+        or_(
+            Course.subject_id.in_(subjects),
+            tuple_(Course.subject_id, Course.code).in_(keys),
+        )
+    )
+    vanished = [
+        url
+        for subject_id, code, url in session.execute(stmt)
+        if (subject_id, code) not in listed
+    ]
+
+    return dict(selected_urls), vanished
+
+
+def load_course_keys(
+    session: Session,
+) -> tuple[dict[tuple[str, str], int], dict[str, str]]:
+    """Return the course ID index and the stored page digests in one pass.
+
+    Only key columns are selected and rows are streamed in chunks, so no
+    Course objects are loaded and memory grows with the keys alone.
+
+    :param session: SQLAlchemy session
+
+    :return: ID of each course by subject ID and code, soft deleted ones included,
+        and the page digest of each course url that is not soft deleted.
+    """
+
+    stmt = select(
+        Course.course_id,
+        Course.subject_id,
+        Course.code,
+        Course.url,
+        Course.page_digest,
+        Course.deleted_at,
+    ).execution_options(include_deleted=True, yield_per=KEY_CHUNK_SIZE)
+
+    course_ids = {}
+    digests = {}
+    for course_id, subject_id, code, url, digest, deleted_at in session.execute(stmt):
+        # a few subjects are shared by every course
+        course_ids[(sys.intern(subject_id), code)] = course_id
+        if digest is not None and deleted_at is None:
+            digests[url] = digest
+
+    return course_ids, digests
+
+
+def load_course_ids(session: Session) -> dict[tuple[str, str], int]:
+    """Return the ID of each course by subject ID and code, soft deleted ones included."""
+    return load_course_keys(session)[0]
+
+
+def parse_changed_pages(
+    responses: Iterable[Response],
+    digests: dict[str, str],
+    unchanged: list[str] | None = None,
+) -> Iterator[CourseRecord]:
+    """Parse responses into course records, skipping pages that match their stored digest.
+
+    :param responses: Course page responses.
+    :param digests: Stored page digest of each course url.
+    :param unchanged: If given, the url of each skipped page is appended to it.
+    """
 
-def extract_models(urls: list[str]) -> Iterator[Course]:
-    """Extract data for BCIT courses and return as a list of Course objects."""
-    base_url = "https://www.bcit.ca"
-    course_responses = get_page_responses([f"{base_url}{url}" for url in urls])
-    return (parse_response(response) for response in course_responses)
+    for response in responses:
+        course_page = CoursePage(response)
+        if digests.get(course_page.url) == course_page.digest:
+            if unchanged is not None:
+                unchanged.append(course_page.url)
+            continue
+        yield parse_course_record(course_page)
 
 
-def load_courses(session: Session, courses: Iterator[Course]) -> int:
-    """Merge courses into database."""
+def parse_page_record(response: Response, digest: str | None) -> CourseRecord | None:
+    """Parse a response into a course record, or None if its page matches digest.
+
+    Runs in parse worker processes.
+    """
+
+    course_page = CoursePage(response)
+    if course_page.digest == digest:
+        return None
+    return parse_course_record(course_page)
+
+
+def parse_changed_pages_in_pool(
+    responses: Iterable[Response],
+    digests: dict[str, str],
+    workers: int,
+    unchanged: list[str] | None = None,
+) -> Iterator[CourseRecord]:
+    """Parse responses into course records in a pool of worker processes.
+
+    Like parse_changed_pages, but records are yielded in the order parsing
+    finishes and at most two pages per worker are waiting to be parsed.
+    """
+
+    urls = {}
+
+    def courses(futures):
+        for future in futures:
+            record = future.result()
+            url = urls.pop(future)
+            if record is not None:
+                yield record
+            elif unchanged is not None:
+                unchanged.append(url)
+
+    with ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        pending = set()
+        for response in responses:
+            digest = digests.get(response.url)
+            future = executor.submit(parse_page_record, response, digest)
+            urls[future] = response.url
+            pending.add(future)
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from courses(done)
+
+        yield from courses(pending)
+
+
+def extract_models(
+    urls: list[str],
+    fetcher: Callable[[list[str]], Iterable[Response]] = get_page_responses,
+    digests: dict[str, str] | None = None,
+    queue_size: int | None = None,
+    parse_workers: int | None = None,
+    base_url: str = BASE_URL,
+    unchanged: list[str] | None = None,
+) -> Iterator[CourseRecord]:
+    """Extract data for BCIT courses and return it as course records.
+
+    Pages whose digest matches the one stored for their url are unchanged
+    since the last load and are skipped without being parsed.
+    If queue_size is given, fetching and parsing each run in their own
+    thread and hand over results through queues of that size,
+    so the consumer loads courses while later pages are still in flight.
+
+    :param urls: Course page paths relative to the BCIT base url.
+    :param fetcher: Callable that takes full urls and returns their responses.
+    :param digests: Stored page digest of each course url, optional.
+    :param queue_size: Size of the queues between stages, optional.
+    :param parse_workers: Parse pages in this many processes, optional.
+    :param base_url: URL of the site to fetch pages from.
+    :param unchanged: If given, the url of each skipped page is appended to it.
+    """
+    course_responses = fetcher([f"{base_url}{url}" for url in urls])
+
+    def parse(responses):
+        if parse_workers:
+            return parse_changed_pages_in_pool(
+                responses, digests or {}, parse_workers, unchanged
+            )
+        return parse_changed_pages(responses, digests or {}, unchanged)
+
+    if queue_size is None:
+        return parse(course_responses)
+
+    return buffered(parse(buffered(course_responses, queue_size)), queue_size)
+
+
+def load_courses(
+    session: Session,
+    courses: Iterable[CourseRecord],
+    batch_size: int | None = None,
+    course_ids: dict[tuple[str, str], int] | None = None,
+    on_batch: Callable[[list[CourseRecord], list[tuple[int, list]]], None]
+    | None = None,
+    prereq_keys: list[tuple[int, list]] | None = None,
+) -> int:
+    """Upsert courses into database.
+
+    Courses are written with a few set-based statements per batch, and only
+    rows whose data changed are updated, see upsert_courses.
+    Prerequisites are written after all courses, so they can refer to
+    courses loaded later in the same run.
+
+    :param session: SQLAlchemy session
+    :param courses: Courses to load.
+    :param batch_size: Number of courses written per batch, all at once if None.
+    :param course_ids: Index of course IDs to resolve prerequisites with, read
+        from the database if None. Loaded courses are added to it.
+    :param on_batch: Called with each batch of courses once it is written,
+        and their prerequisites, see load_course_rows.
+    :param prereq_keys: Prerequisites of courses loaded by an earlier run,
+        loaded with those of the courses.
+
+    :return: Number of rows written or soft deleted.
+    """
+
+    # write pending terms before offerings refer to them
+    session.flush()
+
+    if course_ids is None:
+        course_ids = load_course_ids(session)
+    known_keys = set(course_ids)
 
     with session.no_autoflush:
-        # read all existing courses into the identity map where merge can find them
-        _ = (
-            session.execute(select(Course), execution_options={"include_deleted": True})
-            .scalars()
-            .all()
+        # phase 1: courses, offerings and meetings
+        object_ct, loaded_prereq_keys = load_course_rows(
+            session, courses, batch_size, course_ids, on_batch
+        )
+
+        # phase 2: prerequisites, against the complete course index, and
+        # those of unchanged courses that name courses stored since
+        prereq_keys = (prereq_keys or []) + loaded_prereq_keys
+        prereq_keys += unresolved_prerequisite_keys(
+            session,
+            course_ids,
+            new_course_keys(course_ids, known_keys, prereq_keys),
+            [course_id for course_id, _ in prereq_keys],
+        )
+        object_ct += load_prerequisites(session, prereq_keys, course_ids, batch_size)
+
+    session.commit()
+
+    return object_ct
+
+
+def load_course_rows(
+    session: Session,
+    courses: Iterable[CourseRecord],
+    batch_size: int | None = None,
+    course_ids: dict[tuple[str, str], int] | None = None,
+    on_batch: Callable[[list[CourseRecord], list[tuple[int, list]]], None]
+    | None = None,
+) -> tuple[int, list[tuple[int, list]]]:
+    """Upsert courses with their offerings and meetings, but not prerequisites.
+
+    :param session: SQLAlchemy session
+    :param courses: Courses to load.
+    :param batch_size: Number of courses written per batch, all at once if None.
+    :param course_ids: Index of course IDs, loaded courses are added to it.
+    :param on_batch: Called with each batch of courses once it is written,
+        and their prerequisites by course ID, such as to commit it.
+
+    :return: Number of rows written or soft deleted, and the prerequisites
+        of each loaded course by course ID, see parse_prerequisite_keys.
+    """
+
+    object_ct = 0
+    if course_ids is None:
+        course_ids = {}
+
+    # prerequisites of the loaded courses, kept without the rest of the course
+    prereq_keys: list[tuple[int, list]] = []
+
+    def load_batch(batch: list[CourseRecord]) -> int:
+        row_ct = upsert_courses(session, batch)
+        batch_prereq_keys = []
+        for course in batch:
+            course_ids[(course.subject_id, course.code)] = course.course_id
+            batch_prereq_keys.append(
+                (course.course_id, parse_prerequisite_keys(course))
+            )
+        prereq_keys.extend(batch_prereq_keys)
+        if on_batch is not None:
+            on_batch(batch, batch_prereq_keys)
+        return row_ct
+
+    batch = []
+    for course in courses:
+        batch.append(course)
+        if batch_size is not None and len(batch) >= batch_size:
+            object_ct += load_batch(batch)
+            batch = []
+    if batch:
+        object_ct += load_batch(batch)
+
+    return object_ct, prereq_keys
+
+
+def new_course_keys(
+    course_ids: Mapping[tuple[str, str], int],
+    known_keys: set[tuple[str, str]],
+    prereq_keys: list[tuple[int, list]] = (),
+) -> set[tuple[str, str]]:
+    """Return the keys of courses that may have been stored by this load.
+
+    :param course_ids: Index of course IDs after loading courses.
+    :param known_keys: Keys of the index before loading courses.
+    :param prereq_keys: Prerequisites of the courses loaded, courses loaded by
+        an earlier run that stopped included, by course ID.
+    """
+
+    loaded = {course_id for course_id, _ in prereq_keys}
+    return {
+        key
+        for key, course_id in course_ids.items()
+        if key not in known_keys or course_id in loaded
+    }
+
+
+def unresolved_prerequisite_keys(
+    session: Session,
+    course_ids: Mapping[tuple[str, str], int],
+    new_keys: Iterable[tuple[str, str]],
+    loaded: Iterable[int] = (),
+) -> list[tuple[int, list]]:
+    """Return the prerequisites of stored courses that name courses stored since.
+
+    A prerequisite naming a course that is not stored is left out when its
+    course is loaded, and unchanged pages are not loaded again, so on each
+    load the stored courses whose prerequisites name a new course are
+    checked against the course index. Only those courses are read.
+
+    :param session: SQLAlchemy session
+    :param course_ids: Index of course IDs to resolve prerequisites with.
+    :param new_keys: Subject ID and code of the courses new to the index.
+    :param loaded: IDs of courses whose prerequisites are already being loaded.
+
+    :return: Prerequisites of each course by course ID whose stored
+        prerequisites lack a course of the index, see parse_prerequisite_keys.
+    """
+
+    new_keys = sorted(new_keys)
+    loaded = set(loaded)
+
+    # courses whose prerequisites name a new course
+    courses = {}
+    for start in range(0, len(new_keys), KEY_CHUNK_SIZE):
+        patterns = [
+            f"%{subject_id} {code}%"
+            for subject_id, code in new_keys[start : start + KEY_CHUNK_SIZE]
+        ]
+        stmt = select(
+            Course.course_id, Course.subject_id, Course.code, Course.prerequisites_raw
+        ).where(Course.prerequisites_raw.like(any_(array(patterns))))
+        for course in session.execute(stmt):
+            if course.course_id not in loaded:
+                courses[course.course_id] = course
+
+    # their stored prerequisites
+    course_list = list(courses)
+    stored = set()
+    for start in range(0, len(course_list), KEY_CHUNK_SIZE):
+        stmt = (
+            select(
+                PrerequisiteAnd.course_id,
+                PrerequisiteAnd.prereq_no,
+                PrerequisiteOr.course_id,
+            )
+            .join(PrerequisiteAnd.children)
+            .where(
+                PrerequisiteAnd.course_id.in_(
+                    course_list[start : start + KEY_CHUNK_SIZE]
+                )
+            )
         )
+        stored.update(session.execute(stmt).all())
+
+    unresolved = []
+    for course in courses.values():
+        keys = parse_prerequisite_keys(course)
+        resolved = {
+            (course.course_id, prereq_no, course_ids[(subject_id, code)])
+            for prereq_no, prereq_courses in keys
+            for subject_id, code, _ in prereq_courses
+            if (subject_id, code) in course_ids
+        }
+        if not resolved <= stored:
+            unresolved.append((course.course_id, keys))
+
+    return unresolved
+
+
+def load_prerequisites(
+    session: Session,
+    prereq_keys: list[tuple[int, list]],
+    course_ids: Mapping[tuple[str, str], int],
+    batch_size: int | None = None,
+) -> int:
+    """Upsert the prerequisites of loaded courses.
 
-        # get course ids and merge
-        for course in courses:
-            course.set_id(session)
-            course.prerequisites = parse_prerequisites(session, course)
-            for offering in course.offerings:
-                offering.set_id(session)
-            session.merge(course)
+    :param session: SQLAlchemy session
+    :param prereq_keys: Prerequisites of each course by course ID, see load_course_rows.
+    :param course_ids: Index of course IDs to resolve prerequisites with.
+    :param batch_size: Number of courses written per batch, all at once if None.
+
+    :return: Number of rows written or soft deleted.
+    """
+
+    object_ct = 0
+
+    step = batch_size or len(prereq_keys) or 1
+    for start in range(0, len(prereq_keys), step):
+        chunk = prereq_keys[start : start + step]
+        prereqs = [
+            prereq
+            for course_id, keys in chunk
+            for prereq in index_prerequisites(course_id, keys, course_ids)
+        ]
+        object_ct += upsert_prerequisites(
+            session, [course_id for course_id, _ in chunk], prereqs
+        )
+
+    return object_ct
+
+
+def load_subject(
+    engine: Engine,
+    urls: list[str],
+    fetcher: Callable[[list[str]], Iterable[Response]],
+    digests: dict[str, str] | None = None,
+    base_url: str = BASE_URL,
+    attempts: int = SHARD_ATTEMPTS,
+) -> tuple[ScrapeStats, dict[tuple[str, str], int], list[tuple[int, list]]]:
+    """Fetch, parse and load the courses of one subject in its own transaction.
+
+    The subject is retried from the start if loading it fails. Prerequisites
+    are not loaded, as they may refer to courses of other subjects.
+
+    :param engine: Engine to connect to the database with.
+    :param urls: Course page paths of the subject.
+    :param fetcher: Callable that takes full urls and returns their responses.
+    :param digests: Stored page digest of each course url, optional.
+    :param base_url: URL of the site to fetch pages from.
+    :param attempts: Number of times to try loading the subject.
+
+    :return: Counters of the subject, the IDs of its loaded courses, and
+        their prerequisites by course ID.
+    """
+
+    for attempt in range(1, attempts + 1):
+        stats = ScrapeStats()
+        with Session(engine) as session:
+            try:
+                courses = extract_models(
+                    urls, stats.observe(fetcher), digests, base_url=base_url
+                )
+                course_ids = {}
+                with session.no_autoflush:
+                    stats.objects, prereq_keys = load_course_rows(
+                        session, courses, LOAD_BATCH_SIZE, course_ids
+                    )
+                session.commit()
+            except Exception:
+                session.rollback()
+                if attempt == attempts:
+                    raise
+            else:
+                return stats, course_ids, prereq_keys
+
+
+def load_subjects(
+    engine: Engine,
+    subject_urls: dict[str, list[str]],
+    fetcher: Callable[[list[str]], Iterable[Response]],
+    course_ids: dict[tuple[str, str], int],
+    digests: dict[str, str] | None,
+    workers: int,
+    stats: ScrapeStats,
+    base_url: str = BASE_URL,
+    journal: LoadJournal | None = None,
+    prereq_keys: list[tuple[int, list]] | None = None,
+) -> None:
+    """Load each subject in its own transaction, sharded across worker connections.
+
+    Prerequisites are loaded in a final pass once all subjects are committed.
+
+    :param engine: Engine to connect to the database with.
+    :param subject_urls: Course page paths of each subject.
+    :param fetcher: Callable that takes full urls and returns their responses.
+    :param course_ids: Index of course IDs, loaded courses are added to it.
+    :param digests: Stored page digest of each course url, optional.
+    :param workers: Number of subjects loaded at once.
+    :param stats: Counters of the run, the subjects' counters are added to it.
+    :param base_url: URL of the site to fetch pages from.
+    :param journal: Journal each subject is recorded in once committed, optional.
+    :param prereq_keys: Prerequisites of courses loaded by an earlier run,
+        loaded with those of the subjects.
+    """
+
+    prereq_keys = list(prereq_keys or [])
+    known_keys = set(course_ids)
+
+    with ThreadPoolExecutor(workers) as executor:
+        futures = {
+            executor.submit(load_subject, engine, urls, fetcher, digests, base_url): {
+                f"{base_url}{url}" for url in urls
+            }
+            for urls in subject_urls.values()
+        }
+        for future in as_completed(futures):
+            try:
+                subject_stats, subject_ids, subject_prereq_keys = future.result()
+            except Exception:
+                # subjects already committed stay loaded
+                executor.shutdown(cancel_futures=True)
+                raise
+            stats.add(subject_stats)
+            course_ids.update(subject_ids)
+            prereq_keys.extend(subject_prereq_keys)
+            if journal is not None:
+                failed = [url for url, _ in stats.failures if url in futures[future]]
+                journal.record(subject_stats.fetched_urls, subject_prereq_keys, failed)
+
+    with Session(engine) as session, session.no_autoflush:
+        prereq_keys += unresolved_prerequisite_keys(
+            session,
+            course_ids,
+            new_course_keys(course_ids, known_keys, prereq_keys),
+            [course_id for course_id, _ in prereq_keys],
+        )
+        stats.objects += load_prerequisites(
+            session, prereq_keys, course_ids, LOAD_BATCH_SIZE
+        )
+        session.commit()
 
-    object_ct = len(session.dirty)
+
+def copy_courses(
+    session: Session,
+    courses: Iterable[CourseRecord],
+    batch_size: int | None = None,
+    course_ids: Mapping[tuple[str, str], int] | None = None,
+) -> int:
+    """Load courses through COPY into staging tables and merge them with SQL.
+
+    :param session: SQLAlchemy session
+    :param courses: Courses to load.
+    :param batch_size: Number of courses copied per batch, all at once if None.
+    :param course_ids: Index of course IDs before the load, read from the
+        database if None.
+
+    :return: Number of rows written or soft deleted.
+    """
+
+    # write pending terms before offerings refer to them
+    session.flush()
+
+    if course_ids is None:
+        course_ids = load_course_ids(session)
+    known_keys = set(course_ids)
+
+    staging = StagingTables(session)
+    for course in courses:
+        staging.add(course, parse_prerequisite_keys(course))
+        if batch_size is not None and staging.pending >= batch_size:
+            staging.copy()
+
+    object_ct = staging.merge()
+
+    # prerequisites of unchanged courses that name courses stored since
+    with session.no_autoflush:
+        course_ids = load_course_ids(session)
+        object_ct += load_prerequisites(
+            session,
+            unresolved_prerequisite_keys(
+                session, course_ids, new_course_keys(course_ids, known_keys)
+            ),
+            course_ids,
+            batch_size,
+        )
 
     session.commit()
 
     return object_ct
 
 
-def bcit_to_sql(db_url: str, all_subjects: bool = False):
-    """Parse BCIT Flex course pages and load them into the SQL database."""
+def bcit_to_sql(
+    db_url: str,
+    all_subjects: bool = False,
+    max_in_flight: int = MAX_IN_FLIGHT,
+    cache_dir: str | None = None,
+    force: bool = False,
+    queue_size: int = QUEUE_SIZE,
+    parse_workers: int | None = None,
+    retries: int = RETRIES,
+    skip_failures: bool = False,
+    archive_dir: str | None = None,
+    record: bool = False,
+    replay: str | None = None,
+    base_url: str = BASE_URL,
+    copy: bool = False,
+    load_workers: int | None = None,
+    swap: bool = False,
+    max_age: datetime.timedelta | None = None,
+    subjects: Iterable[str] = (),
+    courses: Iterable[str] = (),
+    crns: Iterable[str] = (),
+    journal_path: str | None = None,
+) -> ScrapeStats:
+    """Parse BCIT Flex course pages and load them into the SQL database.
+
+    :param db_url: Database URL.
+    :param all_subjects: Include subjects that are not explicitly active.
+    :param max_in_flight: Maximum number of concurrent page requests.
+    :param cache_dir: Directory of the HTTP response cache, no caching if None.
+    :param force: Parse and load pages even if they are unchanged since the last load.
+    :param queue_size: Maximum number of pages and courses buffered between stages.
+    :param parse_workers: Number of processes to parse pages in, parse in-process if None.
+    :param retries: Number of times to retry a throttled or failed page request.
+    :param skip_failures: Report and skip pages that still fail instead of aborting.
+    :param archive_dir: Directory of the page archive, required to record or replay.
+    :param record: Record fetched pages to the archive.
+    :param replay: Name of an archived crawl, or "latest", to load instead of
+        fetching pages.
+    :param base_url: URL of the site to scrape.
+    :param copy: Load through COPY into staging tables instead of batched upserts.
+    :param load_workers: Load this many subjects at once, each in its own
+        connection and transaction, see load_subjects. Everything is loaded
+        in one transaction if None.
+    :param swap: Load into a copy of the catalogue in a staging schema, and
+        swap it live once validated, see swap.py. The live catalogue is not
+        touched if the load or the validation fails.
+    :param max_age: Only fetch new course pages and those fetched longer ago
+        than this, and soft delete courses no longer listed, see
+        incremental.py. All course pages are fetched if None or forced.
+        The run returns without staging, loading or swapping anything if
+        the course list is unchanged and no page is stale.
+    :param subjects: Only load the courses of these subject IDs.
+    :param courses: Only load these courses, by full code.
+    :param crns: Only load the courses of the offerings with these CRNs.
+        Only the selected courses are soft deleted if they are no longer
+        listed, whether the course list changed is not recorded, and the
+        maximum age is ignored.
+    :param journal_path: Commit each batch, or subject with load workers, and
+        record it in a journal at this path, see journal.py. Pages recorded
+        by an earlier run that stopped are skipped, and the journal is
+        removed once the run completes.
+
+    :return: Counters and timings of the run.
+    """
+
+    started = time.perf_counter()
+    stats = ScrapeStats()
+    cache = ResponseCache(cache_dir) if cache_dir is not None else None
+    failures = stats.failures if skip_failures else None
+    archive = PageArchive(archive_dir) if archive_dir is not None else None
+    if (record or replay) and archive is None:
+        raise ValueError("An archive directory is required to record or replay.")
+    if load_workers and (copy or parse_workers):
+        raise ValueError("Load workers can't be combined with COPY or parse workers.")
+    if journal_path is not None and (copy or swap):
+        raise ValueError("A journaled load can't be combined with COPY or a swap.")
+    journal = LoadJournal(journal_path) if journal_path is not None else None
+
+    fetcher = partial(
+        iter_page_responses,
+        # the subjects being loaded share the requests in flight
+        max_in_flight=max(1, max_in_flight // (load_workers or 1)),
+        cache=cache,
+        retries=retries,
+        failures=failures,
+    )
+    recorder = archive.record() if record else None
+
+    if replay:
+        crawl = archive.replay(replay)
+        course_url_list = crawl.course_list()
+        fetcher = crawl.fetch
 
-    # check response status
-    collect_response(BASE_URL)
+    else:
+        # check response status
+        collect_response(base_url)
+        course_url_list = collect_response(base_url + COURSE_LIST)
+
+    if recorder is not None:
+        recorder.add_course_list(course_url_list)
+        fetcher = recorder.wrap(fetcher)
+    # subjects loaded in workers count their own pages
+    subject_fetcher = fetcher
+    fetcher = stats.observe(fetcher)
+
+    # get urls, and plan the fetch before anything is staged
+    scoped = bool(subjects or courses or crns)
+    fingerprint = payload_fingerprint(course_url_list)
+    vanished = []
+    live_engine = create_engine(db_url)
+    with Session(live_engine) as live_session:
+        if scoped:
+            subject_urls, vanished = get_selected_urls(
+                live_session,
+                parse_course_urls(course_url_list),
+                subjects,
+                courses,
+                crns,
+            )
+        else:
+            subject_urls = get_subject_urls(
+                live_session, all_subjects, parse_course_urls(course_url_list)
+            )
+        if max_age is not None and not force and not scoped:
+            plan = plan_fetch(
+                live_session, subject_urls, course_url_list, max_age, base_url
+            )
+            if plan.is_noop:
+                # nothing to load, stage or swap in
+                print("Course list unchanged and no pages are stale.")
+                stats.total_seconds = time.perf_counter() - started
+                return stats
+            subject_urls = plan.subject_urls(subject_urls)
+            vanished = plan.vanished
 
     # begin a non-ORM transaction
     # [2023-10-21 Jonathan B.]
     #   I don't believe there is actually any need to use a non-ORM transaction here.
     #   Regular session should work just fine.
-    engine = create_engine(db_url)
+    pool_size = max(5, (load_workers or 0) + 1)
+    if swap:
+        with live_engine.begin() as live_connection:
+            create_staging_schema(live_connection)
+        engine = staging_engine(db_url, pool_size=pool_size)
+    else:
+        engine = create_engine(db_url, pool_size=pool_size)
     connection = engine.connect()
     trans = connection.begin()
 
     # bind an individual Session to the connection with "create_savepoint"
     session = Session(bind=connection, join_transaction_mode="create_savepoint")
 
+    # number of unchanged and failed pages journaled so far
+    unchanged_ct = failed_ct = 0
+
+    def commit_batch(
+        batch: list[CourseRecord], batch_prereq_keys: list[tuple[int, list]]
+    ) -> None:
+        nonlocal trans, unchanged_ct, failed_ct
+        session.commit()
+        trans.commit()
+        trans = connection.begin()
+        # unchanged and failed pages have nothing to write, so they are done
+        # once seen, even if pages fetched before them are not loaded yet
+        unchanged = stats.unchanged_urls[unchanged_ct:]
+        failed = [url for url, _ in stats.failures[failed_ct:]]
+        unchanged_ct += len(unchanged)
+        failed_ct += len(failed)
+        journal.record(
+            [course.url for course in batch] + unchanged, batch_prereq_keys, failed
+        )
+
     try:
         # delete existing rows in tables
         prep_db(session)
 
-        # get urls
-        urls = get_course_urls(session, all_subjects)
-
-        # get courses
-        courses = extract_models(urls)
+        # skip pages committed by an earlier run that stopped
+        journaled_urls, prereq_keys, journaled_failed = set(), [], set()
+        if journal is not None:
+            journaled_urls, prereq_keys, journaled_failed = journal.load()
+            done = journaled_urls | journaled_failed
+            if done:
+                print(f"Resuming, skipping {len(done)} loaded or failed pages.")
+            subject_urls = {
+                subject_id: [u for u in urls if f"{base_url}{u}" not in done]
+                for subject_id, urls in subject_urls.items()
+            }
+        urls = [url for urls in subject_urls.values() for url in urls]
+
+        # get courses, skipping unchanged pages
+        course_ids, digests = load_course_keys(session)
+        if force:
+            digests = None
+        if not load_workers:
+            records = extract_models(
+                urls,
+                fetcher,
+                digests,
+                queue_size,
+                parse_workers,
+                base_url,
+                stats.unchanged_urls,
+            )
 
         # load
-        count = load_courses(session, courses)
+        load_started = time.perf_counter()
+        if load_workers:
+            # commit the terms before the workers' connections refer to them
+            session.commit()
+            trans.commit()
+            trans = connection.begin()
+            load_subjects(
+                engine,
+                subject_urls,
+                subject_fetcher,
+                course_ids,
+                digests,
+                load_workers,
+                stats,
+                base_url,
+                journal,
+                prereq_keys,
+            )
+        elif copy:
+            stats.objects = copy_courses(
+                session, stats.waited(records), COPY_BATCH_SIZE, course_ids
+            )
+        else:
+            stats.objects = load_courses(
+                session,
+                stats.waited(records),
+                LOAD_BATCH_SIZE,
+                course_ids,
+                commit_batch if journal is not None else None,
+                prereq_keys,
+            )
+        stats.load_seconds += time.perf_counter() - load_started
+
+        # remember what was fetched for the next incremental run
+        stats.objects += soft_delete_vanished(session, vanished)
+        mark_scraped(session, stats.fetched_urls + list(journaled_urls))
+        if not scoped:
+            save_fingerprint(session, fingerprint)
+        session.commit()
 
         # log
-        print(f"Successfully loaded {count} objects.")
+        print(f"Successfully loaded {stats.objects} objects.")
+        for url, exc in stats.failures:
+            print(f"Skipped {url}: {exc}")
 
     except Exception as exc:
         trans.rollback()
@@ -443,12 +1597,141 @@ def bcit_to_sql(db_url: str, all_subjects: bool = False):
     else:
         trans.commit()
         connection.close()
+        if journal is not None:
+            journal.remove()
+
+    finally:
+        # keep the recording even if loading failed, so it can be replayed
+        if recorder is not None:
+            recorder.save()
+            print(f"Recorded crawl {recorder.name}.")
+
+    if swap:
+        swap_staging_schema(live_engine)
+        print("Swapped in the staged catalogue.")
+
+    stats.total_seconds = time.perf_counter() - started
+    return stats
 
 
 # Flask CLI command
 @click.command("load-db")
 @click.option("--all-subjects", "-a", is_flag=True, help="Load all subjects.")
-def load_db_command(all_subjects: bool = False):
+@click.option(
+    "--max-in-flight",
+    default=MAX_IN_FLIGHT,
+    show_default=True,
+    help="Maximum concurrent page requests.",
+)
+@click.option("--no-cache", is_flag=True, help="Don't use the HTTP response cache.")
+@click.option("--force", "-f", is_flag=True, help="Reload unchanged pages.")
+@click.option(
+    "--parse-workers",
+    type=int,
+    help="Parse pages in this many processes.   [default: parse in-process]",
+)
+@click.option(
+    "--retries",
+    default=RETRIES,
+    show_default=True,
+    help="Retries of throttled or failed page requests.",
+)
+@click.option(
+    "--skip-failures", is_flag=True, help="Skip pages that fail instead of aborting."
+)
+@click.option("--record", is_flag=True, help="Record fetched pages to the archive.")
+@click.option(
+    "--replay",
+    is_flag=False,
+    flag_value="latest",
+    metavar="[CRAWL]",
+    help="Load an archived crawl instead of fetching pages.   [default: latest]",
+)
+@click.option("--copy", is_flag=True, help="Load through COPY into staging tables.")
+@click.option(
+    "--load-workers",
+    type=int,
+    help="Load this many subjects at once, each in its own transaction.",
+)
+@click.option(
+    "--swap",
+    is_flag=True,
+    help="Load into a staging schema and swap it live once validated.",
+)
+@click.option(
+    "--max-age",
+    type=float,
+    help="Only fetch new pages and pages older than this many hours.",
+)
+@click.option(
+    "--subject",
+    "subjects",
+    multiple=True,
+    help="Only load the courses of this subject, such as COMP. Repeatable.",
+)
+@click.option(
+    "--course",
+    "courses",
+    multiple=True,
+    help="Only load this course, such as 'COMP 1234'. Repeatable.",
+)
+@click.option(
+    "--crn",
+    "crns",
+    multiple=True,
+    help="Only load the course of the offering with this CRN. Repeatable.",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Commit as pages load and continue a --resume run that stopped.",
+)
+def load_db_command(
+    all_subjects: bool = False,
+    max_in_flight: int = MAX_IN_FLIGHT,
+    no_cache: bool = False,
+    force: bool = False,
+    parse_workers: int | None = None,
+    retries: int = RETRIES,
+    skip_failures: bool = False,
+    record: bool = False,
+    replay: str | None = None,
+    copy: bool = False,
+    load_workers: int | None = None,
+    swap: bool = False,
+    max_age: float | None = None,
+    subjects: tuple[str, ...] = (),
+    courses: tuple[str, ...] = (),
+    crns: tuple[str, ...] = (),
+    resume: bool = False,
+):
     """Get data and replace what's in the database."""
     db_url = current_app.config["SQLALCHEMY_DATABASE_URI"]
-    bcit_to_sql(db_url, all_subjects)
+    cache_dir = (
+        None if no_cache else os.path.join(current_app.instance_path, "http_cache")
+    )
+    bcit_to_sql(
+        db_url,
+        all_subjects,
+        max_in_flight,
+        cache_dir,
+        force,
+        parse_workers=parse_workers,
+        retries=retries,
+        skip_failures=skip_failures,
+        archive_dir=os.path.join(current_app.instance_path, "archive"),
+        record=record,
+        replay=replay,
+        copy=copy,
+        load_workers=load_workers,
+        swap=swap,
+        max_age=datetime.timedelta(hours=max_age) if max_age is not None else None,
+        subjects=subjects,
+        courses=courses,
+        crns=crns,
+        journal_path=(
+            os.path.join(current_app.instance_path, "load_journal.jsonl")
+            if resume
+            else None
+        ),
+    )
@@ -0,0 +1,293 @@
+"""Local stand-in for the BCIT website to benchmark the scraper against."""
+import datetime
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COURSE_LIST = "/wp-json/bcit/ptscc/v1/list-active-urls"
+COURSE_PATH = re.compile(r"^/courses/[a-z-]+-([a-z]{4})-(\d{4})/$")
+SIMULATOR_HOST = "127.0.0.1"
+
+SEASONS = {
+    10: ("Winter", "wtr", 1),
+    20: ("Spring/Summer", "spr", 4),
+    30: ("Fall", "fll", 9),
+}
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Mon - Fri", "Mon, Wed", "Tue, Thu"]
+STATUSES = [None, None, None, "Full", "Waitlist", "In Progress"]
+CAMPUSES = [("Burnaby", "SE12"), ("Downtown", "DTC"), ("Online", None)]
+WORDS = ["Applied", "Business", "Data", "Design", "Systems", "Networks", "Analysis"]
+
+
+def read_subject_ids() -> list[str]:
+    """Return the subject IDs loaded by load-subjects."""
+    filename = os.path.join(os.path.dirname(__file__), "populate_subject.sql")
+    with open(filename, "r") as f:
+        return re.findall(r"\('([A-Z]{4})'", f.read())
+
+
+class BCITSimulator:
+    """Serve synthetic course pages in the BCIT markup over HTTP.
+
+    Course pages are generated on request from the course number and seed,
+    so any scale can be served without holding pages in memory.
+    Pages can also be rendered without serving them, see course_page.
+    Pages carry an ETag and answer If-None-Match with 304 Not Modified.
+
+    :ivar courses: Number of courses served.
+    :ivar latency: Seconds to wait before answering each request.
+    :ivar error_rate: Fraction of page requests answered with 500.
+    :ivar throttle_rate: Fraction of page requests answered with 429.
+    """
+
+    def __init__(
+        self,
+        courses: int = 1000,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        seed: int = 0,
+        host: str = SIMULATOR_HOST,
+        port: int = 0,
+    ) -> None:
+        self.courses = courses
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.seed = seed
+        self.subject_ids = read_subject_ids()
+        self.year = datetime.date.today().year
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.address = (host, port)
+        self.server = None
+        self.course_page = lru_cache(maxsize=1024)(self._render_course_page)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "BCITSimulator":
+        """Start serving in a background thread."""
+        self.server = ThreadingHTTPServer(self.address, self._handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "BCITSimulator":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def course_key(self, number: int) -> tuple[str, str]:
+        """Return the subject ID and code of a course number."""
+        subject_count = len(self.subject_ids)
+        return self.subject_ids[number % subject_count], str(
+            1000 + number // subject_count
+        )
+
+    def course_number(self, subject_id: str, code: str) -> int | None:
+        """Return the course number of a subject ID and code, None if not served."""
+        if subject_id not in self.subject_ids:
+            return None
+        number = (int(code) - 1000) * len(self.subject_ids) + self.subject_ids.index(
+            subject_id
+        )
+        return number if 0 <= number < self.courses else None
+
+    def course_path(self, number: int) -> str:
+        subject_id, code = self.course_key(number)
+        return f"/courses/course-{subject_id.lower()}-{code}/"
+
+    def course_list(self) -> bytes:
+        paths = [self.course_path(number) for number in range(self.courses)]
+        return json.dumps({"success": True, "data": paths}).encode()
+
+    def _render_course_page(self, number: int) -> bytes:
+        """Render the course page of a course number."""
+        rng = random.Random(self.seed * 1_000_003 + number)
+        subject_id, code = self.course_key(number)
+        name = " ".join(rng.sample(WORDS, 3))
+
+        # prerequisites reference earlier courses so chains resolve within a load
+        prereqs = [
+            " or ".join(
+                "60% in {} {}".format(*self.course_key(rng.randrange(number)))
+                for _ in range(rng.randint(1, 2))
+            )
+            for _ in range(rng.randint(0, 2) if number else 0)
+        ]
+        prereq_str = (
+            " and ".join(prereqs) or "No prerequisites are required for this course."
+        )
+
+        terms = sorted(rng.sample(list(SEASONS), rng.randint(1, 2)))
+        term_html = "".join(self._term_html(rng, season) for season in terms)
+        nav_html = "".join(
+            f'<li class="crse-term-nav-{SEASONS[s][1]}"><a href="#{self.year}{s}">{SEASONS[s][0]} {self.year}</a></li>'
+            for s in terms
+        )
+
+        return f"""<!DOCTYPE html>
+<html><head><title>{name} | BCIT</title></head><body>
+<h1 class="h1 page-hero__title">{name} <span>{subject_id} {code}</span></h1>
+<div id="prereq">
+  <h3>Prerequisite(s)</h3>
+  <p></p><ul><li data-src="preqs">{prereq_str}</li></ul><p></p>
+</div>
+<div id="credits">
+  <h3>Credits</h3>
+  <p>{rng.choice([1.5, 3.0, 4.0])}</p>
+</div>
+<div id="offerings" class="crse-sctns">
+  <ul class="crse-term-nav">{nav_html}</ul>
+  {term_html}
+</div>
+</body></html>
+""".encode()
+
+    def _term_html(self, rng: random.Random, season: int) -> str:
+        name, short, month = SEASONS[season]
+        sections = "".join(
+            self._offering_html(rng, month) for _ in range(rng.randint(1, 4))
+        )
+        return f"""
+  <div id="{self.year}{season}" class="crse-term crse-term-{short}">
+    <h3 class="a11y-visual-hide">{name} {self.year}</h3>
+    {sections}
+  </div>"""
+
+    def _offering_html(self, rng: random.Random, month: int) -> str:
+        crn = rng.randrange(10000, 100000)
+        price = rng.randrange(20000, 90000) / 100
+        status = rng.choice(STATUSES)
+        status_html = f'<p class="sctn-status-lbl">{status}</p>' if status else ""
+        start = datetime.date(self.year, month, rng.randint(1, 20))
+        end = start + datetime.timedelta(weeks=rng.randint(6, 12))
+        rows = "".join(
+            self._meeting_html(rng, start, end) for _ in range(rng.randint(1, 2))
+        )
+        return f"""
+    <div class="sctn">
+      <h4 class="sctn-crn a11y-visual-hide">CRN {crn}</h4>
+      <div class="sctn-block sctn-block-cost-crn-duration">
+        <ul class="sctn-block-list">
+          <li class="sctn-block-list-item duration">{(end - start).days // 7} weeks</li>
+          <li class="sctn-block-list-item crn">CRN <span>{crn}</span></li>
+          <li class="sctn-block-list-item cost"><div><span>Domestic fees</span> ${price}</div></li>
+        </ul>
+      </div>
+      <div class="sctn-meets">
+        <h5>Class meeting times</h5>
+        <table>
+          <thead><tr><th>Dates</th><th>Days</th><th>Times</th><th>Locations</th></tr></thead>
+          <tbody>{rows}</tbody>
+        </table>
+      </div>
+      <div class="sctn-instructor">
+        <h5>Instructor</h5>
+        <p>Instructor {rng.randrange(1000)}</p>
+      </div>
+      <div class="sctn-status ">{status_html}</div>
+    </div>"""
+
+    def _meeting_html(
+        self, rng: random.Random, start: datetime.date, end: datetime.date
+    ) -> str:
+        campus, building = rng.choice(CAMPUSES)
+        if building is None:
+            days = times = "<small>N/A</small>"
+            location = f'<a href="/distance/" class="sctn-online">{campus}</a>'
+        else:
+            days = rng.choice(DAYS)
+            hour = rng.randint(8, 18)
+            times = f"{hour:02d}:00 - {hour + 3:02d}:00"
+            location = (
+                f'<a href="/" class="sctn-campus">{campus}</a> '
+                f'<span class="sctn-building">{building}</span> '
+                f'<span class="sctn-room">Rm. {rng.randint(100, 999)}</span>'
+            )
+        return f"""
+            <tr>
+              <td><span>{start:%b %d} -</span> <span>{end:%b %d}</span></td>
+              <td>{days}</td>
+              <td>{times}</td>
+              <td>{location}</td>
+            </tr>"""
+
+    def _fault(self) -> int | None:
+        """Return an injected error status for a page request, if any."""
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 500
+        return None
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep connections alive like the real site
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def send(
+                self,
+                status: int,
+                body: bytes = b"",
+                content_type: str = "text/html",
+                etag: str | None = None,
+            ):
+                self.send_response(status)
+                self.send_header("Content-Type", f"{content_type}; charset=UTF-8")
+                self.send_header("Content-Length", str(len(body)))
+                if etag is not None:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if site.latency:
+                    time.sleep(site.latency)
+
+                if self.path == "/":
+                    return self.send(200, b"<html></html>")
+                if self.path == COURSE_LIST:
+                    return self.send(200, site.course_list(), "application/json")
+
+                match = COURSE_PATH.match(self.path)
+                number = (
+                    site.course_number(match.group(1).upper(), match.group(2))
+                    if match
+                    else None
+                )
+                if number is None:
+                    return self.send(404)
+
+                fault = site._fault()
+                if fault is not None:
+                    return self.send(fault)
+
+                body = site.course_page(number)
+                etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    return self.send(304, etag=etag)
+                return self.send(200, body, etag=etag)
+
+        return Handler
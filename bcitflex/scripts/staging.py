@@ -0,0 +1,398 @@
+"""Load parsed courses through COPY into staging tables and merge them with SQL.
+
+Parsed rows are streamed into temporary staging tables with the COPY
+protocol, a batch at a time. Rows refer to each other by their unique keys
+instead of IDs, so nothing is looked up while loading. Once all courses are
+staged, a handful of set-based statements insert new rows, update changed
+rows and soft delete rows of the staged courses that are no longer on the
+course pages.
+"""
+import datetime
+import io
+from collections.abc import Iterable
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from bcitflex.model import Course
+
+from .records import CourseRecord
+
+STAGING_TABLES = {
+    "staging_course": [
+        "subject_id",
+        "code",
+        "name",
+        "prerequisites_raw",
+        "credits",
+        "url",
+        "page_digest",
+    ],
+    "staging_offering": [
+        "subject_id",
+        "code",
+        "crn",
+        "term_id",
+        "instructor",
+        "price",
+        "duration",
+        "status",
+    ],
+    "staging_meeting": [
+        "crn",
+        "term_id",
+        "meeting_id",
+        "start_date",
+        "end_date",
+        "days",
+        "start_time",
+        "end_time",
+        "campus",
+        "building",
+        "room",
+    ],
+    "staging_prerequisite": [
+        "subject_id",
+        "code",
+        "prereq_no",
+        "prereq_subject_id",
+        "prereq_code",
+        "criteria",
+    ],
+}
+
+# temporary tables are never WAL-logged and are private to the loading connection;
+# seq orders rows as they were parsed so the last of duplicate rows wins
+CREATE_STAGING_TABLES = """
+DROP TABLE IF EXISTS staging_course, staging_offering, staging_meeting,
+    staging_prerequisite;
+
+CREATE TEMPORARY TABLE staging_course (
+    seq BIGSERIAL,
+    subject_id VARCHAR(4),
+    code VARCHAR(4),
+    name VARCHAR(100),
+    prerequisites_raw TEXT,
+    credits REAL,
+    url VARCHAR(2083),
+    page_digest VARCHAR(64)
+) ON COMMIT DROP;
+
+CREATE TEMPORARY TABLE staging_offering (
+    seq BIGSERIAL,
+    subject_id VARCHAR(4),
+    code VARCHAR(4),
+    crn VARCHAR(5),
+    term_id VARCHAR,
+    instructor VARCHAR(30),
+    price NUMERIC,
+    duration VARCHAR(30),
+    status VARCHAR(30)
+) ON COMMIT DROP;
+
+CREATE TEMPORARY TABLE staging_meeting (
+    seq BIGSERIAL,
+    crn VARCHAR(5),
+    term_id VARCHAR,
+    meeting_id INTEGER,
+    start_date DATE,
+    end_date DATE,
+    days VARCHAR(3)[],
+    start_time TIME,
+    end_time TIME,
+    campus VARCHAR(30),
+    building VARCHAR(10),
+    room VARCHAR(10)
+) ON COMMIT DROP;
+
+CREATE TEMPORARY TABLE staging_prerequisite (
+    seq BIGSERIAL,
+    subject_id VARCHAR(4),
+    code VARCHAR(4),
+    prereq_no INTEGER,
+    prereq_subject_id VARCHAR(4),
+    prereq_code VARCHAR(4),
+    criteria VARCHAR
+) ON COMMIT DROP;
+"""
+
+MERGE_STATEMENTS = [
+    # temporary tables are not analyzed automatically
+    """
+    ANALYZE staging_course, staging_offering, staging_meeting, staging_prerequisite
+    """,
+    """
+    INSERT INTO course (subject_id, code, name, prerequisites_raw, credits, url, page_digest)
+    SELECT DISTINCT ON (subject_id, code)
+        subject_id, code, name, prerequisites_raw, credits, url, page_digest
+    FROM staging_course
+    ORDER BY subject_id, code, seq DESC
+    ON CONFLICT (subject_id, code) DO UPDATE SET
+        name = excluded.name,
+        prerequisites_raw = excluded.prerequisites_raw,
+        credits = excluded.credits,
+        url = excluded.url,
+        page_digest = excluded.page_digest,
+        updated_at = NOW(),
+        deleted_at = NULL
+    WHERE course.deleted_at IS NOT NULL
+        OR (course.name, course.prerequisites_raw, course.credits, course.url,
+            course.page_digest)
+        IS DISTINCT FROM (excluded.name, excluded.prerequisites_raw,
+            excluded.credits, excluded.url, excluded.page_digest)
+    """,
+    """
+    INSERT INTO offering (crn, term_id, instructor, price, duration, status, course_id)
+    SELECT DISTINCT ON (s.crn, s.term_id)
+        s.crn, s.term_id, s.instructor, s.price, s.duration, s.status, c.course_id
+    FROM staging_offering s
+    JOIN course c ON (c.subject_id, c.code) = (s.subject_id, s.code)
+    ORDER BY s.crn, s.term_id, s.seq DESC
+    ON CONFLICT (crn, term_id) DO UPDATE SET
+        instructor = excluded.instructor,
+        price = excluded.price,
+        duration = excluded.duration,
+        status = excluded.status,
+        course_id = excluded.course_id,
+        updated_at = NOW(),
+        deleted_at = NULL
+    WHERE offering.deleted_at IS NOT NULL
+        OR (offering.instructor, offering.price, offering.duration, offering.status,
+            offering.course_id)
+        IS DISTINCT FROM (excluded.instructor, excluded.price, excluded.duration,
+            excluded.status, excluded.course_id)
+    """,
+    """
+    INSERT INTO meeting (offering_id, meeting_id, start_date, end_date, days,
+        start_time, end_time, campus, building, room)
+    SELECT DISTINCT ON (o.offering_id, s.meeting_id)
+        o.offering_id, s.meeting_id, s.start_date, s.end_date, s.days,
+        s.start_time, s.end_time, s.campus, s.building, s.room
+    FROM staging_meeting s
+    JOIN offering o ON (o.crn, o.term_id) = (s.crn, s.term_id)
+    ORDER BY o.offering_id, s.meeting_id, s.seq DESC
+    ON CONFLICT (offering_id, meeting_id) DO UPDATE SET
+        start_date = excluded.start_date,
+        end_date = excluded.end_date,
+        days = excluded.days,
+        start_time = excluded.start_time,
+        end_time = excluded.end_time,
+        campus = excluded.campus,
+        building = excluded.building,
+        room = excluded.room,
+        deleted_at = NULL
+    WHERE meeting.deleted_at IS NOT NULL
+        OR (meeting.start_date, meeting.end_date, meeting.days, meeting.start_time,
+            meeting.end_time, meeting.campus, meeting.building, meeting.room)
+        IS DISTINCT FROM (excluded.start_date, excluded.end_date, excluded.days,
+            excluded.start_time, excluded.end_time, excluded.campus,
+            excluded.building, excluded.room)
+    """,
+    """
+    UPDATE meeting m SET deleted_at = NOW()
+    FROM offering o
+    JOIN course c ON c.course_id = o.course_id
+    WHERE m.offering_id = o.offering_id
+        AND m.deleted_at IS NULL
+        AND EXISTS (
+            SELECT FROM staging_course s
+            WHERE (s.subject_id, s.code) = (c.subject_id, c.code)
+        )
+        AND NOT EXISTS (
+            SELECT FROM staging_meeting s
+            WHERE (s.crn, s.term_id, s.meeting_id) = (o.crn, o.term_id, m.meeting_id)
+        )
+    """,
+    """
+    UPDATE offering o SET deleted_at = NOW(), updated_at = NOW()
+    FROM course c
+    WHERE c.course_id = o.course_id
+        AND o.deleted_at IS NULL
+        AND EXISTS (
+            SELECT FROM staging_course s
+            WHERE (s.subject_id, s.code) = (c.subject_id, c.code)
+        )
+        AND NOT EXISTS (
+            SELECT FROM staging_offering s
+            WHERE (s.crn, s.term_id) = (o.crn, o.term_id)
+        )
+    """,
+    # prerequisites naming courses that are not in the database are left out
+    """
+    INSERT INTO prereq_and (course_id, prereq_no)
+    SELECT DISTINCT c.course_id, s.prereq_no
+    FROM staging_prerequisite s
+    JOIN course c ON (c.subject_id, c.code) = (s.subject_id, s.code)
+    JOIN course p ON (p.subject_id, p.code) = (s.prereq_subject_id, s.prereq_code)
+    ON CONFLICT (course_id, prereq_no) DO UPDATE SET deleted_at = NULL
+    WHERE prereq_and.deleted_at IS NOT NULL
+    """,
+    """
+    INSERT INTO prereq_or (prereq_and_id, course_id, criteria)
+    SELECT DISTINCT ON (a.id, p.course_id) a.id, p.course_id, s.criteria
+    FROM staging_prerequisite s
+    JOIN course c ON (c.subject_id, c.code) = (s.subject_id, s.code)
+    JOIN course p ON (p.subject_id, p.code) = (s.prereq_subject_id, s.prereq_code)
+    JOIN prereq_and a ON (a.course_id, a.prereq_no) = (c.course_id, s.prereq_no)
+    ORDER BY a.id, p.course_id, s.seq DESC
+    ON CONFLICT (prereq_and_id, course_id) DO UPDATE SET
+        criteria = excluded.criteria,
+        deleted_at = NULL
+    WHERE prereq_or.deleted_at IS NOT NULL
+        OR prereq_or.criteria IS DISTINCT FROM excluded.criteria
+    """,
+    """
+    UPDATE prereq_or r SET deleted_at = NOW()
+    FROM prereq_and a
+    JOIN course c ON c.course_id = a.course_id
+    WHERE r.prereq_and_id = a.id
+        AND r.deleted_at IS NULL
+        AND EXISTS (
+            SELECT FROM staging_course s
+            WHERE (s.subject_id, s.code) = (c.subject_id, c.code)
+        )
+        AND NOT EXISTS (
+            SELECT FROM staging_prerequisite s
+            JOIN course p
+                ON (p.subject_id, p.code) = (s.prereq_subject_id, s.prereq_code)
+            WHERE (s.subject_id, s.code, s.prereq_no)
+                = (c.subject_id, c.code, a.prereq_no)
+                AND p.course_id = r.course_id
+        )
+    """,
+    """
+    UPDATE prereq_and a SET deleted_at = NOW()
+    FROM course c
+    WHERE c.course_id = a.course_id
+        AND a.deleted_at IS NULL
+        AND EXISTS (
+            SELECT FROM staging_course s
+            WHERE (s.subject_id, s.code) = (c.subject_id, c.code)
+        )
+        AND NOT EXISTS (
+            SELECT FROM staging_prerequisite s
+            JOIN course p
+                ON (p.subject_id, p.code) = (s.prereq_subject_id, s.prereq_code)
+            WHERE (s.subject_id, s.code, s.prereq_no)
+                = (c.subject_id, c.code, a.prereq_no)
+        )
+    """,
+]
+
+
+def copy_value(value) -> str:
+    """Format a value as a field of COPY text format."""
+
+    if value is None:
+        return "\\N"
+    if isinstance(value, (set, frozenset, list, tuple)):
+        # sort days so unchanged meetings compare equal
+        return "{" + ",".join(sorted(value)) + "}"
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class StagingTables:
+    """Stage parsed courses in temporary tables and merge them into the live tables.
+
+    :ivar pending: Number of courses added since the last copy.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self.session = session
+        self.buffers = {table: io.StringIO() for table in STAGING_TABLES}
+        self.pending = 0
+        session.execute(text(CREATE_STAGING_TABLES))
+
+    def _write(self, table: str, *values) -> None:
+        self.buffers[table].write("\t".join(map(copy_value, values)) + "\n")
+
+    def add(
+        self,
+        course: CourseRecord | Course,
+        prereq_keys: Iterable[tuple[int, list[tuple[str, str, str | None]]]],
+    ) -> None:
+        """Buffer the rows of a course.
+
+        :param course: Parsed course record with offerings and meetings, or course.
+        :param prereq_keys: Prerequisites of the course, see parse_prerequisite_keys.
+        """
+
+        key = (course.subject_id, course.code)
+        self._write(
+            "staging_course",
+            *key,
+            course.name,
+            course.prerequisites_raw,
+            course.credits,
+            course.url,
+            course.page_digest,
+        )
+        for offering in course.offerings:
+            self._write(
+                "staging_offering",
+                *key,
+                offering.crn,
+                offering.term_id,
+                offering.instructor,
+                offering.price,
+                offering.duration,
+                offering.status,
+            )
+            for meeting in offering.meetings:
+                self._write(
+                    "staging_meeting",
+                    offering.crn,
+                    offering.term_id,
+                    meeting.meeting_id,
+                    meeting.start_date,
+                    meeting.end_date,
+                    meeting.days,
+                    meeting.start_time,
+                    meeting.end_time,
+                    meeting.campus,
+                    meeting.building,
+                    meeting.room,
+                )
+        for prereq_no, prereq_courses in prereq_keys:
+            for prereq_key in prereq_courses:
+                self._write("staging_prerequisite", *key, prereq_no, *prereq_key)
+
+        self.pending += 1
+
+    def copy(self) -> None:
+        """COPY the buffered rows into the staging tables."""
+
+        cursor = self.session.connection().connection.cursor()
+        try:
+            for table, buffer in self.buffers.items():
+                buffer.seek(0)
+                columns = ", ".join(STAGING_TABLES[table])
+                cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN", buffer)
+                buffer.seek(0)
+                buffer.truncate()
+        finally:
+            cursor.close()
+
+        self.pending = 0
+
+    def merge(self) -> int:
+        """Merge the staged rows into the live tables.
+
+        :return: Number of rows written or soft deleted.
+        """
+
+        if self.pending:
+            self.copy()
+
+        return sum(
+            max(self.session.execute(text(stmt)).rowcount, 0)
+            for stmt in MERGE_STATEMENTS
+        )
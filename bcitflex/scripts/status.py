@@ -0,0 +1,274 @@
+"""Refresh the status and instructor of upcoming offerings.
+
+Between full loads, mostly the status and instructor of the offerings
+that haven't started change. An offering is upcoming if one of its
+meetings starts today or later, or if it has no meetings, such as a
+self-paced one, and its term is under way or later. This fetches only the pages of courses
+with such offerings, reads only those two fields of them, and writes
+them with batched UPDATEs keyed on (crn, term_id). Courses, meetings and
+prerequisites are not parsed or written, and offerings that are not
+stored yet are left to load-db. The page digests of the courses updated
+are cleared, so the next load-db parses their pages in full.
+"""
+import datetime
+import time
+from collections.abc import Container, Iterable, Iterator
+from functools import partial
+
+import click
+from flask import current_app
+from sqlalchemy import (
+    String,
+    and_,
+    column,
+    create_engine,
+    or_,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.orm import Session
+
+from bcitflex.model import Course, Meeting, Offering
+
+from .fetch import MAX_IN_FLIGHT, RETRIES, iter_page_responses
+from .records import OfferingStatusRecord
+from .scrape_and_load import (
+    CoursePage,
+    ScrapeStats,
+    offering_field_nodes,
+    parse_instructor,
+    parse_status,
+    term_offering_nodes,
+)
+
+STATUS_BATCH_SIZE = 1000
+
+# month each term starts in, by season ID
+TERM_START_MONTHS = {10: 1, 20: 4, 30: 9}
+
+
+def current_term_id(today: datetime.date) -> str:
+    """Return the ID of the term under way on a date, such as 202330."""
+    season_id = max(s for s, month in TERM_START_MONTHS.items() if month <= today.month)
+    return f"{today.year}{season_id}"
+
+
+def upcoming_offerings(
+    session: Session, today: datetime.date
+) -> tuple[list[str], set[tuple[str, str]]]:
+    """Return the offerings with a meeting starting on or after a date.
+
+    Offerings without meetings have no dates, so they are included if their
+    term is under way on the date or later.
+
+    :param session: SQLAlchemy session
+    :param today: Date the offerings start on or after.
+
+    :return: Urls of the courses of the offerings, and the offerings by CRN
+        and term ID.
+    """
+
+    stmt = (
+        select(Course.url, Offering.crn, Offering.term_id)
+        .distinct()
+        .join(Course.offerings)
+        .outerjoin(Offering.meetings)
+        .where(
+            or_(
+                Meeting.start_date >= today,
+                and_(
+                    Meeting.meeting_id.is_(None),
+                    Offering.term_id >= current_term_id(today),
+                ),
+            )
+        )
+    )
+    rows = session.execute(stmt).all()
+    urls = list(dict.fromkeys(url for url, _, _ in rows))
+    return urls, {(crn, term_id) for _, crn, term_id in rows}
+
+
+def parse_offering_statuses(
+    course_page: CoursePage, upcoming: Container[tuple[str, str]]
+) -> Iterator[OfferingStatusRecord]:
+    """Yield the status and instructor of the upcoming offerings of a page.
+
+    :param course_page: Course page.
+    :param upcoming: Offerings to yield, by CRN and term ID.
+    """
+
+    for node, term in term_offering_nodes(course_page):
+        fields = offering_field_nodes(node)
+        crn = fields["crn"].css_first("span").text(False)
+        if (crn, term.term_id) not in upcoming:
+            continue
+        yield OfferingStatusRecord(
+            crn=crn,
+            term_id=term.term_id,
+            status=parse_status(fields),
+            instructor=parse_instructor(fields),
+        )
+
+
+def update_offering_statuses(
+    session: Session,
+    statuses: Iterable[OfferingStatusRecord],
+    batch_size: int = STATUS_BATCH_SIZE,
+) -> int:
+    """Update the status and instructor of stored offerings that differ.
+
+    The page digests of the courses of the updated offerings are cleared in
+    the same transaction.
+
+    :param session: SQLAlchemy session
+    :param statuses: Status and instructor of offerings, by CRN and term.
+    :param batch_size: Number of offerings per UPDATE.
+
+    :return: Number of offerings updated.
+    """
+
+    course_ids = []
+    batch = {}
+    for record in statuses:
+        batch[(record.crn, record.term_id)] = record
+        if len(batch) >= batch_size:
+            course_ids += update_status_batch(session, list(batch.values()))
+            batch = {}
+    if batch:
+        course_ids += update_status_batch(session, list(batch.values()))
+
+    clear_page_digests(session, set(course_ids))
+    return len(course_ids)
+
+
+def update_status_batch(
+    session: Session, records: list[OfferingStatusRecord]
+) -> list[int]:
+    """Update one batch of offerings in an UPDATE ... FROM (VALUES ...).
+
+    :return: Course ID of each offering updated.
+    """
+
+    offering_table = Offering.__table__
+    page = values(
+        column("crn", String),
+        column("term_id", String),
+        column("status", String),
+        column("instructor", String),
+        name="page",
+    ).data([(r.crn, r.term_id, r.status, r.instructor) for r in records])
+
+    stmt = (
+        update(offering_table)
+        .where(
+            offering_table.c.crn == page.c.crn,
+            offering_table.c.term_id == page.c.term_id,
+            offering_table.c.deleted_at.is_(None),
+            or_(
+                offering_table.c.status.is_distinct_from(page.c.status),
+                offering_table.c.instructor.is_distinct_from(page.c.instructor),
+            ),
+        )
+        .values(status=page.c.status, instructor=page.c.instructor)
+        .returning(offering_table.c.course_id)
+    )
+    return session.execute(stmt).scalars().all()
+
+
+def clear_page_digests(session: Session, course_ids: set[int]) -> None:
+    """Clear the page digests of courses, so their pages aren't skipped as unchanged.
+
+    The courses' updated_at is left as is.
+    """
+
+    course_table = Course.__table__
+    course_ids = sorted(course_ids)
+    for start in range(0, len(course_ids), STATUS_BATCH_SIZE):
+        session.execute(
+            update(course_table)
+            .where(
+                course_table.c.course_id.in_(
+                    course_ids[start : start + STATUS_BATCH_SIZE]
+                )
+            )
+            .values(page_digest=None, updated_at=course_table.c.updated_at)
+        )
+
+
+def refresh_statuses(
+    db_url: str,
+    max_in_flight: int = MAX_IN_FLIGHT,
+    retries: int = RETRIES,
+    skip_failures: bool = False,
+    today: datetime.date | None = None,
+) -> ScrapeStats:
+    """Fetch the pages of upcoming offerings and update their statuses.
+
+    :param db_url: Database URL.
+    :param max_in_flight: Maximum number of concurrent page requests.
+    :param retries: Number of times to retry a throttled or failed page request.
+    :param skip_failures: Report and skip pages that still fail instead of aborting.
+    :param today: Date upcoming offerings start on or after, today if None.
+
+    :return: Counters and timings of the run, objects are the offerings updated.
+    """
+
+    started = time.perf_counter()
+    stats = ScrapeStats()
+    today = today or datetime.date.today()
+    fetcher = stats.observe(
+        partial(
+            iter_page_responses,
+            max_in_flight=max_in_flight,
+            retries=retries,
+            failures=stats.failures if skip_failures else None,
+        )
+    )
+
+    with Session(create_engine(db_url)) as session:
+        urls, upcoming = upcoming_offerings(session, today)
+        statuses = (
+            status
+            for response in fetcher(urls)
+            for status in parse_offering_statuses(CoursePage(response), upcoming)
+        )
+        stats.objects = update_offering_statuses(session, statuses)
+        session.commit()
+
+    stats.total_seconds = time.perf_counter() - started
+    return stats
+
+
+# Flask CLI command
+@click.command("refresh-status")
+@click.option(
+    "--max-in-flight",
+    default=MAX_IN_FLIGHT,
+    show_default=True,
+    help="Maximum concurrent page requests.",
+)
+@click.option(
+    "--retries",
+    default=RETRIES,
+    show_default=True,
+    help="Retries of throttled or failed page requests.",
+)
+@click.option(
+    "--skip-failures", is_flag=True, help="Skip pages that fail instead of aborting."
+)
+def refresh_status_command(
+    max_in_flight: int = MAX_IN_FLIGHT,
+    retries: int = RETRIES,
+    skip_failures: bool = False,
+):
+    """Update the status and instructor of offerings that haven't started."""
+    stats = refresh_statuses(
+        current_app.config["SQLALCHEMY_DATABASE_URI"],
+        max_in_flight,
+        retries,
+        skip_failures,
+    )
+    click.echo(f"Updated {stats.objects} offerings from {stats.pages} pages.")
+    for url, exc in stats.failures:
+        click.echo(f"Skipped {url}: {exc}")
@@ -0,0 +1,284 @@
+"""Build the course catalogue in a staging schema and swap it in atomically.
+
+The catalogue tables are copied into a staging schema, with the same
+constraints, indexes and soft delete rules under the same names. The
+loader then writes to the copies by putting the staging schema first on
+the search_path, so readers of the live tables never see a load in
+progress or wait on its row locks. Once the staged catalogue is
+validated and analyzed, the live and staged tables trade schemas in one
+short transaction. The replaced tables are kept in a schema of their own
+until the next load, in case they need to be swapped back by hand.
+"""
+from sqlalchemy import Connection, Engine, Row, create_engine, text
+from sqlalchemy.exc import OperationalError
+
+STAGING_SCHEMA = "catalogue_staging"
+PREVIOUS_SCHEMA = "catalogue_previous"
+LIVE_SCHEMA = "public"
+
+# in foreign key order
+CATALOGUE_TABLES = ["course", "offering", "meeting", "prereq_and", "prereq_or"]
+
+# staged catalogues with fewer courses than this fraction of the live ones
+# are more likely a failed crawl than courses that were dropped
+MIN_COURSE_RATIO = 0.9
+
+SWAP_LOCK_TIMEOUT = "2s"
+SWAP_ATTEMPTS = 5
+
+CONSTRAINTS_QUERY = """
+SELECT t.relname AS table_name, c.conname, pg_get_constraintdef(c.oid) AS definition
+FROM pg_constraint c
+JOIN pg_class t ON t.oid = c.conrelid
+WHERE c.conrelid = ANY(CAST(:tables AS regclass[]))
+    AND c.contype IN ('p', 'u', 'c', 'x', 'f')
+ORDER BY c.contype = 'f', t.relname
+"""
+
+EXTERNAL_FOREIGN_KEYS_QUERY = """
+SELECT c.conrelid::regclass::text AS table_name, c.conname,
+    pg_get_constraintdef(c.oid) AS definition, r.relname AS ref_table,
+    (SELECT string_agg(quote_ident(a.attname), ', ' ORDER BY k.n)
+        FROM unnest(c.conkey) WITH ORDINALITY k(attnum, n)
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+    ) AS columns,
+    (SELECT string_agg(quote_ident(a.attname), ', ' ORDER BY k.n)
+        FROM unnest(c.confkey) WITH ORDINALITY k(attnum, n)
+        JOIN pg_attribute a ON a.attrelid = c.confrelid AND a.attnum = k.attnum
+    ) AS ref_columns
+FROM pg_constraint c
+JOIN pg_class r ON r.oid = c.confrelid
+WHERE c.contype = 'f'
+    AND c.confrelid = ANY(CAST(:tables AS regclass[]))
+    AND NOT c.conrelid = ANY(CAST(:tables AS regclass[]))
+"""
+
+INDEXES_QUERY = """
+SELECT pg_get_indexdef(i.indexrelid) AS definition
+FROM pg_index i
+WHERE i.indrelid = ANY(CAST(:tables AS regclass[]))
+    AND NOT EXISTS (SELECT FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+"""
+
+RULES_QUERY = """
+SELECT pg_get_ruledef(oid) AS definition
+FROM pg_rewrite
+WHERE ev_class = ANY(CAST(:tables AS regclass[])) AND rulename <> '_RETURN'
+"""
+
+OWNED_SEQUENCES_QUERY = """
+SELECT s.oid::regclass::text AS sequence_name, t.relname AS table_name,
+    a.attname AS column_name
+FROM pg_class s
+JOIN pg_depend d ON d.objid = s.oid AND d.deptype = 'a'
+JOIN pg_class t ON t.oid = d.refobjid
+JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = d.refobjsubid
+WHERE s.relkind = 'S' AND t.oid = ANY(CAST(:tables AS regclass[]))
+"""
+
+
+def live_tables() -> list[str]:
+    return [f"{LIVE_SCHEMA}.{table}" for table in CATALOGUE_TABLES]
+
+
+def external_foreign_keys(connection: Connection) -> list[Row]:
+    """Return the foreign keys of other tables that refer to the catalogue.
+
+    :return: Table, name, definition, referenced table, and the columns and
+        referenced columns of each foreign key.
+    """
+
+    stmt = text(EXTERNAL_FOREIGN_KEYS_QUERY)
+    return connection.execute(stmt, {"tables": live_tables()}).all()
+
+
+def staging_engine(db_url: str, **kwargs) -> Engine:
+    """Return an engine whose connections write to the staging schema.
+
+    Tables outside the catalogue, such as term and subject, are not staged
+    and resolve to the live schema.
+    """
+
+    options = f"-c search_path={STAGING_SCHEMA},{LIVE_SCHEMA}"
+    return create_engine(db_url, connect_args={"options": options}, **kwargs)
+
+
+def create_staging_schema(connection: Connection) -> None:
+    """Copy the live catalogue tables into a fresh staging schema.
+
+    Rows are copied too, so IDs stay the same and the load only writes
+    what changed. Constraints and indexes are added after the rows are
+    copied, under the names of the live ones.
+
+    :param connection: Connection with the live schema on its search_path.
+    """
+
+    # definitions are read while the live tables are first on the search_path
+    tables = {"tables": live_tables()}
+    constraints = connection.execute(text(CONSTRAINTS_QUERY), tables).all()
+    indexes = connection.execute(text(INDEXES_QUERY), tables).scalars().all()
+    rules = connection.execute(text(RULES_QUERY), tables).scalars().all()
+
+    connection.execute(text(f"DROP SCHEMA IF EXISTS {PREVIOUS_SCHEMA} CASCADE"))
+    connection.execute(text(f"DROP SCHEMA IF EXISTS {STAGING_SCHEMA} CASCADE"))
+    connection.execute(text(f"CREATE SCHEMA {STAGING_SCHEMA}"))
+
+    for table in CATALOGUE_TABLES:
+        connection.execute(
+            text(
+                f"CREATE TABLE {STAGING_SCHEMA}.{table} (LIKE {LIVE_SCHEMA}.{table} "
+                "INCLUDING DEFAULTS INCLUDING COMMENTS INCLUDING STORAGE)"
+            )
+        )
+        connection.execute(
+            text(
+                f"INSERT INTO {STAGING_SCHEMA}.{table} "
+                f"SELECT * FROM {LIVE_SCHEMA}.{table}"
+            )
+        )
+
+    # unqualified names in the definitions now resolve to the staged tables
+    connection.execute(
+        text(f"SET LOCAL search_path TO {STAGING_SCHEMA}, {LIVE_SCHEMA}")
+    )
+    for table, name, definition in constraints:
+        connection.execute(
+            text(
+                f'ALTER TABLE {STAGING_SCHEMA}.{table} ADD CONSTRAINT "{name}" '
+                f"{definition}"
+            )
+        )
+    for definition in indexes:
+        connection.execute(text(definition.replace(f" ON {LIVE_SCHEMA}.", " ON ")))
+    for definition in rules:
+        connection.execute(text(definition))
+    connection.execute(text(f"SET LOCAL search_path TO {LIVE_SCHEMA}"))
+
+
+def validate_staging_schema(connection: Connection) -> list[str]:
+    """Check the staged catalogue can replace the live one.
+
+    Foreign keys within the catalogue are enforced by the staged
+    constraints, so this checks what they can't.
+
+    :param connection: Connection to the database.
+
+    :return: Problems found, none if the staged catalogue is valid.
+    """
+
+    problems = []
+
+    def active_courses(schema: str) -> int:
+        return connection.scalar(
+            text(f"SELECT count(*) FROM {schema}.course WHERE deleted_at IS NULL")
+        )
+
+    staged, live = active_courses(STAGING_SCHEMA), active_courses(LIVE_SCHEMA)
+    if staged < live * MIN_COURSE_RATIO:
+        problems.append(f"{staged} courses staged, {live} live.")
+
+    # rows of other tables must still find the courses they refer to
+    for fk in external_foreign_keys(connection):
+        missing = connection.scalar(
+            text(
+                f"SELECT count(*) FROM {fk.table_name} WHERE ({fk.columns}) NOT IN "
+                f"(SELECT {fk.ref_columns} FROM {STAGING_SCHEMA}.{fk.ref_table})"
+            )
+        )
+        if missing:
+            problems.append(f"{missing} rows of {fk.table_name} break {fk.conname}.")
+
+    return problems
+
+
+def analyze_staging_schema(connection: Connection) -> None:
+    """Update the planner statistics of the staged tables before they go live."""
+
+    tables = ", ".join(f"{STAGING_SCHEMA}.{table}" for table in CATALOGUE_TABLES)
+    connection.execute(text(f"ANALYZE {tables}"))
+
+
+def swap_schemas(connection: Connection) -> None:
+    """Move the staged tables live and the live tables to the previous schema.
+
+    Foreign keys of other tables are moved to the staged tables without
+    being validated, which validate_staging_schema has checked, so the swap
+    only takes catalog locks. Sequences owned by the live tables are handed
+    to the staged ones, so dropping the previous schema doesn't drop them.
+
+    :param connection: Connection to the database, in a transaction that
+        is committed by the caller.
+    """
+
+    # fail fast instead of queueing readers behind a long query
+    connection.execute(text(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'"))
+
+    foreign_keys = external_foreign_keys(connection)
+    sequences = connection.execute(
+        text(OWNED_SEQUENCES_QUERY), {"tables": live_tables()}
+    ).all()
+
+    for fk in foreign_keys:
+        connection.execute(
+            text(f'ALTER TABLE {fk.table_name} DROP CONSTRAINT "{fk.conname}"')
+        )
+
+    connection.execute(text(f"DROP SCHEMA IF EXISTS {PREVIOUS_SCHEMA} CASCADE"))
+    connection.execute(text(f"CREATE SCHEMA {PREVIOUS_SCHEMA}"))
+    for table in CATALOGUE_TABLES:
+        connection.execute(
+            text(f"ALTER TABLE {LIVE_SCHEMA}.{table} SET SCHEMA {PREVIOUS_SCHEMA}")
+        )
+        connection.execute(
+            text(f"ALTER TABLE {STAGING_SCHEMA}.{table} SET SCHEMA {LIVE_SCHEMA}")
+        )
+    connection.execute(text(f"DROP SCHEMA {STAGING_SCHEMA}"))
+
+    for sequence, table, column in sequences:
+        connection.execute(
+            text(f"ALTER SEQUENCE {sequence} OWNED BY {LIVE_SCHEMA}.{table}.{column}")
+        )
+    for fk in foreign_keys:
+        connection.execute(
+            text(
+                f'ALTER TABLE {fk.table_name} ADD CONSTRAINT "{fk.conname}" '
+                f"{fk.definition} NOT VALID"
+            )
+        )
+
+
+def swap_staging_schema(engine: Engine) -> None:
+    """Validate and analyze the staged catalogue, then swap it live.
+
+    The swap is retried if it times out waiting for readers of the live tables.
+
+    :param engine: Engine connecting with the live schema on the search_path.
+    """
+
+    with engine.begin() as connection:
+        problems = validate_staging_schema(connection)
+        if problems:
+            raise ValueError(
+                "Staged catalogue failed validation, live catalogue unchanged: "
+                + " ".join(problems)
+            )
+
+    with engine.begin() as connection:
+        analyze_staging_schema(connection)
+
+    for attempt in range(1, SWAP_ATTEMPTS + 1):
+        try:
+            with engine.begin() as connection:
+                swap_schemas(connection)
+        except OperationalError:
+            if attempt == SWAP_ATTEMPTS:
+                raise
+        else:
+            break
+
+    # check the moved foreign keys without blocking readers or writers
+    with engine.begin() as connection:
+        for fk in external_foreign_keys(connection):
+            connection.execute(
+                text(f'ALTER TABLE {fk.table_name} VALIDATE CONSTRAINT "{fk.conname}"')
+            )
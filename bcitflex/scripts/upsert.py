@@ -0,0 +1,260 @@
+"""Load parsed courses with set-based upserts instead of per-object merges.
+
+Each batch of courses is written with one INSERT ... ON CONFLICT DO UPDATE
+statement per table, keyed on the table's unique constraint. Rows are only
+updated when their data is distinct from what is stored, so unchanged rows
+are neither written nor returned, and their IDs are looked up in one query.
+Rows of the batch's courses that are no longer on the course pages are
+soft deleted, as merging the courses' collections did.
+"""
+from collections.abc import Iterable
+
+from sqlalchemy import Table, func, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from bcitflex.model import Course, Meeting, Offering
+from bcitflex.model.prerequisite import PrerequisiteAnd, PrerequisiteOr
+
+from .records import CourseRecord
+
+COURSE_COLUMNS = [
+    "subject_id",
+    "code",
+    "name",
+    "prerequisites_raw",
+    "credits",
+    "url",
+    "page_digest",
+]
+OFFERING_COLUMNS = ["crn", "term_id", "instructor", "price", "duration", "status"]
+MEETING_COLUMNS = [
+    "meeting_id",
+    "start_date",
+    "end_date",
+    "start_time",
+    "end_time",
+    "campus",
+    "building",
+    "room",
+]
+
+
+def upsert_rows(
+    session: Session,
+    table: Table,
+    rows: Iterable[dict],
+    key_columns: list[str],
+    id_column: str | None = None,
+) -> tuple[dict[tuple, int], int]:
+    """Insert rows, or update the existing row with the same key if it differs.
+
+    Soft deleted rows are restored.
+
+    :param session: SQLAlchemy session
+    :param table: Table to upsert into.
+    :param rows: Rows keyed by column name, the last of rows with the same key wins.
+    :param key_columns: Columns of the unique constraint rows conflict on.
+    :param id_column: Generated primary key to return for each row, optional.
+
+    :return: IDs by key if id_column is given, and the number of rows written.
+    """
+
+    rows = {tuple(row[c] for c in key_columns): row for row in rows}
+    if not rows:
+        return {}, 0
+
+    stmt = insert(table).values(list(rows.values()))
+    value_columns = [c for c in next(iter(rows.values())) if c not in key_columns]
+
+    changed = or_(
+        table.c.deleted_at.is_not(None),
+        *(table.c[c].is_distinct_from(stmt.excluded[c]) for c in value_columns),
+    )
+    set_ = {c: stmt.excluded[c] for c in value_columns}
+    set_["deleted_at"] = None
+    if "updated_at" in table.c:
+        set_["updated_at"] = func.now()
+
+    key = [table.c[c] for c in key_columns]
+    returning = key if id_column is None else [table.c[id_column], *key]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=key_columns, set_=set_, where=changed
+    ).returning(*returning)
+
+    written = session.execute(stmt).all()
+    if id_column is None:
+        return {}, len(written)
+
+    ids = {tuple(row[1:]): row[0] for row in written}
+    missing = [k for k in rows if k not in ids]
+    if missing:
+        ids.update(select_ids(session, table, key_columns, id_column, missing))
+
+    return ids, len(written)
+
+
+def select_ids(
+    session: Session,
+    table: Table,
+    key_columns: list[str],
+    id_column: str,
+    keys: list[tuple],
+) -> dict[tuple, int]:
+    """Return the IDs of rows by their unique key."""
+
+    key = tuple_(*(table.c[c] for c in key_columns))
+    stmt = select(table.c[id_column], *(table.c[c] for c in key_columns)).where(
+        key.in_(keys)
+    )
+    return {tuple(row[1:]): row[0] for row in session.execute(stmt)}
+
+
+def soft_delete_rows(session: Session, table: Table, *criteria) -> int:
+    """Soft delete the rows matching criteria and return how many were deleted."""
+
+    stmt = (
+        update(table)
+        .where(table.c.deleted_at.is_(None), *criteria)
+        .values(deleted_at=func.now())
+    )
+    return session.execute(stmt).rowcount
+
+
+def upsert_courses(session: Session, courses: list[CourseRecord | Course]) -> int:
+    """Upsert a batch of courses with their offerings and meetings.
+
+    Course IDs are set on the courses so their prerequisites can be parsed.
+
+    :param session: SQLAlchemy session
+    :param courses: Parsed course records, or courses.
+
+    :return: Number of rows written or soft deleted.
+    """
+
+    course_table: Table = Course.__table__
+    offering_table: Table = Offering.__table__
+    meeting_table: Table = Meeting.__table__
+
+    course_ids, written = upsert_rows(
+        session,
+        course_table,
+        ({c: getattr(course, c) for c in COURSE_COLUMNS} for course in courses),
+        ["subject_id", "code"],
+        "course_id",
+    )
+    for course in courses:
+        course.course_id = course_ids[(course.subject_id, course.code)]
+
+    # the last offering of a crn in a term wins, like merging did
+    offerings = {
+        (offering.crn, offering.term_id): (course.course_id, offering)
+        for course in courses
+        for offering in course.offerings
+    }
+    offering_ids, count = upsert_rows(
+        session,
+        offering_table,
+        (
+            {
+                **{c: getattr(offering, c) for c in OFFERING_COLUMNS},
+                "course_id": course_id,
+            }
+            for course_id, offering in offerings.values()
+        ),
+        ["crn", "term_id"],
+        "offering_id",
+    )
+    written += count
+
+    meeting_rows = [
+        {
+            **{c: getattr(meeting, c) for c in MEETING_COLUMNS},
+            "offering_id": offering_ids[key],
+            # sort days so unchanged meetings compare equal
+            "days": sorted(meeting.days) if meeting.days is not None else None,
+        }
+        for key, (_, offering) in offerings.items()
+        for meeting in offering.meetings
+    ]
+    _, count = upsert_rows(
+        session, meeting_table, meeting_rows, ["offering_id", "meeting_id"]
+    )
+    written += count
+
+    # soft delete offerings and meetings that are no longer on the pages
+    batch_course_ids = list(course_ids.values())
+    batch_offering_ids = select(offering_table.c.offering_id).where(
+        offering_table.c.course_id.in_(batch_course_ids)
+    )
+    written += soft_delete_rows(
+        session,
+        meeting_table,
+        meeting_table.c.offering_id.in_(batch_offering_ids),
+        tuple_(meeting_table.c.offering_id, meeting_table.c.meeting_id).not_in(
+            [(row["offering_id"], row["meeting_id"]) for row in meeting_rows]
+        ),
+    )
+    written += soft_delete_rows(
+        session,
+        offering_table,
+        offering_table.c.course_id.in_(batch_course_ids),
+        offering_table.c.offering_id.not_in(list(offering_ids.values())),
+    )
+
+    return written
+
+
+def upsert_prerequisites(
+    session: Session, course_ids: list[int], prereqs: list[PrerequisiteAnd]
+) -> int:
+    """Upsert the prerequisites of a batch of courses.
+
+    :param session: SQLAlchemy session
+    :param course_ids: IDs of the courses the prerequisites were parsed for.
+    :param prereqs: Parsed prerequisites of the courses.
+
+    :return: Number of rows written or soft deleted.
+    """
+
+    and_table: Table = PrerequisiteAnd.__table__
+    or_table: Table = PrerequisiteOr.__table__
+
+    and_ids, written = upsert_rows(
+        session,
+        and_table,
+        ({"course_id": p.course_id, "prereq_no": p.prereq_no} for p in prereqs),
+        ["course_id", "prereq_no"],
+        "id",
+    )
+
+    or_rows = [
+        {
+            "prereq_and_id": and_ids[(prereq.course_id, prereq.prereq_no)],
+            "course_id": child.course_id,
+            "criteria": child.criteria,
+        }
+        for prereq in prereqs
+        for child in prereq.children
+    ]
+    _, count = upsert_rows(session, or_table, or_rows, ["prereq_and_id", "course_id"])
+    written += count
+
+    # soft delete prerequisites that are no longer on the pages
+    batch_and_ids = select(and_table.c.id).where(and_table.c.course_id.in_(course_ids))
+    written += soft_delete_rows(
+        session,
+        or_table,
+        or_table.c.prereq_and_id.in_(batch_and_ids),
+        tuple_(or_table.c.prereq_and_id, or_table.c.course_id).not_in(
+            [(row["prereq_and_id"], row["course_id"]) for row in or_rows]
+        ),
+    )
+    written += soft_delete_rows(
+        session,
+        and_table,
+        and_table.c.course_id.in_(course_ids),
+        and_table.c.id.not_in(list(and_ids.values())),
+    )
+
+    return written
@@ -1,10 +1,41 @@
+import datetime
+
 from sqlalchemy import delete, select
 from sqlalchemy.orm import Session
 
-from bcitflex.model import Course, Offering, User
+from bcitflex.ext.database import assign_partitioned_serials
+from bcitflex.model import Course, Meeting, Offering, User
+from bcitflex.model.prerequisite import PrerequisiteAnd
 from tests import dbtest
 
 
+class TestPartitionedSerials:
+    """Test numbering meetings and prerequisites before a flush."""
+
+    def test_pending_parent(self, new_course: Course):
+        """Test prerequisites of a new course are numbered from 1 in order."""
+        session = Session()
+        first, second = PrerequisiteAnd(), PrerequisiteAnd()
+        first.course = new_course
+        second.course = new_course
+        session.add_all([first, second])
+
+        assign_partitioned_serials(session, None, None)
+
+        assert (first.prereq_no, second.prereq_no) == (1, 2)
+
+    def test_assigned_kept(self, new_course: Course):
+        """Test given numbers are kept and new ones follow them."""
+        session = Session()
+        given = PrerequisiteAnd(prereq_no=2, course=new_course)
+        new = PrerequisiteAnd(course=new_course)
+        session.add_all([given, new])
+
+        assign_partitioned_serials(session, None, None)
+
+        assert (given.prereq_no, new.prereq_no) == (2, 3)
+
+
 @dbtest
 class TestSoftDeleteDB:
     """Test the SoftDelete extension with the database."""
@@ -189,3 +220,31 @@ class TestSoftDeleteDB:
             )
             is not None
         )
+
+
+@dbtest
+class TestPartitionedSerialsDB:
+    """Test numbering meetings and prerequisites with the database."""
+
+    def test_meeting_after_stored(self, db_session: Session):
+        """Test meetings added by offering id are numbered after stored ones."""
+        meetings = [
+            Meeting(
+                offering_id=1,
+                start_date=datetime.date(2023, 9, 13),
+                end_date=datetime.date(2023, 11, 29),
+            )
+            for _ in range(2)
+        ]
+        db_session.add_all(meetings)
+        db_session.commit()
+
+        assert [m.meeting_id for m in meetings] == [2, 3]
+
+    def test_prerequisite_after_stored(self, db_session: Session):
+        """Test prerequisites added by course id are numbered after stored ones."""
+        prereq = PrerequisiteAnd(course_id=1)
+        db_session.add(prereq)
+        db_session.commit()
+
+        assert prereq.prereq_no == 2
@@ -118,6 +118,34 @@ class TestGet:
         new_course.set_id(db_session)
         assert new_course.course_id == 1
 
+    def test_get_many_by_unique(self, db_session: Session):
+        """Test the get_many_by_unique method in chunks, leaving out missing ids."""
+        courses = Course.get_many_by_unique(
+            db_session,
+            [("COMP", "1234"), ("COMP", "1000"), ("COMP", "9999")],
+            chunk_size=1,
+        )
+        assert {key: course.course_id for key, course in courses.items()} == {
+            ("COMP", "1234"): 1,
+            ("COMP", "1000"): 2,
+        }
+
+    def test_get_many_by_unique_single_column(self, db_session: Session):
+        """Test the get_many_by_unique method with a single unique column."""
+        users = User.get_many_by_unique(db_session, ["test-user", "not_a_username"])
+        assert list(users) == [("test-user",)]
+
+    def test_set_ids(self, db_session: Session):
+        """Test set_ids method."""
+        existing, new = (
+            Course(subject_id="COMP", code="1234"),
+            Course(subject_id="COMP", code="9999"),
+        )
+        pks = Course.set_ids(db_session, [existing, new])
+        assert pks == {("COMP", "1234"): {"course_id": 1}}
+        assert existing.course_id == 1
+        assert new.course_id is None
+
 
 @dbtest
 class TestClone:
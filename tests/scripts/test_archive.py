@@ -0,0 +1,57 @@
+"""Test recording and replaying crawls."""
+from pickle import load
+
+import pytest
+from requests import Response
+
+from bcitflex.scripts.archive import PageArchive
+from bcitflex.scripts.scrape_and_load import parse_course_urls, parse_response
+
+
+@pytest.fixture
+def archive(tmp_path) -> PageArchive:
+    return PageArchive(tmp_path / "archive")
+
+
+@pytest.fixture
+def course_response() -> Response:
+    return load(open("tests/test_data/course_response.pkl", "rb"))
+
+
+@pytest.fixture
+def course_list_response() -> Response:
+    return load(open("tests/test_data/course_list_response.pkl", "rb"))
+
+
+class TestPageArchive:
+    def test_content_addressed(self, archive: PageArchive):
+        """Test identical content is stored once."""
+        assert archive.put(b"page") == archive.put(b"page")
+        assert archive.get(archive.put(b"page")) == b"page"
+        assert len(list(archive.objects.rglob("*.gz"))) == 1
+
+    def test_replay_missing(self, archive: PageArchive):
+        with pytest.raises(ValueError, match="No crawls recorded"):
+            archive.replay()
+        with pytest.raises(ValueError, match="Unknown crawl"):
+            archive.replay("20240101T000000")
+
+    def test_record_and_replay(
+        self, archive: PageArchive, course_response, course_list_response
+    ):
+        """Test a recorded crawl replays the same course list and pages."""
+        recorder = archive.record()
+        recorder.add_course_list(course_list_response)
+        fetch = recorder.wrap(lambda urls: iter([course_response]))
+        assert list(fetch([course_response.url])) == [course_response]
+        recorder.save()
+
+        crawl = archive.replay()
+        assert crawl.name == recorder.name
+        assert parse_course_urls(crawl.course_list()) == parse_course_urls(
+            course_list_response
+        )
+
+        (replayed,) = crawl.fetch([course_response.url, "https://www.bcit.ca/gone/"])
+        assert replayed.text == course_response.text
+        assert parse_response(replayed).fullcode == "COMP 2831"
@@ -0,0 +1,86 @@
+"""Test the offline parser benchmark."""
+import json
+
+import click
+import pytest
+from flask import Flask
+from flask.testing import FlaskCliRunner
+
+from bcitflex.scripts.benchmark import (
+    ParseBenchmark,
+    benchmark_parser,
+    compare_to_baseline,
+    ensure_scratch_database,
+    simulated_corpus,
+)
+from tests import dbtest
+
+
+@pytest.fixture(scope="module")
+def result() -> ParseBenchmark:
+    return benchmark_parser(simulated_corpus(10), repeat=1)
+
+
+class TestBenchmarkParser:
+    def test_counts(self, result: ParseBenchmark):
+        assert result.pages == 10
+        assert result.offerings >= 10
+        assert result.meetings >= result.offerings
+
+    def test_metrics(self, result: ParseBenchmark):
+        assert result.pages_per_second > 0
+        assert result.us_per_offering > 0
+        assert result.us_per_meeting > 0
+        assert result.us_per_prerequisites > 0
+        assert result.kib_per_page > 0
+
+
+class TestCompareToBaseline:
+    def test_within_tolerance(self, result: ParseBenchmark):
+        baseline = {"pages_per_second": result.pages_per_second * 1.05}
+        assert compare_to_baseline(result, baseline, 0.1) == []
+
+    @pytest.mark.parametrize(
+        "metric, factor",
+        [("pages_per_second", 2), ("us_per_meeting", 0.5), ("kib_per_page", 0.5)],
+    )
+    def test_regression(self, result: ParseBenchmark, metric: str, factor: float):
+        baseline = {metric: getattr(result, metric) * factor}
+        regressions = compare_to_baseline(result, baseline, 0.1)
+        assert len(regressions) == 1
+        assert regressions[0].startswith(metric)
+
+    def test_improvement(self, result: ParseBenchmark):
+        baseline = {"pages_per_second": result.pages_per_second / 2}
+        assert compare_to_baseline(result, baseline, 0.1) == []
+
+
+class TestBenchParseCommand:
+    def test_save_and_compare(self, mock_runner: FlaskCliRunner, tmp_path):
+        baseline = tmp_path / "baseline.json"
+        result = mock_runner.invoke(
+            args=[
+                "bench-parse",
+                "--pages=5",
+                "--repeat=1",
+                f"--save-baseline={baseline}",
+            ]
+        )
+        assert result.exit_code == 0, result.output
+        assert json.loads(baseline.read_text())["pages"] == 5
+
+        # an impossible baseline fails the run
+        baseline.write_text(json.dumps({"pages_per_second": 1e12}))
+        result = mock_runner.invoke(
+            args=["bench-parse", "--pages=5", "--repeat=1", f"--baseline={baseline}"]
+        )
+        assert result.exit_code == 1
+        assert "pages_per_second" in result.output
+
+
+@dbtest
+class TestBenchScrapeDB:
+    def test_real_courses(self, app: Flask):
+        """Test a database with real courses is refused."""
+        with pytest.raises(click.ClickException):
+            ensure_scratch_database(app.config["SQLALCHEMY_DATABASE_URI"])
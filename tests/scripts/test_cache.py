@@ -0,0 +1,85 @@
+"""Test the on-disk HTTP response cache."""
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from bcitflex.scripts.cache import ResponseCache
+from bcitflex.scripts.fetch import collect_response
+
+URL = "https://www.bcit.ca/courses/comp-1234/"
+
+
+def make_response(status_code: int = 200, body: bytes = b"<html></html>", **headers):
+    """Return a response with the given status, body and headers."""
+    response = Response()
+    response.status_code = status_code
+    response.url = URL
+    response.encoding = "utf-8"
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    return response
+
+
+@pytest.fixture
+def cache(tmp_path) -> ResponseCache:
+    return ResponseCache(tmp_path / "http_cache")
+
+
+class TestResponseCache:
+    def test_empty(self, cache: ResponseCache):
+        assert cache.conditional_headers(URL) == {}
+        assert cache.load(URL) is None
+
+    def test_store_and_load(self, cache: ResponseCache):
+        cache.store(URL, make_response(ETag='"abc"', **{"Last-Modified": "yesterday"}))
+        assert cache.conditional_headers(URL) == {
+            "If-None-Match": '"abc"',
+            "If-Modified-Since": "yesterday",
+        }
+        response = cache.load(URL)
+        assert response.status_code == 200
+        assert response.text == "<html></html>"
+
+    def test_store_without_validator(self, cache: ResponseCache):
+        """Test responses that can't be revalidated are not cached."""
+        cache.store(URL, make_response())
+        assert cache.load(URL) is None
+
+    def test_store_redirected(self, cache: ResponseCache):
+        """Test a redirected response is found under the URL that was requested."""
+        response = make_response(ETag='"abc"')
+        response.url = "https://www.bcit.ca/courses/comp-1234-new/"
+
+        cache.store(URL, response)
+
+        assert cache.conditional_headers(URL) == {"If-None-Match": '"abc"'}
+        assert cache.load(URL).url == response.url
+
+
+class TestCollectResponseCached:
+    def test_not_modified_served_from_cache(self, monkeypatch, cache: ResponseCache):
+        cache.store(URL, make_response(body=b"cached", ETag='"abc"'))
+        mock_get = MagicMock(return_value=make_response(status_code=304, body=b""))
+        monkeypatch.setattr(requests, "get", mock_get)
+
+        response = collect_response(URL, cache=cache)
+
+        assert mock_get.call_args.kwargs["headers"] == {"If-None-Match": '"abc"'}
+        assert response.text == "cached"
+
+    def test_modified_updates_cache(self, monkeypatch, cache: ResponseCache):
+        cache.store(URL, make_response(body=b"old", ETag='"abc"'))
+        monkeypatch.setattr(
+            requests,
+            "get",
+            MagicMock(return_value=make_response(body=b"new", ETag='"def"')),
+        )
+
+        response = collect_response(URL, cache=cache)
+
+        assert response.text == "new"
+        assert cache.load(URL).text == "new"
+        assert cache.conditional_headers(URL) == {"If-None-Match": '"def"'}
@@ -0,0 +1,136 @@
+"""Test fetching course pages."""
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from bcitflex.scripts import fetch
+from bcitflex.scripts.fetch import (
+    AdaptiveLimit,
+    FetchError,
+    create_http_session,
+    is_retryable,
+    iter_page_responses,
+)
+
+
+class TestIterPageResponses:
+    @pytest.fixture
+    def mock_get(self, monkeypatch) -> dict:
+        """Patch Session.get to echo the url and track concurrent requests."""
+        stats = {"in_flight": 0, "peak": 0}
+        lock = threading.Lock()
+
+        def get(_, url, **kwargs):
+            with lock:
+                stats["in_flight"] += 1
+                stats["peak"] = max(stats["peak"], stats["in_flight"])
+            time.sleep(0.01)
+            with lock:
+                stats["in_flight"] -= 1
+            return MagicMock(status_code=200, url=url)
+
+        monkeypatch.setattr(requests.Session, "get", get)
+        return stats
+
+    def test_yields_all_responses(self, mock_get):
+        """Test every url is fetched exactly once."""
+        urls = [f"https://example.com/{i}" for i in range(20)]
+        responses = list(iter_page_responses(urls, max_in_flight=4))
+        assert sorted(r.url for r in responses) == sorted(urls)
+
+    def test_max_in_flight(self, mock_get):
+        """Test the number of concurrent requests is bounded."""
+        urls = [f"https://example.com/{i}" for i in range(20)]
+        list(iter_page_responses(urls, max_in_flight=3))
+        assert 1 <= mock_get["peak"] <= 3
+
+    def test_failure_raises(self, monkeypatch):
+        """Test a non-200 response is raised to the consumer."""
+        monkeypatch.setattr(
+            requests.Session, "get", lambda _, url, **kwargs: MagicMock(status_code=404)
+        )
+        with pytest.raises(Exception, match="status code: 404"):
+            list(iter_page_responses(["https://example.com"]))
+
+    @pytest.fixture
+    def flaky_get(self, monkeypatch) -> dict:
+        """Patch Session.get to throttle the first request to each url."""
+        monkeypatch.setattr(fetch, "backoff_delay", lambda attempt: 0)
+        calls = {}
+
+        def get(_, url, **kwargs):
+            calls[url] = calls.get(url, 0) + 1
+            if calls[url] == 1 or url.endswith("broken"):
+                return MagicMock(status_code=429)
+            return MagicMock(status_code=200, url=url)
+
+        monkeypatch.setattr(requests.Session, "get", get)
+        return calls
+
+    def test_retry(self, flaky_get):
+        """Test throttled requests are retried."""
+        urls = [f"https://example.com/{i}" for i in range(5)]
+        responses = list(iter_page_responses(urls, retries=1))
+        assert sorted(r.url for r in responses) == urls
+        assert all(count == 2 for count in flaky_get.values())
+
+    def test_retries_exhausted(self, flaky_get):
+        with pytest.raises(FetchError, match="status code: 429"):
+            list(iter_page_responses(["https://example.com/broken"], retries=2))
+        assert flaky_get["https://example.com/broken"] == 3
+
+    def test_skip_failures(self, flaky_get):
+        """Test persistent failures are reported and skipped when failures is given."""
+        urls = ["https://example.com/ok", "https://example.com/broken"]
+        failures = []
+        responses = list(iter_page_responses(urls, retries=1, failures=failures))
+        assert [r.url for r in responses] == ["https://example.com/ok"]
+        assert [url for url, _ in failures] == ["https://example.com/broken"]
+
+
+class TestAdaptiveLimit:
+    def test_increase(self):
+        limit = AdaptiveLimit(maximum=8, initial=2)
+        for _ in range(100):
+            limit.on_success()
+        assert limit.current == 8
+
+    def test_back_off(self):
+        limit = AdaptiveLimit(maximum=8, initial=8)
+        limit.on_throttle()
+        assert limit.current == 4
+        # further failures within the cooldown are part of the same slowdown
+        limit.on_throttle()
+        assert limit.current == 4
+        limit._decreased_at -= limit.cooldown
+        limit.on_throttle()
+        assert limit.current == 2
+
+    def test_minimum(self):
+        limit = AdaptiveLimit(maximum=8, initial=1)
+        limit.on_throttle()
+        assert limit.current == 1
+
+
+@pytest.mark.parametrize(
+    "exc, expected",
+    [
+        (FetchError("url", 429), True),
+        (FetchError("url", 503), True),
+        (FetchError("url", 404), False),
+        (requests.Timeout(), True),
+        (requests.ConnectionError(), True),
+        (ValueError(), False),
+    ],
+)
+def test_is_retryable(exc, expected):
+    assert is_retryable(exc) is expected
+
+
+def test_create_http_session_pool_size():
+    """Test the session's adapters keep the requested number of connections."""
+    http = create_http_session(pool_size=8)
+    assert http.get_adapter("https://www.bcit.ca")._pool_maxsize == 8
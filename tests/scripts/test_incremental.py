@@ -0,0 +1,162 @@
+"""Test planning incremental scrapes."""
+import datetime
+from unittest.mock import Mock
+
+from requests import Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from bcitflex.model import Course, Offering, ScrapeState
+from bcitflex.scripts.incremental import (
+    FetchPlan,
+    load_fingerprint,
+    mark_scraped,
+    payload_fingerprint,
+    plan_fetch,
+    save_fingerprint,
+    soft_delete_vanished,
+)
+from bcitflex.scripts.scrape_and_load import bcit_to_sql
+from bcitflex.scripts.upsert import upsert_courses
+from tests import dbtest
+from tests.scripts.test_upsert import make_course
+
+BASE_URL = "https://www.bcit.ca"
+NOW = datetime.datetime(2023, 10, 1, tzinfo=datetime.timezone.utc)
+
+
+def make_response(content: bytes) -> Response:
+    response = Response()
+    response._content = content
+    return response
+
+
+class FakeSession:
+    """Return stored course urls and a stored fingerprint."""
+
+    def __init__(self, scraped_at: dict[str, datetime.datetime | None], fingerprint):
+        self.scraped_at = scraped_at
+        self.fingerprint = fingerprint
+
+    def execute(self, stmt):
+        return list(self.scraped_at.items())
+
+    def get(self, model, name):
+        if self.fingerprint is None:
+            return None
+        return ScrapeState(name=name, fingerprint=self.fingerprint)
+
+
+class TestPlanFetch:
+    course_list = make_response(b"COMP 1234")
+
+    def test_plan(self):
+        """Test new and stale pages are fetched and unlisted ones vanish."""
+        session = FakeSession(
+            {
+                f"{BASE_URL}/fresh": NOW - datetime.timedelta(hours=1),
+                f"{BASE_URL}/stale": NOW - datetime.timedelta(hours=48),
+                f"{BASE_URL}/never": None,
+                f"{BASE_URL}/gone": NOW,
+            },
+            payload_fingerprint(self.course_list),
+        )
+        subject_urls = {"COMP": ["/new", "/fresh", "/stale", "/never"]}
+
+        plan = plan_fetch(
+            session,
+            subject_urls,
+            self.course_list,
+            datetime.timedelta(hours=24),
+            BASE_URL,
+            NOW,
+        )
+
+        assert not plan.list_changed
+        assert plan.new == ["/new"]
+        assert plan.stale == ["/stale", "/never"]
+        assert plan.vanished == [f"{BASE_URL}/gone"]
+        assert plan.subject_urls(subject_urls) == {"COMP": ["/new", "/stale", "/never"]}
+
+    def test_noop(self):
+        """Test an unchanged course list with fresh pages has nothing to do."""
+        session = FakeSession(
+            {f"{BASE_URL}/fresh": NOW}, payload_fingerprint(self.course_list)
+        )
+
+        plan = plan_fetch(
+            session,
+            {"COMP": ["/fresh"]},
+            self.course_list,
+            datetime.timedelta(hours=24),
+            BASE_URL,
+            NOW,
+        )
+
+        assert plan.is_noop
+
+    def test_list_changed(self):
+        """Test a course list without a stored fingerprint counts as changed."""
+        session = FakeSession({}, None)
+
+        plan = plan_fetch(
+            session, {}, self.course_list, datetime.timedelta(hours=24), BASE_URL, NOW
+        )
+
+        assert plan.list_changed
+        assert not plan.is_noop
+
+
+def test_noop_load(monkeypatch):
+    """Test a run with nothing to fetch returns before staging or loading anything."""
+    module = "bcitflex.scripts.scrape_and_load"
+    monkeypatch.setattr(f"{module}.collect_response", Mock())
+    monkeypatch.setattr(f"{module}.payload_fingerprint", Mock())
+    monkeypatch.setattr(f"{module}.prep_db", Mock())
+    monkeypatch.setattr(f"{module}.parse_course_urls", Mock())
+    monkeypatch.setattr(f"{module}.get_subject_urls", Mock(return_value={}))
+    monkeypatch.setattr(
+        f"{module}.plan_fetch", Mock(return_value=FetchPlan("abc", False))
+    )
+    load_course_keys = Mock()
+    monkeypatch.setattr(f"{module}.load_course_keys", load_course_keys)
+    create_staging_schema = Mock()
+    monkeypatch.setattr(f"{module}.create_staging_schema", create_staging_schema)
+
+    stats = bcit_to_sql("sqlite://", max_age=datetime.timedelta(hours=24), swap=True)
+
+    create_staging_schema.assert_not_called()
+    load_course_keys.assert_not_called()
+    assert stats.objects == 0
+    assert stats.total_seconds > 0
+
+
+@dbtest
+class TestIncrementalDB:
+    def test_fingerprint(self, db_session: Session):
+        assert load_fingerprint(db_session) is None
+        save_fingerprint(db_session, "abc")
+        save_fingerprint(db_session, "def")
+        assert load_fingerprint(db_session) == "def"
+
+    def test_mark_scraped(self, db_session: Session):
+        course = make_course()
+        course.url = f"{BASE_URL}/comp1234"
+        upsert_courses(db_session, [course])
+
+        mark_scraped(db_session, [course.url])
+
+        scraped_at = db_session.scalar(
+            select(Course.scraped_at).where(Course.url == course.url)
+        )
+        assert scraped_at is not None
+
+    def test_soft_delete_vanished(self, db_session: Session):
+        """Test vanished courses are soft deleted with their offerings."""
+        url = f"{BASE_URL}/comp1234"
+
+        assert soft_delete_vanished(db_session, [url]) == 2
+        assert db_session.scalar(select(Course).where(Course.url == url)) is None
+        assert (
+            db_session.scalar(select(Offering).where(Offering.crn == "67890")) is None
+        )
@@ -0,0 +1,86 @@
+"""Test journaling loads so they can be resumed."""
+import pytest
+from sqlalchemy import create_engine
+
+from bcitflex.scripts.journal import LoadJournal
+from bcitflex.scripts.scrape_and_load import ScrapeStats, bcit_to_sql, load_subjects
+
+PREREQ_KEYS = [(1, [(1, [("COMP", "1000", None)])])]
+
+
+@pytest.fixture
+def journal(tmp_path) -> LoadJournal:
+    return LoadJournal(str(tmp_path / "load_journal.jsonl"))
+
+
+class TestLoadJournal:
+    def test_empty(self, journal: LoadJournal):
+        assert journal.load() == (set(), [], set())
+
+    def test_record(self, journal: LoadJournal):
+        journal.record(["https://www.bcit.ca/a/"], PREREQ_KEYS)
+        journal.record(["https://www.bcit.ca/b/"], [], ["https://www.bcit.ca/c/"])
+
+        urls, prereq_keys, failed = journal.load()
+
+        assert urls == {"https://www.bcit.ca/a/", "https://www.bcit.ca/b/"}
+        assert prereq_keys == [(1, [[1, [["COMP", "1000", None]]]])]
+        assert failed == {"https://www.bcit.ca/c/"}
+
+    def test_cut_short(self, journal: LoadJournal):
+        """Test a batch cut short mid-write is dropped, and later ones are kept."""
+        journal.record(["https://www.bcit.ca/a/"], [])
+        with open(journal.path, "a") as file:
+            file.write('{"urls": ["https://www.bcit.ca/b/"')
+
+        assert journal.load() == ({"https://www.bcit.ca/a/"}, [], set())
+
+        journal.record(["https://www.bcit.ca/c/"], [])
+        assert journal.load()[0] == {"https://www.bcit.ca/a/", "https://www.bcit.ca/c/"}
+
+    def test_remove(self, journal: LoadJournal):
+        journal.record([], [])
+        journal.remove()
+        journal.remove()
+        assert journal.load() == (set(), [], set())
+
+    def test_exclusive(self, journal: LoadJournal):
+        """Test a journaled load can't be combined with a swap."""
+        with pytest.raises(ValueError):
+            bcit_to_sql("sqlite://", swap=True, journal_path=journal.path)
+
+
+def test_load_subjects_journaled(monkeypatch, journal: LoadJournal):
+    """Test subjects are journaled and earlier prerequisites are loaded too."""
+
+    def load_course_rows(session, courses, batch_size, course_ids):
+        list(courses)
+        return 1, [(2, [])]
+
+    loaded = []
+
+    def load_prerequisites(session, prereq_keys, course_ids, batch_size):
+        loaded.extend(prereq_keys)
+        return 0
+
+    monkeypatch.setattr(
+        "bcitflex.scripts.scrape_and_load.load_course_rows", load_course_rows
+    )
+    monkeypatch.setattr(
+        "bcitflex.scripts.scrape_and_load.load_prerequisites", load_prerequisites
+    )
+
+    load_subjects(
+        create_engine("sqlite://"),
+        {"COMP": []},
+        lambda urls: [],
+        {},
+        None,
+        1,
+        ScrapeStats(),
+        journal=journal,
+        prereq_keys=PREREQ_KEYS,
+    )
+
+    assert loaded == [*PREREQ_KEYS, (2, [])]
+    assert journal.load()[1] == [(2, [])]
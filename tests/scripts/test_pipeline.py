@@ -0,0 +1,51 @@
+"""Test running scraping stages through bounded queues."""
+import pytest
+
+from bcitflex.scripts.pipeline import buffered
+
+
+class TestBuffered:
+    def test_yields_in_order(self):
+        assert list(buffered(range(100), maxsize=4)) == list(range(100))
+
+    def test_producer_exception(self):
+        """Test an exception in the producer is raised in the consumer."""
+
+        def produce():
+            yield 1
+            raise ValueError("stage failed")
+
+        items = buffered(produce())
+        assert next(items) == 1
+        with pytest.raises(ValueError, match="stage failed"):
+            next(items)
+
+    def test_backpressure(self):
+        """Test the producer runs at most maxsize items ahead of the consumer."""
+        produced = []
+
+        def produce():
+            for i in range(100):
+                produced.append(i)
+                yield i
+
+        items = buffered(produce(), maxsize=2)
+        next(items)
+        items.close()
+        # one consumed, two queued and one blocked waiting for space
+        assert len(produced) <= 4
+
+    def test_close_stops_producer(self):
+        """Test closing the consumer closes the producing generator."""
+        closed = []
+
+        def produce():
+            try:
+                yield from range(100)
+            finally:
+                closed.append(True)
+
+        items = buffered(produce(), maxsize=1)
+        next(items)
+        items.close()
+        assert closed == [True]
@@ -0,0 +1,44 @@
+"""Test plain course page records."""
+import pickle
+from pickle import load
+
+from bcitflex.scripts.records import CourseRecord, MeetingRecord
+from bcitflex.scripts.scrape_and_load import (
+    CoursePage,
+    parse_course_record,
+    parse_response,
+)
+
+
+def test_record_round_trip():
+    """Test a parsed course survives conversion to a pickled record and back."""
+    course = parse_response(load(open("tests/test_data/course_response.pkl", "rb")))
+
+    record = pickle.loads(pickle.dumps(CourseRecord.from_model(course)))
+    clone = record.to_model()
+
+    assert clone.fullcode == course.fullcode
+    assert clone.credits == course.credits
+    assert clone.deleted_at is None
+    for clone_offering, offering in zip(clone.offerings, course.offerings):
+        assert clone_offering.crn == offering.crn
+        assert clone_offering.course is clone
+        for clone_meeting, meeting in zip(clone_offering.meetings, offering.meetings):
+            assert clone_meeting.meeting_id == meeting.meeting_id
+            assert clone_meeting.start_date == meeting.start_date
+            assert clone_meeting.days == meeting.days
+
+
+def test_parse_course_record():
+    """Test the parser emits slotted records that match the parsed models."""
+    response = load(open("tests/test_data/course_response.pkl", "rb"))
+    record = parse_course_record(CoursePage(response))
+    course = parse_response(response)
+
+    assert not hasattr(record, "__dict__")
+    assert record == CourseRecord.from_model(course)
+    assert all(
+        isinstance(meeting, MeetingRecord)
+        for offering in record.offerings
+        for meeting in offering.meetings
+    )
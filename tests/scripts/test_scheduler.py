@@ -0,0 +1,68 @@
+"""Test scheduling course page refreshes."""
+import datetime
+import math
+
+from sqlalchemy.orm import Session
+
+from bcitflex.scripts import scheduler
+from bcitflex.scripts.scheduler import plan_refresh, refresh_priority, run_scheduler
+from bcitflex.scripts.scrape_and_load import ScrapeStats
+from tests import dbtest
+
+NOW = datetime.datetime(2023, 9, 1, 12, tzinfo=datetime.timezone.utc)
+DAY_AGO = NOW - datetime.timedelta(days=1)
+
+
+class TestRefreshPriority:
+    def test_never_scraped(self):
+        assert refresh_priority(None, 0, 0, None, NOW) == math.inf
+
+    def test_volatile_first(self):
+        """Test pages that often changed rank above pages that rarely did."""
+        volatile = refresh_priority(DAY_AGO, 10, 8, None, NOW)
+        stable = refresh_priority(DAY_AGO, 10, 0, None, NOW)
+        assert volatile > stable > 0
+
+    def test_stale_first(self):
+        older = refresh_priority(NOW - datetime.timedelta(days=2), 10, 1, None, NOW)
+        assert older > refresh_priority(DAY_AGO, 10, 1, None, NOW)
+
+    def test_term_start(self):
+        """Test courses whose offerings start soon are more urgent."""
+        later = refresh_priority(DAY_AGO, 10, 1, NOW.date().replace(month=12), NOW)
+        soon = refresh_priority(
+            DAY_AGO, 10, 1, NOW.date() + datetime.timedelta(days=3), NOW
+        )
+        assert later == refresh_priority(DAY_AGO, 10, 1, None, NOW)
+        assert soon > later
+
+
+class TestRunScheduler:
+    def test_cycles(self, monkeypatch):
+        """Test each cycle loads the planned courses and a failure doesn't stop it."""
+        monkeypatch.setattr(
+            scheduler, "plan_refresh", lambda session, budget: ["COMP 1234"][:budget]
+        )
+        loads = []
+
+        def bcit_to_sql(db_url, courses, **kwargs):
+            loads.append(courses)
+            if len(loads) == 1:
+                raise ConnectionError("network down")
+            return ScrapeStats()
+
+        monkeypatch.setattr(scheduler, "bcit_to_sql", bcit_to_sql)
+        sleeps = []
+
+        run_scheduler("sqlite://", budget=1, interval=0, cycles=2, sleep=sleeps.append)
+
+        assert loads == [["COMP 1234"], ["COMP 1234"]]
+        assert len(sleeps) == 1
+
+
+@dbtest
+class TestPlanRefresh:
+    def test_plan_refresh(self, db_session: Session):
+        courses = plan_refresh(db_session, 2)
+        assert len(courses) == 2
+        assert all(" " in fullcode for fullcode in courses)
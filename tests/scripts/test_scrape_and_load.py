@@ -1,33 +1,50 @@
 """Test extracting course data from the BCIT website."""
 import datetime
 import re
+from collections import namedtuple
 from pickle import load
 from unittest.mock import MagicMock, Mock
 
 import pytest
 import requests
 from selectolax.parser import Node
-from sqlalchemy import select
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import Session
 
 from bcitflex.model import Course, Offering, Subject, Term
 from bcitflex.model.prerequisite import PrerequisiteAnd
 from bcitflex.scripts.scrape_and_load import (
     CoursePage,
+    ScrapeStats,
+    bcit_to_sql,
     collect_response,
+    descendants,
     extract_models,
     get_course_urls,
+    get_selected_urls,
+    index_prerequisites,
+    load_course_keys,
     load_courses,
+    load_subject,
+    load_subjects,
     meeting_nodes,
+    new_course_keys,
+    next_term,
     offering_nodes,
     parse_course_info,
+    parse_date,
+    parse_days,
     parse_meeting_node,
     parse_offering_node,
+    parse_prerequisite_keys,
     parse_prerequisites,
     parse_term_node,
+    parse_times,
     prep_db,
     scrape_course_urls,
     term_nodes,
+    unresolved_prerequisite_keys,
 )
 from tests import dbtest
 from tests.db_test_utils import populate_db
@@ -75,6 +92,12 @@ def existing_course(
 
 
 class TestGetNodes:
+    def test_course_page_term(self, course_page: CoursePage):
+        """Test the next term of a page is only looked up when it is read."""
+        assert "term" not in vars(course_page)
+        assert course_page.term == next_term(course_page.tree)
+        assert "term" in vars(course_page)
+
     def test_term_nodes(self, course_page: CoursePage):
         """Test the term nodes function returns a valid term node."""
         term_node = next(term_nodes(course_page))
@@ -93,6 +116,16 @@ class TestGetNodes:
         node = next(meeting_nodes(offering_node))
         assert len(node.text()) > 0
 
+    def test_descendants(self, offering_node: Node):
+        """Test descendants yields the node's subtree and nothing after it."""
+        elements = [
+            node.html
+            for node in descendants(offering_node)
+            if node.tag not in ("-text", "_comment")
+        ]
+        # css("*") matches the node itself first
+        assert elements == [node.html for node in offering_node.css("*")[1:]]
+
 
 class TestParseNodes:
     def test_parse_term_node(self, term_node: Node):
@@ -113,6 +146,9 @@ class TestParseNodes:
         assert offering.deleted_at is None
         assert offering.price > 0
         assert re.match(r"^\d{5}$", offering.crn)
+        assert [m.meeting_id for m in offering.meetings] == list(
+            range(1, len(offering.meetings) + 1)
+        )
 
     def test_parse_meeting_node(
         self, meeting_node: Node, new_offering: Offering, new_term: Term
@@ -130,6 +166,34 @@ class TestParseNodes:
         assert isinstance(meeting.campus, str)
         assert meeting.room is None or isinstance(meeting.room, str)
 
+    def test_parse_meeting_node_id(
+        self, meeting_node: Node, new_offering: Offering, new_term: Term
+    ):
+        """Test the parse meeting node function keeps the given meeting id."""
+        meeting = parse_meeting_node(meeting_node, new_offering, new_term, 3)
+        assert meeting.meeting_id == 3
+
+    def test_parse_date(self):
+        assert parse_date("Jan 11", 2024) == datetime.date(2024, 1, 11)
+        with pytest.raises(ValueError, match="Invalid date format"):
+            parse_date("Jan 32", 2024)
+
+    @pytest.mark.parametrize(
+        "string, expected",
+        [
+            ("N/A", None),
+            ("Thu", {"Thu"}),
+            ("Mon, Wed", {"Mon", "Wed"}),
+            ("Mon - Wed", {"Mon", "Tue", "Wed"}),
+        ],
+    )
+    def test_parse_days(self, string, expected):
+        assert parse_days(string) == expected
+
+    def test_parse_times(self):
+        assert parse_times("N/A") == (None, None)
+        assert parse_times("18:00 - 21:00") == (datetime.time(18), datetime.time(21))
+
 
 class TestParsePrerequisites:
     """Test the parse prerequisites function."""
@@ -189,13 +253,15 @@ class TestParsePrerequisites:
     )
     def test_parse_prerequisites(self, string, expected, monkeypatch):
         """Test the parse prerequisites function."""
-        # mock Course.get_by_unique() to return a course
+        # mock Course.get_many_by_unique() to return a course for each id
         monkeypatch.setattr(
             Course,
-            "get_by_unique",
-            lambda _, ids: Course(subject_id=ids[0], code=ids[1]),
+            "get_many_by_unique",
+            lambda _, ids: {id_: Course(subject_id=id_[0], code=id_[1]) for id_ in ids},
+        )
+        prereqs = parse_prerequisites(
+            Mock(execute=Mock(return_value=[])), Course(prerequisites_raw=string)
         )
-        prereqs = parse_prerequisites(Mock(), Course(prerequisites_raw=string))
         assert self.reduce_prereqs(prereqs) == expected
         assert [prereq.prereq_no for prereq in prereqs] == list(
             range(1, len(prereqs) + 1)
@@ -203,22 +269,27 @@ class TestParsePrerequisites:
 
     def test_parse_prerequisites_missing_course(self, monkeypatch):
         """Test that a missing course is omitted from the prerequisites."""
-        # mock Course.get_by_unique() to return None
-        monkeypatch.setattr(Course, "get_by_unique", Mock(return_value=None))
-        prereqs = parse_prerequisites(Mock(), Course(prerequisites_raw="COMP 1002"))
+        # mock Course.get_many_by_unique() to find no courses
+        monkeypatch.setattr(Course, "get_many_by_unique", Mock(return_value={}))
+        prereqs = parse_prerequisites(
+            Mock(execute=Mock(return_value=[])),
+            Course(prerequisites_raw="COMP 1002"),
+        )
         assert self.reduce_prereqs(prereqs) == []
-        parse_prerequisites(Mock(), Course(prerequisites_raw="COMP 1002"))
+        parse_prerequisites(
+            Mock(execute=Mock(return_value=[])), Course(prerequisites_raw="COMP 1002")
+        )
 
     def test_parse_prerequisites_self_reference(self, monkeypatch):
         """Test that a reference to the course itself is omitted from the prerequisites."""
-        # mock Course.get_by_unique() to return a course
+        # mock Course.get_many_by_unique() to return a course for each id
         monkeypatch.setattr(
             Course,
-            "get_by_unique",
-            lambda _, ids: Course(subject_id=ids[0], code=ids[1]),
+            "get_many_by_unique",
+            lambda _, ids: {id_: Course(subject_id=id_[0], code=id_[1]) for id_ in ids},
         )
         prereqs = parse_prerequisites(
-            Mock(),
+            Mock(execute=Mock(return_value=[])),
             Course(subject_id="COMP", code="1002", prerequisites_raw="COMP 1002"),
         )
         assert self.reduce_prereqs(prereqs) == []
@@ -232,17 +303,87 @@ class TestParsePrerequisites:
                 ("COMM", "0004", None),
             ],
         ]
-        # mock Course.get_by_unique() to return a course
+        # mock Course.get_many_by_unique() to return a course for each id
         monkeypatch.setattr(
             Course,
-            "get_by_unique",
-            lambda _, ids: Course(subject_id=ids[0], code=ids[1]),
+            "get_many_by_unique",
+            lambda _, ids: {id_: Course(subject_id=id_[0], code=id_[1]) for id_ in ids},
         )
         prereqs = parse_prerequisites(
-            Mock(), Course(subject_id="COMM", code="0005", prerequisites_raw=string)
+            Mock(execute=Mock(return_value=[])),
+            Course(subject_id="COMM", code="0005", prerequisites_raw=string),
         )
         assert self.reduce_prereqs(prereqs) == expected
 
+    def test_unresolved_prerequisite_keys(self):
+        """Test courses naming a course missing from their stored prerequisites."""
+        Row = namedtuple("Row", "course_id subject_id code prerequisites_raw")
+        session = Mock()
+        session.execute.side_effect = [
+            # courses whose prerequisites name the new course
+            [
+                Row(1, "COMP", "1000", "COMP 3000"),
+                Row(2, "COMP", "2000", "COMP 3000 and COMP 4000"),
+                Row(4, "COMP", "4000", "COMP 3000"),
+            ],
+            # their stored prerequisites
+            Mock(all=lambda: [(1, 1, 3)]),
+        ]
+        course_ids = {("COMP", "1000"): 1, ("COMP", "3000"): 3, ("COMP", "2000"): 2}
+
+        unresolved = unresolved_prerequisite_keys(
+            session, course_ids, [("COMP", "3000")], loaded=[4]
+        )
+
+        # COMP 4000 is not stored, so only its other prerequisite can resolve
+        assert unresolved == [
+            (2, [(1, [("COMP", "3000", None)]), (2, [("COMP", "4000", None)])])
+        ]
+        courses_stmt = session.execute.call_args_list[0][0][0].compile(
+            dialect=postgresql.dialect()
+        )
+        assert "LIKE ANY (ARRAY[" in str(courses_stmt)
+        assert list(courses_stmt.params.values()) == ["%COMP 3000%"]
+
+    def test_unresolved_prerequisite_keys_no_new_courses(self):
+        """Test nothing is read when no course is new."""
+        session = Mock()
+        assert unresolved_prerequisite_keys(session, {("COMP", "1000"): 1}, []) == []
+        session.execute.assert_not_called()
+
+    def test_new_course_keys(self):
+        """Test keys new to the index, and of courses loaded, are new."""
+        course_ids = {("COMP", "1000"): 1, ("COMP", "2000"): 2, ("COMP", "3000"): 3}
+        known_keys = {("COMP", "1000"), ("COMP", "2000")}
+
+        assert new_course_keys(course_ids, known_keys) == {("COMP", "3000")}
+        assert new_course_keys(course_ids, known_keys, [(1, [])]) == {
+            ("COMP", "1000"),
+            ("COMP", "3000"),
+        }
+
+    def test_index_prerequisites(self):
+        """Test prerequisites are resolved with the course ID index."""
+        course = Course(
+            course_id=1,
+            subject_id="COMP",
+            code="2000",
+            prerequisites_raw="60% in COMP 1000 or 60% in COMP 1001 and MATH 1000",
+        )
+        prereqs = index_prerequisites(
+            course.course_id,
+            parse_prerequisite_keys(course),
+            {("COMP", "1000"): 2, ("COMP", "1001"): 3},
+        )
+        assert [
+            (
+                prereq.course_id,
+                prereq.prereq_no,
+                [(child.course_id, child.criteria) for child in prereq.children],
+            )
+            for prereq in prereqs
+        ] == [(1, 1, [(2, "60%"), (3, "60%")])]
+
 
 class TestExtractModels:
     def test_scrape_course_urls(self, monkeypatch):
@@ -297,6 +438,104 @@ class TestExtractModels:
         course = next(extract_models([course_page.url]))
 
         assert course.subject_id == "COMP"
+        assert course.page_digest == course_page.digest
+
+    def test_extract_skips_unchanged(self, monkeypatch, course_page: CoursePage):
+        """Test pages matching their stored digest are not parsed."""
+
+        mock_request = MagicMock(
+            return_value=load(open("tests/test_data/course_response.pkl", "rb"))
+        )
+        monkeypatch.setattr(requests, "get", mock_request)
+
+        unchanged = {course_page.url: course_page.digest}
+        changed = {course_page.url: "0" * 64}
+
+        skipped = []
+        assert (
+            list(
+                extract_models([course_page.url], digests=unchanged, unchanged=skipped)
+            )
+            == []
+        )
+        assert skipped == [course_page.url]
+        assert len(list(extract_models([course_page.url], digests=changed))) == 1
+
+        # skipped pages are recorded when parsing in worker processes too
+        skipped = []
+        courses = extract_models(
+            [course_page.url] * 2,
+            digests=unchanged,
+            parse_workers=2,
+            unchanged=skipped,
+        )
+        assert list(courses) == []
+        assert skipped == [course_page.url] * 2
+
+    def test_extract_parse_workers(self, monkeypatch, course_page: CoursePage):
+        """Test parsing in worker processes yields the same courses."""
+
+        mock_request = MagicMock(
+            return_value=load(open("tests/test_data/course_response.pkl", "rb"))
+        )
+        monkeypatch.setattr(requests, "get", mock_request)
+
+        expected = next(extract_models([course_page.url]))
+        courses = list(
+            extract_models([course_page.url] * 3, queue_size=2, parse_workers=2)
+        )
+
+        assert len(courses) == 3
+        for course in courses:
+            assert course.fullcode == expected.fullcode
+            assert course.page_digest == expected.page_digest
+            assert [o.crn for o in course.offerings] == [
+                o.crn for o in expected.offerings
+            ]
+            assert [len(o.meetings) for o in course.offerings] == [
+                len(o.meetings) for o in expected.offerings
+            ]
+
+
+class TestGetSelectedUrls:
+    subject_urls = {
+        "COMP": ["/courses/a-comp-1234/", "/courses/b-comp-2345/"],
+        "MATH": ["/courses/c-math-1000/"],
+    }
+
+    def test_select(self):
+        """Test subjects and courses select their urls, and only they vanish."""
+        session = Mock()
+        session.execute.return_value = [
+            ("COMP", "1234", "https://www.bcit.ca/courses/a-comp-1234/"),
+            ("COMP", "9999", "https://www.bcit.ca/courses/d-comp-9999/"),
+        ]
+
+        urls, vanished = get_selected_urls(
+            session, self.subject_urls, subjects=["comp"], courses=["MATH1000"]
+        )
+
+        assert urls == self.subject_urls
+        assert vanished == ["https://www.bcit.ca/courses/d-comp-9999/"]
+
+    def test_select_crns(self):
+        """Test a CRN selects the course of its offering."""
+        session = Mock()
+        session.execute.side_effect = [[("12345", "COMP", "2345")], []]
+
+        urls, vanished = get_selected_urls(session, self.subject_urls, crns=["12345"])
+
+        assert urls == {"COMP": ["/courses/b-comp-2345/"]}
+        assert vanished == []
+
+    def test_unknown(self):
+        session = Mock()
+        session.execute.return_value = []
+
+        with pytest.raises(ValueError, match="Unknown CRNs: 54321"):
+            get_selected_urls(session, self.subject_urls, crns=["54321"])
+        with pytest.raises(ValueError, match="Invalid course code"):
+            get_selected_urls(session, self.subject_urls, courses=["COMP"])
 
 
 @dbtest
@@ -329,6 +568,23 @@ class TestLoadData:
         load_courses(session, courses)
         assert session.get(Course, 4) is None
 
+    def test_load_course_keys(self, session: Session):
+        """Test course IDs include soft deleted courses and digests do not."""
+        course = session.get(Course, 1)
+        course.page_digest = "0" * 64
+        session.commit()
+
+        course_ids, digests = load_course_keys(session)
+        assert course_ids[("COMP", "1234")] == 1
+        assert digests[course.url] == "0" * 64
+
+        session.delete(course)
+        session.commit()
+
+        course_ids, digests = load_course_keys(session)
+        assert course_ids[("COMP", "1234")] == 1
+        assert course.url not in digests
+
     def test_collect_response_failure(self, monkeypatch):
         mock_response = MagicMock()
         mock_response.status_code = 404
@@ -337,3 +593,79 @@ class TestLoadData:
         with pytest.raises(Exception) as exc_info:
             collect_response("https://example.com")
             assert "Collect response status code" in str(exc_info.value)
+
+
+class TestLoadSubjects:
+    """Test loading subjects in their own transactions."""
+
+    @pytest.fixture
+    def engine(self):
+        return create_engine("sqlite://")
+
+    def test_load_subject_retried(self, monkeypatch, engine):
+        """Test a subject that fails to load is loaded again from the start."""
+        attempts = []
+
+        def load_course_rows(session, courses, batch_size, course_ids):
+            attempts.append(list(courses))
+            if len(attempts) == 1:
+                raise RuntimeError("deadlock")
+            course_ids[("COMP", "1234")] = 1
+            return 3, [(1, [])]
+
+        monkeypatch.setattr(
+            "bcitflex.scripts.scrape_and_load.load_course_rows", load_course_rows
+        )
+
+        stats, course_ids, prereq_keys = load_subject(engine, [], lambda urls: [])
+
+        assert len(attempts) == 2
+        assert stats.objects == 3
+        assert course_ids == {("COMP", "1234"): 1}
+        assert prereq_keys == [(1, [])]
+
+    def test_load_subject_fails(self, monkeypatch, engine):
+        """Test a subject that keeps failing raises its error."""
+        monkeypatch.setattr(
+            "bcitflex.scripts.scrape_and_load.load_course_rows",
+            Mock(side_effect=RuntimeError("deadlock")),
+        )
+
+        with pytest.raises(RuntimeError):
+            load_subject(engine, [], lambda urls: [])
+
+    def test_load_subjects(self, monkeypatch, engine):
+        """Test the subjects' counters and course IDs are merged."""
+        subject_ids = iter(range(1, 3))
+
+        def load_course_rows(session, courses, batch_size, course_ids):
+            course_ids[("COMP", str(next(subject_ids)))] = len(course_ids)
+            return 2, []
+
+        monkeypatch.setattr(
+            "bcitflex.scripts.scrape_and_load.load_course_rows", load_course_rows
+        )
+        monkeypatch.setattr(
+            "bcitflex.scripts.scrape_and_load.unresolved_prerequisite_keys",
+            lambda session, course_ids, new_keys, loaded: [],
+        )
+        stats = ScrapeStats()
+        course_ids = {("BLAW", "1000"): 9}
+
+        load_subjects(
+            engine,
+            {"COMP": [], "BLAW": []},
+            lambda urls: [],
+            course_ids,
+            None,
+            2,
+            stats,
+        )
+
+        assert stats.objects == 4
+        assert set(course_ids) == {("BLAW", "1000"), ("COMP", "1"), ("COMP", "2")}
+
+    def test_load_workers_exclusive(self):
+        """Test load workers can't be combined with COPY."""
+        with pytest.raises(ValueError):
+            bcit_to_sql("sqlite://", copy=True, load_workers=2)
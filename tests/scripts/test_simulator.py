@@ -0,0 +1,57 @@
+"""Test the local BCIT site simulator."""
+import pytest
+import requests
+
+from bcitflex.scripts.fetch import iter_page_responses
+from bcitflex.scripts.scrape_and_load import (
+    COURSE_LIST,
+    extract_models,
+    parse_course_urls,
+)
+from bcitflex.scripts.simulator import BCITSimulator
+
+
+@pytest.fixture(scope="module")
+def site() -> BCITSimulator:
+    with BCITSimulator(courses=50) as site:
+        yield site
+
+
+class TestBCITSimulator:
+    def test_course_list(self, site: BCITSimulator):
+        subject_urls = parse_course_urls(requests.get(site.url + COURSE_LIST))
+        assert sum(len(urls) for urls in subject_urls.values()) == 50
+
+    def test_course_number_round_trip(self, site: BCITSimulator):
+        for number in [0, 1, 49]:
+            assert site.course_number(*site.course_key(number)) == number
+        assert site.course_number(*site.course_key(50)) is None
+
+    def test_pages_parse(self, site: BCITSimulator):
+        """Test every simulated page parses into a course with offerings."""
+        subject_urls = parse_course_urls(requests.get(site.url + COURSE_LIST))
+        urls = [url for urls in subject_urls.values() for url in urls]
+
+        courses = list(extract_models(urls, iter_page_responses, base_url=site.url))
+
+        assert len(courses) == 50
+        for course in courses:
+            assert site.course_number(course.subject_id, course.code) is not None
+            assert course.offerings
+            assert all(offering.meetings for offering in course.offerings)
+
+    def test_etag(self, site: BCITSimulator):
+        url = site.url + site.course_path(0)
+        etag = requests.get(url).headers["ETag"]
+        assert requests.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    def test_missing_page(self, site: BCITSimulator):
+        assert requests.get(site.url + "/courses/missing-zzzz-9999/").status_code == 404
+
+
+@pytest.mark.parametrize(
+    "rates, status", [({"error_rate": 1.0}, 500), ({"throttle_rate": 1.0}, 429)]
+)
+def test_faults(rates, status):
+    with BCITSimulator(courses=1, **rates) as site:
+        assert requests.get(site.url + site.course_path(0)).status_code == status
@@ -0,0 +1,96 @@
+"""Test loading courses through COPY into staging tables."""
+import datetime
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from bcitflex.model import Offering
+from bcitflex.model.prerequisite import PrerequisiteAnd
+from bcitflex.scripts.records import CourseRecord
+from bcitflex.scripts.scrape_and_load import copy_courses, parse_prerequisite_keys
+from bcitflex.scripts.staging import StagingTables, copy_value
+from tests import dbtest
+from tests.scripts.test_upsert import make_course
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, "\\N"),
+        ("Rm. 101", "Rm. 101"),
+        ("a\tb\nc\\d", "a\\tb\\nc\\\\d"),
+        (3.0, "3.0"),
+        (datetime.date(2023, 9, 13), "2023-09-13"),
+        (datetime.time(18), "18:00:00"),
+        ({"Wed", "Mon"}, "{Mon,Wed}"),
+    ],
+)
+def test_copy_value(value, expected):
+    assert copy_value(value) == expected
+
+
+class TestStagingTables:
+    def test_add(self):
+        course = make_course(crns=("11111", "22222"))
+        staging = StagingTables(Mock())
+
+        staging.add(course, parse_prerequisite_keys(course))
+
+        assert staging.pending == 1
+        assert (
+            staging.buffers["staging_course"]
+            .getvalue()
+            .startswith("COMP\t1234\tTest Course\t")
+        )
+        assert staging.buffers["staging_offering"].getvalue().count("\n") == 2
+        assert staging.buffers["staging_meeting"].getvalue().count("\n") == 2
+        assert (
+            staging.buffers["staging_prerequisite"].getvalue()
+            == "COMP\t1234\t1\tCOMP\t1000\t\\N\n"
+        )
+
+    def test_add_record(self):
+        """Test a course record is staged like the course it was parsed from."""
+        course = make_course(crns=("11111", "22222"))
+        from_model, from_record = StagingTables(Mock()), StagingTables(Mock())
+
+        from_model.add(course, parse_prerequisite_keys(course))
+        record = CourseRecord.from_model(course)
+        from_record.add(record, parse_prerequisite_keys(record))
+
+        for table, buffer in from_model.buffers.items():
+            assert from_record.buffers[table].getvalue() == buffer.getvalue()
+
+
+@dbtest
+class TestCopyCourses:
+    """Test merging staged courses.
+
+    Note: Tests are interdependent and must be run in order."""
+
+    def test_insert(self, db_session: Session):
+        written = copy_courses(db_session, [make_course()])
+
+        offering = db_session.scalars(
+            select(Offering).where(Offering.crn == "67890")
+        ).one()
+        assert offering.course_id == 1
+        assert offering.meetings[0].days == ["Mon", "Wed"]
+        prereq = db_session.scalars(
+            select(PrerequisiteAnd).where(PrerequisiteAnd.course_id == 1)
+        ).one()
+        assert [child.course_id for child in prereq.children] == [2]
+        assert written > 0
+
+    def test_unchanged(self, db_session: Session):
+        """Test loading the same course again writes nothing."""
+        assert copy_courses(db_session, [make_course()]) == 0
+
+    def test_missing_offering_soft_deleted(self, db_session: Session):
+        copy_courses(db_session, [make_course(crns=("11111",))], batch_size=1)
+
+        crns = db_session.scalars(select(Offering.crn)).all()
+        assert "67890" not in crns
+        assert "11111" in crns
@@ -0,0 +1,115 @@
+"""Test refreshing the status of upcoming offerings."""
+import datetime
+from pickle import load
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from bcitflex.model import Meeting, Offering
+from bcitflex.scripts.records import OfferingStatusRecord
+from bcitflex.scripts.scrape_and_load import CoursePage, parse_course_record
+from bcitflex.scripts.status import (
+    current_term_id,
+    parse_offering_statuses,
+    upcoming_offerings,
+    update_offering_statuses,
+)
+from tests import dbtest
+
+
+@pytest.fixture
+def course_page() -> CoursePage:
+    return CoursePage(load(open("tests/test_data/course_response.pkl", "rb")))
+
+
+@pytest.mark.parametrize(
+    "today, expected",
+    [
+        (datetime.date(2023, 1, 5), "202310"),
+        (datetime.date(2023, 4, 1), "202320"),
+        (datetime.date(2023, 8, 31), "202320"),
+        (datetime.date(2023, 12, 31), "202330"),
+    ],
+)
+def test_current_term_id(today, expected):
+    assert current_term_id(today) == expected
+
+
+def test_parse_offering_statuses(course_page: CoursePage):
+    """Test statuses match a full parse, and other offerings are left out."""
+    course = parse_course_record(course_page)
+    expected = [
+        OfferingStatusRecord(o.crn, o.term_id, o.status, o.instructor)
+        for o in course.offerings[1:]
+    ]
+    upcoming = {(o.crn, o.term_id) for o in course.offerings[1:]}
+
+    assert list(parse_offering_statuses(course_page, upcoming)) == expected
+    assert list(parse_offering_statuses(course_page, set())) == []
+
+
+def test_update_batches():
+    """Test statuses are written in batches, one row per offering."""
+    session = Mock()
+    session.execute.return_value.scalars.return_value.all.return_value = [7]
+    statuses = [
+        OfferingStatusRecord(str(crn), "202330", "Full", "Jane Doe")
+        for crn in [1, 1, 2, 3]
+    ]
+
+    assert update_offering_statuses(session, statuses, batch_size=2) == 2
+    # the repeated offering is written once, in the first batch
+    assert session.execute.call_count == 3
+    first = session.execute.call_args_list[0][0][0].compile().params
+    assert sorted(v for v in first.values() if v in {"1", "2", "3"}) == ["1", "2"]
+    # then the page digest of the offerings' course is cleared once
+    last = session.execute.call_args_list[2][0][0].compile().params
+    assert last["page_digest"] is None
+    assert [7] in last.values()
+
+
+@dbtest
+class TestUpdateStatusesDB:
+    def test_upcoming_offerings(self, db_session: Session):
+        """Test offerings are upcoming until their last meeting starts."""
+        meeting = db_session.scalars(select(Meeting)).first()
+        offering = meeting.offering
+
+        urls, upcoming = upcoming_offerings(db_session, meeting.start_date)
+
+        assert offering.course.url in urls
+        assert (offering.crn, offering.term_id) in upcoming
+
+        last_start = db_session.scalar(select(func.max(Meeting.start_date)))
+        after = last_start + datetime.timedelta(days=1)
+        assert upcoming_offerings(db_session, after) == ([], set())
+
+    def test_upcoming_offerings_without_meetings(self, db_session: Session):
+        """Test offerings without meetings are upcoming until their term is over."""
+        offering = db_session.scalars(select(Offering)).first()
+        clone = offering.clone(crn="99999", include_relationships=False)
+        db_session.add(clone)
+        db_session.flush()
+        year = int(clone.term_id[:4])
+
+        _, upcoming = upcoming_offerings(db_session, datetime.date(year, 1, 1))
+        assert (clone.crn, clone.term_id) in upcoming
+
+        _, upcoming = upcoming_offerings(db_session, datetime.date(year + 1, 1, 1))
+        assert (clone.crn, clone.term_id) not in upcoming
+
+    def test_update(self, db_session: Session):
+        offering = db_session.scalars(select(Offering)).first()
+        record = OfferingStatusRecord(
+            offering.crn, offering.term_id, "Waitlist", offering.instructor
+        )
+
+        assert update_offering_statuses(db_session, [record]) == 1
+        assert update_offering_statuses(db_session, [record]) == 0
+
+        db_session.refresh(offering)
+        assert offering.status == "Waitlist"
+        db_session.refresh(offering.course)
+        assert offering.course.page_digest is None
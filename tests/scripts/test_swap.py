@@ -0,0 +1,118 @@
+"""Test loading the catalogue into a staging schema and swapping it live."""
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, select, text
+
+from bcitflex.model import Course
+from bcitflex.scripts.swap import (
+    PREVIOUS_SCHEMA,
+    STAGING_SCHEMA,
+    create_staging_schema,
+    staging_engine,
+    swap_schemas,
+    swap_staging_schema,
+    validate_staging_schema,
+)
+from tests import dbtest
+
+
+class FakeConnection:
+    """Record executed statements and return canned results by query."""
+
+    def __init__(self, results: dict[str, list] | None = None, scalar: int = 0):
+        self.statements = []
+        self.results = results or {}
+        self.scalar_result = scalar
+
+    def execute(self, stmt, params=None):
+        sql = str(stmt)
+        self.statements.append(sql)
+        rows = next((rows for query, rows in self.results.items() if query in sql), [])
+        return SimpleNamespace(
+            all=lambda: rows, scalars=lambda: SimpleNamespace(all=lambda: rows)
+        )
+
+    def scalar(self, stmt):
+        self.statements.append(str(stmt))
+        return self.scalar_result
+
+
+def index_of(statements: list[str], fragment: str) -> int:
+    return next(i for i, sql in enumerate(statements) if fragment in sql)
+
+
+class TestSwap:
+    def test_create_staging_schema(self):
+        """Test constraints are added after the rows, and as they were named."""
+        connection = FakeConnection(
+            {
+                "pg_get_constraintdef": [
+                    ("course", "uq_course_subject_id_code", "UNIQUE (subject_id, code)")
+                ],
+                "pg_get_ruledef": ["CREATE RULE _soft_delete AS ON DELETE TO course"],
+            }
+        )
+
+        create_staging_schema(connection)
+
+        statements = connection.statements
+        insert = index_of(statements, f"INSERT INTO {STAGING_SCHEMA}.prereq_or")
+        constraint = index_of(statements, 'ADD CONSTRAINT "uq_course_subject_id_code"')
+        rule = index_of(statements, "CREATE RULE")
+        assert insert < constraint < rule
+        assert f"ALTER TABLE {STAGING_SCHEMA}.course" in statements[constraint]
+
+    def test_validate_too_few_courses(self):
+        """Test a staged catalogue that lost most of its courses is rejected."""
+        counts = iter([10, 100])
+        connection = FakeConnection()
+        connection.scalar = lambda stmt: next(counts)
+
+        assert validate_staging_schema(connection) == ["10 courses staged, 100 live."]
+
+    def test_swap_schemas(self):
+        """Test foreign keys of other tables are moved to the staged tables."""
+        fk = SimpleNamespace(
+            table_name="program_course",
+            conname="program_course_course_id_fkey",
+            definition="FOREIGN KEY (course_id) REFERENCES course(course_id)",
+        )
+        connection = FakeConnection({"confrelid": [fk]})
+
+        swap_schemas(connection)
+
+        statements = connection.statements
+        drop = index_of(statements, 'DROP CONSTRAINT "program_course_course_id_fkey"')
+        moved = index_of(statements, f"{STAGING_SCHEMA}.course SET SCHEMA public")
+        add = index_of(statements, 'ADD CONSTRAINT "program_course_course_id_fkey"')
+        assert drop < moved < add
+        assert statements[add].endswith("NOT VALID")
+        assert f"public.course SET SCHEMA {PREVIOUS_SCHEMA}" in "".join(statements)
+
+
+@dbtest
+class TestSwapDB:
+    @pytest.fixture
+    def engine(self, app):
+        return create_engine(app.config["SQLALCHEMY_DATABASE_URI"])
+
+    def test_swap(self, engine, app):
+        """Test changes to the staged catalogue only show once swapped."""
+        with engine.begin() as connection:
+            create_staging_schema(connection)
+
+        with staging_engine(app.config["SQLALCHEMY_DATABASE_URI"]).begin() as staged:
+            staged.execute(
+                text("UPDATE course SET name = 'Staged' WHERE course_id = 1")
+            )
+
+        def live_name():
+            with engine.connect() as connection:
+                return connection.scalar(
+                    select(Course.name).where(Course.course_id == 1)
+                )
+
+        assert live_name() != "Staged"
+        swap_staging_schema(engine)
+        assert live_name() == "Staged"
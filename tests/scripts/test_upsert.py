@@ -0,0 +1,145 @@
+"""Test loading courses with set-based upserts."""
+import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from bcitflex.model import Course, Meeting, Offering
+from bcitflex.model.prerequisite import PrerequisiteAnd
+from bcitflex.scripts.scrape_and_load import load_courses
+from bcitflex.scripts.upsert import upsert_courses
+from tests import dbtest
+
+
+def make_course(status: str = "Open", crns: tuple[str, ...] = ("67890",)) -> Course:
+    """Return a parsed COMP 1234 course with one meeting per offering."""
+    course = Course(
+        subject_id="COMP",
+        code="1234",
+        name="Test Course",
+        prerequisites_raw="COMP 1000",
+        credits=3.0,
+        url="https://www.bcit.ca",
+        deleted_at=None,
+    )
+    course.offerings = []
+    for crn in crns:
+        offering = Offering(
+            crn=crn,
+            instructor="John Doe",
+            price=123.45,
+            duration="1 week",
+            status=status,
+            course=course,
+            term_id="202330",
+            deleted_at=None,
+        )
+        Meeting(
+            start_date=datetime.date(2023, 9, 13),
+            end_date=datetime.date(2023, 11, 29),
+            days={"Wed", "Mon"},
+            start_time=datetime.time(18),
+            end_time=datetime.time(21),
+            campus="Online",
+            offering=offering,
+            deleted_at=None,
+        )
+    return course
+
+
+@dbtest
+class TestUpsertCourses:
+    """Test upserting courses.
+
+    Note: Tests are interdependent and must be run in order."""
+
+    def test_insert(self, db_session: Session):
+        written = upsert_courses(db_session, [make_course()])
+
+        offering = db_session.scalars(
+            select(Offering).where(Offering.crn == "67890")
+        ).one()
+        assert offering.course_id == 1
+        assert offering.meetings[0].days == ["Mon", "Wed"]
+        # the new offering and its meeting, and the old offering and its meeting
+        assert written == 4
+
+    def test_unchanged(self, db_session: Session):
+        """Test loading the same course again writes nothing."""
+        course = make_course()
+        assert upsert_courses(db_session, [course]) == 0
+        assert course.course_id == 1
+
+    def test_changed(self, db_session: Session):
+        assert upsert_courses(db_session, [make_course(status="Full")]) == 1
+
+        offering = db_session.scalars(
+            select(Offering).where(Offering.crn == "67890")
+        ).one()
+        db_session.refresh(offering)
+        assert offering.status == "Full"
+
+    def test_missing_offering_soft_deleted(self, db_session: Session):
+        written = upsert_courses(db_session, [make_course(crns=("11111",))])
+
+        crns = db_session.scalars(select(Offering.crn)).all()
+        assert "67890" not in crns
+        assert "11111" in crns
+        assert written == 4
+
+
+@dbtest
+class TestLoadCourses:
+    def test_prerequisites(self, db_session: Session):
+        """Test prerequisites are loaded and unchanged ones are not rewritten."""
+        load_courses(db_session, [make_course()])
+        prereqs = db_session.scalars(
+            select(PrerequisiteAnd).where(PrerequisiteAnd.course_id == 1)
+        ).all()
+        assert [child.course_id for child in prereqs[0].children] == [2]
+
+        assert load_courses(db_session, [make_course()]) == 0
+
+    def test_prerequisite_loaded_later(self, db_session: Session):
+        """Test a prerequisite on a course loaded later in the run is resolved."""
+        course = make_course()
+        course.prerequisites_raw = "COMP 5555"
+        later = make_course(crns=())
+        later.code = "5555"
+        later.prerequisites_raw = "None"
+
+        load_courses(db_session, [course, later], batch_size=1)
+
+        later_id = db_session.scalar(
+            select(Course.course_id).where(Course.code == "5555")
+        )
+        prereq = db_session.scalars(
+            select(PrerequisiteAnd).where(PrerequisiteAnd.course_id == 1)
+        ).one()
+        assert [child.course_id for child in prereq.children] == [later_id]
+
+    def test_prerequisite_stored_on_later_run(self, db_session: Session):
+        """Test a prerequisite on a course stored by a later run is resolved."""
+        course = make_course()
+        course.code = "6000"
+        course.prerequisites_raw = "COMP 7777"
+        load_courses(db_session, [course])
+        assert (
+            db_session.scalars(
+                select(PrerequisiteAnd).where(
+                    PrerequisiteAnd.course_id == course.course_id
+                )
+            ).first()
+            is None
+        )
+
+        # the page of the first course is unchanged, so it isn't loaded again
+        later = make_course(crns=())
+        later.code = "7777"
+        later.prerequisites_raw = "None"
+        load_courses(db_session, [later])
+
+        prereq = db_session.scalars(
+            select(PrerequisiteAnd).where(PrerequisiteAnd.course_id == course.course_id)
+        ).one()
+        assert [child.course_id for child in prereq.children] == [later.course_id]